@@ -0,0 +1,123 @@
+"""Partition serve_log by month and add daily rollup tables
+
+Revision ID: 003
+Revises: 2576c4594769
+Create Date: 2026-10-19
+
+On PostgreSQL, serve_log becomes a range-partitioned table on served_at with
+one partition per month plus a default partition. Existing rows are copied
+across and the id sequence is carried over. On SQLite the table stays flat
+and gets back the served_at / prompt_id indexes dropped in 2576c4594769.
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision: str = "003"
+down_revision: Union[str, None] = "2576c4594769"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS_AHEAD = 2
+
+
+def _add_months(dt, n):
+    month = dt.month - 1 + n
+    return dt.replace(year=dt.year + month // 12, month=month % 12 + 1)
+
+
+def _create_month_partitions(first_month, last_month):
+    month = first_month
+    while month <= last_month:
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE IF NOT EXISTS serve_log_{month:%Y_%m} PARTITION OF serve_log "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        month = upper
+
+
+def upgrade() -> None:
+    # --- daily rollup tables ---
+    op.create_table(
+        "serve_daily_prompt",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("prompt_id", sa.Integer(), sa.ForeignKey("prompts.id"), primary_key=True),
+        sa.Column("serves", sa.Integer(), nullable=False, server_default=sa.text("0")),
+    )
+    op.create_table(
+        "serve_daily_category",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("category", sa.String(100), primary_key=True),
+        sa.Column("serves", sa.Integer(), nullable=False, server_default=sa.text("0")),
+    )
+    op.execute("INSERT INTO app_state (key, value_int) VALUES ('rollup_watermark', 0)")
+
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        # --- swap serve_log for a partitioned copy ---
+        op.execute("ALTER TABLE serve_log RENAME TO serve_log_legacy")
+        op.execute("ALTER TABLE serve_log_legacy RENAME CONSTRAINT serve_log_pkey TO serve_log_legacy_pkey")
+        op.execute("""
+            CREATE TABLE serve_log (
+                id INTEGER NOT NULL DEFAULT nextval('serve_log_id_seq'),
+                prompt_id INTEGER NOT NULL REFERENCES prompts (id),
+                served_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+                client_ip VARCHAR(45),
+                user_agent TEXT,
+                PRIMARY KEY (id, served_at)
+            ) PARTITION BY RANGE (served_at)
+        """)
+        op.execute("CREATE TABLE serve_log_default PARTITION OF serve_log DEFAULT")
+
+        now = datetime.now(timezone.utc)
+        current_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        oldest = bind.execute(sa.text("SELECT MIN(served_at) FROM serve_log_legacy")).scalar()
+        first_month = current_month
+        if oldest is not None:
+            oldest = oldest.astimezone(timezone.utc)
+            first_month = min(first_month, oldest.replace(day=1, hour=0, minute=0, second=0, microsecond=0))
+        _create_month_partitions(first_month, _add_months(current_month, PARTITIONS_AHEAD))
+
+        op.execute("""
+            INSERT INTO serve_log (id, prompt_id, served_at, client_ip, user_agent)
+            SELECT id, prompt_id, served_at, client_ip, user_agent FROM serve_log_legacy
+        """)
+        op.execute("ALTER SEQUENCE serve_log_id_seq OWNED BY serve_log.id")
+        op.execute("DROP TABLE serve_log_legacy")
+
+    # Partitioned indexes on Postgres, plain indexes on SQLite
+    op.create_index("idx_serve_log_time", "serve_log", ["served_at"])
+    op.create_index("idx_serve_log_prompt", "serve_log", ["prompt_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_serve_log_prompt", table_name="serve_log")
+    op.drop_index("idx_serve_log_time", table_name="serve_log")
+
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute("ALTER TABLE serve_log RENAME TO serve_log_partitioned")
+        op.execute("ALTER TABLE serve_log_partitioned RENAME CONSTRAINT serve_log_pkey TO serve_log_partitioned_pkey")
+        op.execute("""
+            CREATE TABLE serve_log (
+                id INTEGER NOT NULL DEFAULT nextval('serve_log_id_seq'),
+                prompt_id INTEGER NOT NULL REFERENCES prompts (id),
+                served_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+                client_ip VARCHAR(45),
+                user_agent TEXT,
+                PRIMARY KEY (id)
+            )
+        """)
+        op.execute("""
+            INSERT INTO serve_log (id, prompt_id, served_at, client_ip, user_agent)
+            SELECT id, prompt_id, served_at, client_ip, user_agent FROM serve_log_partitioned
+        """)
+        op.execute("ALTER SEQUENCE serve_log_id_seq OWNED BY serve_log.id")
+        op.execute("DROP TABLE serve_log_partitioned CASCADE")
+
+    op.execute("DELETE FROM app_state WHERE key = 'rollup_watermark'")
+    op.drop_table("serve_daily_category")
+    op.drop_table("serve_daily_prompt")
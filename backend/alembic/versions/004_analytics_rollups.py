@@ -0,0 +1,64 @@
+"""Add serve_daily_source, serve_daily_totals, and serve_daily_client
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19
+
+Backfills the source and totals tables from serve_daily_prompt for days that
+were already rolled up. Unique client counts for those days are unknown and
+start at zero.
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "serve_daily_source",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("source", sa.String(50), primary_key=True),
+        sa.Column("serves", sa.Integer(), nullable=False, server_default=sa.text("0")),
+    )
+    op.create_table(
+        "serve_daily_totals",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("serves", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("unique_clients", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("submissions", sa.Integer(), nullable=False, server_default=sa.text("0")),
+    )
+    op.create_table(
+        "serve_daily_client",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("client_ip", sa.String(45), primary_key=True),
+    )
+
+    op.execute("""
+        INSERT INTO serve_daily_totals (day, serves, unique_clients, submissions)
+        SELECT day, SUM(serves), 0, 0 FROM serve_daily_prompt GROUP BY day
+    """)
+    op.execute("""
+        INSERT INTO serve_daily_source (day, source, serves)
+        SELECT serve_daily_prompt.day,
+               CASE
+                   WHEN prompts.source_url = 'user-submission' THEN 'user'
+                   WHEN prompts.source_url LIKE 'https://prompts.chat/%' THEN 'prompts.chat'
+                   ELSE 'anthropic'
+               END,
+               SUM(serve_daily_prompt.serves)
+        FROM serve_daily_prompt
+        JOIN prompts ON prompts.id = serve_daily_prompt.prompt_id
+        GROUP BY 1, 2
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table("serve_daily_client")
+    op.drop_table("serve_daily_totals")
+    op.drop_table("serve_daily_source")
@@ -0,0 +1,29 @@
+"""Add prompts.content_version
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19
+
+Versions prompt content so API workers can cache it: every writer that
+changes title, description, body, system prompt or category bumps it.
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "prompts",
+        sa.Column("content_version", sa.Integer(), nullable=False, server_default=sa.text("1")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("prompts", "content_version")
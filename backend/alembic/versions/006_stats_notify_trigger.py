@@ -0,0 +1,44 @@
+"""NOTIFY stats_changed whenever prompts are inserted, served, reset or deleted
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19
+
+A statement-level trigger, so a bulk reset or a batch insert sends one
+notification (Postgres also folds duplicates within a transaction), and
+every writer — API workers, the scraper, sync and maintenance scripts —
+reaches the /api/stats/stream listeners. No-op on SQLite.
+"""
+from typing import Sequence, Union
+from alembic import op
+
+# revision identifiers
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_stats_changed() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('stats_changed', '');
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER prompts_stats_changed
+        AFTER INSERT OR DELETE OR UPDATE OF is_served ON prompts
+        FOR EACH STATEMENT EXECUTE PROCEDURE notify_stats_changed()
+    """)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("DROP TRIGGER IF EXISTS prompts_stats_changed ON prompts")
+    op.execute("DROP FUNCTION IF EXISTS notify_stats_changed()")
@@ -0,0 +1,33 @@
+"""Index unserved prompts by category for weighted selection
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19
+
+With SELECTION_POLICY=weighted each serve claims from one (source,
+category, age band) bucket; a partial index on the unserved rows keeps
+that claim an index scan however many prompts have been served.
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision: str = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "idx_prompts_unserved_category",
+        "prompts",
+        ["category", "scraped_at"],
+        postgresql_where=sa.text("is_served = FALSE"),
+        sqlite_where=sa.text("is_served = 0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_prompts_unserved_category", table_name="prompts")
@@ -0,0 +1,33 @@
+"""Add prompt_analysis
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19
+
+Persistent cache for POST /api/prompt/analyze and scripts/analyze_prompts.py:
+structure metrics keyed by the sha256 of the prompt text, so the same text
+is only ever analyzed once per analyzer version.
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "prompt_analysis",
+        sa.Column("content_hash", sa.String(64), primary_key=True),
+        sa.Column("analyzer_version", sa.Integer(), nullable=False),
+        sa.Column("metrics", sa.JSON(), nullable=False),
+        sa.Column("analyzed_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("prompt_analysis")
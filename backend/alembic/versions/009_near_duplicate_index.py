@@ -0,0 +1,52 @@
+"""Add the MinHash/LSH near-duplicate index
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19
+
+prompts.minhash holds each prompt's signature and prompts.duplicate_of the
+oldest prompt it nearly copies; prompt_lsh_band maps (band, bucket) to
+prompts so candidates are found by index lookup instead of pairwise
+comparison. Run scripts/index_near_duplicates.py once to fill them for
+existing prompts.
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision: str = "009"
+down_revision: Union[str, None] = "008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("prompts") as batch:
+        batch.add_column(sa.Column("minhash", sa.LargeBinary(), nullable=True))
+        batch.add_column(sa.Column("duplicate_of", sa.Integer(), nullable=True))
+        batch.create_foreign_key(
+            "fk_prompts_duplicate_of", "prompts", ["duplicate_of"], ["id"], ondelete="SET NULL"
+        )
+        batch.create_index("ix_prompts_duplicate_of", ["duplicate_of"])
+
+    op.create_table(
+        "prompt_lsh_band",
+        sa.Column("band", sa.SmallInteger(), primary_key=True),
+        sa.Column("bucket", sa.BigInteger(), primary_key=True),
+        sa.Column(
+            "prompt_id", sa.Integer(),
+            sa.ForeignKey("prompts.id", ondelete="CASCADE"), primary_key=True,
+        ),
+    )
+    op.create_index("idx_prompt_lsh_band_prompt", "prompt_lsh_band", ["prompt_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_prompt_lsh_band_prompt", table_name="prompt_lsh_band")
+    op.drop_table("prompt_lsh_band")
+    with op.batch_alter_table("prompts") as batch:
+        batch.drop_index("ix_prompts_duplicate_of")
+        batch.drop_constraint("fk_prompts_duplicate_of", type_="foreignkey")
+        batch.drop_column("duplicate_of")
+        batch.drop_column("minhash")
@@ -0,0 +1,34 @@
+"""Add precomputed enrichment columns to prompts
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19
+
+char_length, token_estimate, normalized_text and content_hash are computed
+once per content version (enriched_version) instead of per request. Run
+scripts/enrich_prompts.py afterwards to fill them for existing prompts.
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision: str = "010"
+down_revision: Union[str, None] = "009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("prompts", sa.Column("char_length", sa.Integer(), nullable=True))
+    op.add_column("prompts", sa.Column("token_estimate", sa.Integer(), nullable=True))
+    op.add_column("prompts", sa.Column("normalized_text", sa.Text(), nullable=True))
+    op.add_column("prompts", sa.Column("content_hash", sa.String(64), nullable=True))
+    op.add_column("prompts", sa.Column("enriched_version", sa.Integer(), nullable=True))
+    op.create_index("ix_prompts_content_hash", "prompts", ["content_hash"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_prompts_content_hash", table_name="prompts")
+    for column in ("enriched_version", "content_hash", "normalized_text", "token_estimate", "char_length"):
+        op.drop_column("prompts", column)
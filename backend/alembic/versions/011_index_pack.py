@@ -0,0 +1,54 @@
+"""Purpose-built indexes for the claim, stats and serve_log queries
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19
+
+2576c4594769 swapped the partial idx_prompts_unserved for a plain index on
+is_served, which is too unselective to help either the claim or the stats
+counts. This replaces it with two partial indexes, one per side of
+is_served, so the claim reads only unserved rows and both stats counts are
+index-only scans. serve_log's time index now covers the rollup's columns
+on Postgres, and its prompt index includes served_at for the replay check.
+tests/test_query_plans.py asserts the resulting plans.
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision: str = "011"
+down_revision: Union[str, None] = "010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index("ix_prompts_is_served", table_name="prompts")
+    op.create_index(
+        "idx_prompts_unserved", "prompts", ["is_served", "id"],
+        postgresql_where=sa.text("is_served = FALSE"),
+        sqlite_where=sa.text("is_served = 0"),
+    )
+    op.create_index(
+        "idx_prompts_served", "prompts", ["is_served", "id"],
+        postgresql_where=sa.text("is_served = TRUE"),
+        sqlite_where=sa.text("is_served = 1"),
+    )
+
+    op.drop_index("idx_serve_log_time", table_name="serve_log")
+    op.drop_index("idx_serve_log_prompt", table_name="serve_log")
+    op.create_index("idx_serve_log_time", "serve_log", ["served_at"],
+                    postgresql_include=["prompt_id", "client_ip"])
+    op.create_index("idx_serve_log_prompt", "serve_log", ["prompt_id", "served_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_serve_log_prompt", table_name="serve_log")
+    op.drop_index("idx_serve_log_time", table_name="serve_log")
+    op.create_index("idx_serve_log_prompt", "serve_log", ["prompt_id"])
+    op.create_index("idx_serve_log_time", "serve_log", ["served_at"])
+
+    op.drop_index("idx_prompts_served", table_name="prompts")
+    op.drop_index("idx_prompts_unserved", table_name="prompts")
+    op.create_index("ix_prompts_is_served", "prompts", ["is_served"])
@@ -5,12 +5,15 @@ Creates and configures the Flask application with:
   - SQLAlchemy database connection
   - CORS for Vercel frontend
   - Route blueprints
-  - Database initialization (creates tables + seeds app_state)
+  - Database initialization (creates tables, adds new columns on SQLite,
+    seeds app_state)
 """
 
 import os
 from flask import Flask
 from flask_cors import CORS
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
 from config import get_config
 from models import db, AppState
 
@@ -37,18 +40,41 @@ def create_app():
     # Register blueprints
     from routes.prompt import prompt_bp
     from routes.health import health_bp
+    from routes.analytics import analytics_bp
     app.register_blueprint(prompt_bp)
     app.register_blueprint(health_bp)
+    app.register_blueprint(analytics_bp)
 
     # Initialize database tables and seed app_state on first run
     with app.app_context():
         if app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite:"):
-            db.create_all()
+            db.create_all(bind_key=None)  # never the read replica
+            _add_missing_sqlite_columns()
         _ensure_app_state()
 
     return app
 
 
+def _add_missing_sqlite_columns():
+    """
+    Add model columns missing from existing SQLite tables (idempotent).
+
+    create_all() only creates missing tables, so a local database built before
+    a column was introduced would otherwise never get it. Postgres is
+    migrated by Alembic instead.
+    """
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=db.engine.dialect)
+                db.session.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+    db.session.commit()
+
+
 def _ensure_app_state():
     """Ensure app_state rows exist (idempotent)."""
     try:
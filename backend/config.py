@@ -21,10 +21,88 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
 
+    # serve_log retention — rows older than this are rolled up into the
+    # serve_daily_* tables and then dropped (whole monthly partitions on Postgres)
+    SERVE_LOG_RETENTION_DAYS = int(os.getenv("SERVE_LOG_RETENTION_DAYS", "90"))
+    SERVE_LOG_PARTITIONS_AHEAD = int(os.getenv("SERVE_LOG_PARTITIONS_AHEAD", "2"))
+
+    # /api/stats/stream — each open stream holds a worker thread, so cap them
+    # per worker below the gunicorn thread count
+    STATS_STREAM_MAX_CLIENTS = int(os.getenv("STATS_STREAM_MAX_CLIENTS", "16"))
+    STATS_STREAM_MIN_INTERVAL = float(os.getenv("STATS_STREAM_MIN_INTERVAL", "0.5"))
+    STATS_STREAM_HEARTBEAT_SECONDS = float(os.getenv("STATS_STREAM_HEARTBEAT_SECONDS", "15"))
+    STATS_STREAM_MAX_SECONDS = float(os.getenv("STATS_STREAM_MAX_SECONDS", "300"))
+
+    # Largest batch /api/prompt/daily?count=N will serve in one request
+    SERVE_BATCH_MAX = int(os.getenv("SERVE_BATCH_MAX", "10"))
+
+    # Which unserved prompts get served: "random" (uniform) or "weighted" by
+    # bucket — see services/selection.py. Weights are "name=weight,..." lists;
+    # unlisted sources and categories weigh 1.
+    SELECTION_POLICY = os.getenv("SELECTION_POLICY", "random").lower()
+    SELECTION_SOURCE_WEIGHTS = os.getenv("SELECTION_SOURCE_WEIGHTS", "")
+    SELECTION_CATEGORY_WEIGHTS = os.getenv("SELECTION_CATEGORY_WEIGHTS", "")
+    SELECTION_RECENCY_HALF_LIFE_DAYS = float(os.getenv("SELECTION_RECENCY_HALF_LIFE_DAYS", "0"))
+    SELECTION_REFRESH_SECONDS = float(os.getenv("SELECTION_REFRESH_SECONDS", "60"))
+
+    # POST /api/prompt/analyze — largest text accepted, and per-worker LRU size
+    ANALYZE_MAX_CHARS = int(os.getenv("ANALYZE_MAX_CHARS", "100000"))
+    ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "2048"))
+
+    # Near-duplicate detection (MinHash/LSH) — estimated similarity at which a
+    # prompt counts as a copy, and whether copies are left out of serving
+    NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+    SERVE_EXCLUDE_DUPLICATES = os.getenv("SERVE_EXCLUDE_DUPLICATES", "false").lower() == "true"
+
+    # Per-worker cache of prompt text (bytes); serves only claim ids
+    PROMPT_CACHE_MAX_BYTES = int(os.getenv("PROMPT_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
     # Fix for Railway PostgreSQL — they use postgres:// but SQLAlchemy needs postgresql://
     if SQLALCHEMY_DATABASE_URI and SQLALCHEMY_DATABASE_URI.startswith("postgres://"):
         SQLALCHEMY_DATABASE_URI = SQLALCHEMY_DATABASE_URI.replace("postgres://", "postgresql://", 1)
 
+    # Optional read replica for read-only endpoints (stats, analytics).
+    # Reads fall back to the primary while the replica lags by more than
+    # REPLICA_MAX_LAG_SECONDS, or for REPLICA_RETRY_SECONDS after an error.
+    REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
+    if REPLICA_DATABASE_URL and REPLICA_DATABASE_URL.startswith("postgres://"):
+        REPLICA_DATABASE_URL = REPLICA_DATABASE_URL.replace("postgres://", "postgresql://", 1)
+    SQLALCHEMY_BINDS = {}
+    if REPLICA_DATABASE_URL:
+        SQLALCHEMY_BINDS["replica"] = {"url": REPLICA_DATABASE_URL, "pool_pre_ping": True}
+        if REPLICA_DATABASE_URL.startswith("postgresql"):
+            # Fail fast to the primary instead of hanging on a dead host
+            SQLALCHEMY_BINDS["replica"]["connect_args"] = {"connect_timeout": 2}
+    REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "30"))
+    REPLICA_CHECK_INTERVAL_SECONDS = float(os.getenv("REPLICA_CHECK_INTERVAL_SECONDS", "5"))
+    REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+
+    # Fail fast when Postgres is unreachable so degraded mode can take over
+    if SQLALCHEMY_DATABASE_URI.startswith("postgresql"):
+        SQLALCHEMY_ENGINE_OPTIONS = {
+            "pool_pre_ping": True,
+            "connect_args": {"connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", "5"))},
+        }
+
+    # /health/ready — fail readiness when the database round trip is slower
+    # than READINESS_MAX_LATENCY_MS or this share of the pool is checked out;
+    # the probe gives up after READINESS_DB_TIMEOUT_MS
+    READINESS_DB_TIMEOUT_MS = int(os.getenv("READINESS_DB_TIMEOUT_MS", "1000"))
+    READINESS_MAX_LATENCY_MS = float(os.getenv("READINESS_MAX_LATENCY_MS", "250"))
+    READINESS_MAX_POOL_USAGE = float(os.getenv("READINESS_MAX_POOL_USAGE", "0.9"))
+    READINESS_CACHE_SECONDS = float(os.getenv("READINESS_CACHE_SECONDS", "2"))
+
+    # Degraded mode — serve from an in-memory corpus while the database is down
+    DEGRADED_MODE_ENABLED = os.getenv("DEGRADED_MODE_ENABLED", "true").lower() == "true"
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))
+    CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "15"))
+    FALLBACK_REFRESH_SECONDS = float(os.getenv("FALLBACK_REFRESH_SECONDS", "300"))
+    FALLBACK_SNAPSHOT_PATH = os.getenv("FALLBACK_SNAPSHOT_PATH")
+    SERVE_JOURNAL_PATH = os.getenv(
+        "SERVE_JOURNAL_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), ".serve_journal.jsonl"),
+    )
+
 
 class DevelopmentConfig(Config):
     """Development configuration."""
@@ -0,0 +1,89 @@
+"""
+Gunicorn configuration — production entry point (`gunicorn -c gunicorn.conf.py app:app`).
+
+  - preload_app: the app is built once in the master, then forked
+  - on_starting: warm the read-mostly caches (services/warmup.py), close the
+    master's database connections and gc.freeze() what is loaded, so workers
+    share those pages copy-on-write instead of each rebuilding them
+  - post_fork: discard the inherited connection pools; each worker opens
+    its own connections on first use
+
+Sizing, unless WEB_CONCURRENCY / GUNICORN_THREADS are set: one worker per
+CPU this process may use (the scheduler affinity, capped by a cgroup CPU
+quota), at least 2, and no more than DB_MAX_CONNECTIONS allows if set, at
+POOL_CONNECTIONS_PER_WORKER each. Each worker runs BASE_THREADS request
+threads plus one per allowed /api/stats/stream client, since each open
+stream holds a thread.
+"""
+
+import gc
+import os
+import math
+
+BASE_THREADS = 8
+# SQLAlchemy's QueuePool defaults: pool_size 5 + max_overflow 10
+POOL_CONNECTIONS_PER_WORKER = 15
+
+
+def _cgroup_cpu_limit():
+    """CPUs allowed by the cgroup quota (v2 cpu.max, else v1 CFS), or None if unlimited."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max", encoding="ascii") as f:
+            quota, period = f.read().split()[:2]
+    except (OSError, ValueError):
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", encoding="ascii") as f:
+                quota = f.read().strip()
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us", encoding="ascii") as f:
+                period = f.read().strip()
+        except OSError:
+            return None
+    if quota in ("max", "-1"):
+        return None
+    try:
+        return max(1, math.ceil(int(quota) / int(period)))
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def _cpu_count():
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    return min(cpus, limit) if limit else cpus
+
+
+def _workers():
+    workers = max(2, _cpu_count())
+    budget = os.getenv("DB_MAX_CONNECTIONS")
+    if budget:
+        workers = min(workers, max(1, int(budget) // POOL_CONNECTIONS_PER_WORKER))
+    return workers
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+worker_class = "gthread"
+workers = int(os.getenv("WEB_CONCURRENCY") or _workers())
+threads = int(os.getenv("GUNICORN_THREADS") or BASE_THREADS + int(os.getenv("STATS_STREAM_MAX_CLIENTS", "16")))
+timeout = 120
+preload_app = True
+
+
+def on_starting(server):
+    from app import app
+    from services.warmup import warm_up, dispose_engines
+
+    server.log.info(f"{workers} workers × {threads} threads ({_cpu_count()} CPUs available).")
+    warm_up(app)
+    dispose_engines(app)
+    # Keep the collector from touching (and so un-sharing) the warmed objects
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from app import app
+    from services.warmup import dispose_engines
+
+    dispose_engines(app, close=False)
@@ -1,4 +1,4 @@
 from app import app, db
 with app.app_context():
-    db.create_all()
+    db.create_all(bind_key=None)
 print("Database tables created.")
@@ -4,6 +4,10 @@ SQLAlchemy models for Daily Prompt.
 Tables:
   - prompts: Stores all scraped prompts and their serving state.
   - serve_log: Audit trail of every prompt delivery.
+  - serve_daily_*: Daily rollups of serve_log (per prompt, category, source,
+    plus per-day totals) that back the analytics API.
+  - prompt_lsh_band: LSH buckets of each prompt's MinHash signature (near duplicates).
+  - prompt_analysis: Cached structure metrics per prompt text (by content hash).
   - app_state: Key-value store for global counters (e.g., serve_counter).
 """
 
@@ -17,6 +21,27 @@ class Prompt(db.Model):
     """A single prompt scraped from Anthropic's Prompt Library."""
 
     __tablename__ = "prompts"
+    # Partial indexes on the serving state (revision 011): the claim reads
+    # only unserved rows and stats count each side with an index-only scan.
+    # The SQLite predicates must match the "= 0"/"= 1" that SQLAlchemy renders.
+    # Weighted selection claims from one category at a time (revision 007).
+    __table_args__ = (
+        db.Index(
+            "idx_prompts_unserved", "is_served", "id",
+            postgresql_where=db.text("is_served = FALSE"),
+            sqlite_where=db.text("is_served = 0"),
+        ),
+        db.Index(
+            "idx_prompts_served", "is_served", "id",
+            postgresql_where=db.text("is_served = TRUE"),
+            sqlite_where=db.text("is_served = 1"),
+        ),
+        db.Index(
+            "idx_prompts_unserved_category", "category", "scraped_at",
+            postgresql_where=db.text("is_served = FALSE"),
+            sqlite_where=db.text("is_served = 0"),
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
@@ -31,9 +56,24 @@ class Prompt(db.Model):
         nullable=False,
         default=lambda: datetime.now(timezone.utc),
     )
+    # Bumped whenever the content above changes; keys the prompt content cache
+    content_version = db.Column(db.Integer, nullable=False, default=1, server_default=db.text("1"))
+
+    # Derived from the content above (services/enrichment.py); enriched_version
+    # is the content_version they were computed for
+    char_length = db.Column(db.Integer)
+    token_estimate = db.Column(db.Integer)
+    normalized_text = db.Column(db.Text)
+    content_hash = db.Column(db.String(64), index=True)
+    enriched_version = db.Column(db.Integer)
+
+    # Near-duplicate index (services/near_duplicates.py): MinHash signature of
+    # prompt_body, and the oldest prompt of the cluster this one copies
+    minhash = db.Column(db.LargeBinary)
+    duplicate_of = db.Column(db.Integer, db.ForeignKey("prompts.id", ondelete="SET NULL"), index=True)
 
     # Serving state
-    is_served = db.Column(db.Boolean, nullable=False, default=False, index=True)
+    is_served = db.Column(db.Boolean, nullable=False, default=False)
     served_at = db.Column(db.DateTime(timezone=True))
     serve_order = db.Column(db.Integer)
 
@@ -62,6 +102,14 @@ class ServeLog(db.Model):
     """Audit log entry for each prompt delivery."""
 
     __tablename__ = "serve_log"
+    # On PostgreSQL the table is range-partitioned by month on served_at
+    # (primary key (id, served_at)); see alembic revision 003. The time index
+    # covers the rollup's columns there; (prompt_id, served_at) answers the
+    # degraded-mode replay check (revision 011).
+    __table_args__ = (
+        db.Index("idx_serve_log_time", "served_at", postgresql_include=["prompt_id", "client_ip"]),
+        db.Index("idx_serve_log_prompt", "prompt_id", "served_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     prompt_id = db.Column(db.Integer, db.ForeignKey("prompts.id"), nullable=False)
@@ -77,6 +125,107 @@ class ServeLog(db.Model):
         return f"<ServeLog prompt={self.prompt_id} at={self.served_at}>"
 
 
+class ServeDailyPrompt(db.Model):
+    """Number of serves of one prompt on one (UTC) day."""
+
+    __tablename__ = "serve_daily_prompt"
+
+    day = db.Column(db.Date, primary_key=True)
+    prompt_id = db.Column(db.Integer, db.ForeignKey("prompts.id"), primary_key=True)
+    serves = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ServeDailyPrompt {self.day} prompt={self.prompt_id} serves={self.serves}>"
+
+
+class ServeDailyCategory(db.Model):
+    """Number of serves of one category on one (UTC) day."""
+
+    __tablename__ = "serve_daily_category"
+
+    day = db.Column(db.Date, primary_key=True)
+    category = db.Column(db.String(100), primary_key=True)
+    serves = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ServeDailyCategory {self.day} {self.category} serves={self.serves}>"
+
+
+class ServeDailySource(db.Model):
+    """Number of serves of prompts from one source (anthropic, prompts.chat, user) on one day."""
+
+    __tablename__ = "serve_daily_source"
+
+    day = db.Column(db.Date, primary_key=True)
+    source = db.Column(db.String(50), primary_key=True)
+    serves = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ServeDailySource {self.day} {self.source} serves={self.serves}>"
+
+
+class ServeDailyTotal(db.Model):
+    """Per-day serve, unique client, and user submission counts."""
+
+    __tablename__ = "serve_daily_totals"
+
+    day = db.Column(db.Date, primary_key=True)
+    serves = db.Column(db.Integer, nullable=False, default=0)
+    unique_clients = db.Column(db.Integer, nullable=False, default=0)
+    submissions = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ServeDailyTotal {self.day} serves={self.serves}>"
+
+
+class ServeDailyClient(db.Model):
+    """
+    Distinct clients seen on a day that is still open for rollup.
+
+    Only kept until the day is complete; its count then lives on in
+    serve_daily_totals.unique_clients.
+    """
+
+    __tablename__ = "serve_daily_client"
+
+    day = db.Column(db.Date, primary_key=True)
+    client_ip = db.Column(db.String(45), primary_key=True)
+
+
+class PromptLshBand(db.Model):
+    """One LSH band bucket of a prompt's MinHash signature; shared buckets mean candidate duplicates."""
+
+    __tablename__ = "prompt_lsh_band"
+    __table_args__ = (
+        db.Index("idx_prompt_lsh_band_prompt", "prompt_id"),
+    )
+
+    band = db.Column(db.SmallInteger, primary_key=True)
+    bucket = db.Column(db.BigInteger, primary_key=True)
+    prompt_id = db.Column(db.Integer, db.ForeignKey("prompts.id", ondelete="CASCADE"), primary_key=True)
+
+    def __repr__(self):
+        return f"<PromptLshBand {self.band}:{self.bucket} prompt={self.prompt_id}>"
+
+
+class PromptAnalysis(db.Model):
+    """Structure metrics for a prompt text, keyed by its content hash (see services/prompt_analyzer.py)."""
+
+    __tablename__ = "prompt_analysis"
+
+    content_hash = db.Column(db.String(64), primary_key=True)
+    analyzer_version = db.Column(db.Integer, nullable=False)
+    metrics = db.Column(db.JSON, nullable=False)
+    analyzed_at = db.Column(
+        db.DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+    )
+
+    def __repr__(self):
+        return f"<PromptAnalysis {self.content_hash[:12]} v{self.analyzer_version}>"
+
+
 class AppState(db.Model):
     """Key-value store for global application state."""
 
@@ -0,0 +1,50 @@
+"""
+Route: /api/analytics/* — Serve analytics read from the daily rollup tables.
+
+All endpoints accept ?days=N (default 30, max 365). Each response carries
+"as_of", the point up to which serve_log has been rolled up.
+"""
+
+from flask import Blueprint, jsonify, request
+from services.analytics_service import (
+    serves_over_time,
+    top_categories,
+    served_vs_submitted,
+    unique_clients_per_day,
+)
+
+analytics_bp = Blueprint("analytics", __name__)
+
+
+def _analytics_response(fn, **kwargs):
+    try:
+        return jsonify(fn(days=request.args.get("days", 30, type=int), **kwargs)), 200
+    except Exception as e:
+        return jsonify({
+            "error": "service_error",
+            "message": "Failed to fetch analytics.",
+        }), 503
+
+
+@analytics_bp.route("/api/analytics/serves", methods=["GET"])
+def serves():
+    """GET /api/analytics/serves — Serves per day."""
+    return _analytics_response(serves_over_time)
+
+
+@analytics_bp.route("/api/analytics/categories", methods=["GET"])
+def categories():
+    """GET /api/analytics/categories — Most-served categories (?limit=N, default 10)."""
+    return _analytics_response(top_categories, limit=request.args.get("limit", 10, type=int))
+
+
+@analytics_bp.route("/api/analytics/served-vs-submitted", methods=["GET"])
+def served_submitted():
+    """GET /api/analytics/served-vs-submitted — Serves by source against user submissions."""
+    return _analytics_response(served_vs_submitted)
+
+
+@analytics_bp.route("/api/analytics/clients", methods=["GET"])
+def clients():
+    """GET /api/analytics/clients — Unique clients per day."""
+    return _analytics_response(unique_clients_per_day)
@@ -1,8 +1,10 @@
 """
-Route: /health — Railway health check endpoint.
+Route: /health — Railway health check endpoint (liveness).
+Route: /health/ready — Readiness: database round trip and pool usage.
 """
 
 from flask import Blueprint, jsonify
+from services.readiness import check_readiness
 
 health_bp = Blueprint("health", __name__)
 
@@ -11,3 +13,16 @@ health_bp = Blueprint("health", __name__)
 def health_check():
     """Simple health check for Railway monitoring."""
     return jsonify({"status": "ok"}), 200
+
+
+@health_bp.route("/health/ready", methods=["GET"])
+def readiness_check():
+    """
+    GET /health/ready
+    200 while this worker can serve; 503 when the database is unreachable or
+    slow, or the connection pool is saturated. Results are cached for
+    READINESS_CACHE_SECONDS (see services/readiness.py).
+    """
+    result = check_readiness()
+    status = "ready" if result["ready"] else "not_ready"
+    return jsonify({"status": status, **result}), 200 if result["ready"] else 503
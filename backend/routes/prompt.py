@@ -1,10 +1,21 @@
 """
-Route: /api/prompt/daily — Serve the next unserved prompt.
+Route: /api/prompt/daily — Serve the next unserved prompt (or ?count=N of them).
 Route: /api/stats — Return prompt statistics.
+Route: /api/stats/stream — Server-Sent Events feed of prompt statistics.
+Route: /api/prompt/analyze — Structure metrics for a prompt's text.
 """
 
-from flask import Blueprint, jsonify, request
-from services.prompt_service import serve_next_prompt, get_stats
+import json
+import time
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from services.prompt_service import get_stats
+from services.fallback_service import serve_prompt
+from services.stats_stream import get_broadcaster, publish_stats_changed
+from services.analytics_service import record_submission
+from services.classifier import categorize
+from services.prompt_analyzer import analyze_prompt
+from services.near_duplicates import index_prompts
+from services.enrichment import enrich
 
 prompt_bp = Blueprint("prompt", __name__)
 
@@ -15,13 +26,31 @@ def daily_prompt():
     GET /api/prompt/daily
 
     Atomically selects a random unserved prompt, marks it as served,
-    and returns it. Returns 404 if all prompts are exhausted.
+    and returns it. Returns 404 if all prompts are exhausted. While the
+    database is unavailable the prompt comes from the in-memory fallback
+    corpus and the response carries "degraded": true.
+
+    With ?count=N (capped at SERVE_BATCH_MAX), serves N distinct prompts in
+    one transaction and returns {"prompts": [...], "stats": {...}}.
     """
     client_ip = request.headers.get("X-Forwarded-For", request.remote_addr)
     user_agent = request.headers.get("User-Agent", "")
 
+    count = request.args.get("count")
+    if count is not None:
+        try:
+            count = int(count)
+        except ValueError:
+            count = 0
+        if count < 1:
+            return jsonify({
+                "error": "invalid_count",
+                "message": "count must be a positive integer.",
+            }), 400
+        count = min(count, current_app.config["SERVE_BATCH_MAX"])
+
     try:
-        result = serve_next_prompt(client_ip=client_ip, user_agent=user_agent)
+        result = serve_prompt(client_ip=client_ip, user_agent=user_agent, count=count)
     except Exception as e:
         return jsonify({
             "error": "service_error",
@@ -55,12 +84,93 @@ def stats():
         }), 503
 
 
+@prompt_bp.route("/api/stats/stream", methods=["GET"])
+def stats_stream():
+    """
+    GET /api/stats/stream
+
+    Server-Sent Events: sends the current stats on connect, then a new
+    snapshot only when served/total/remaining change. Comments keep idle
+    connections alive, and the stream ends after STATS_STREAM_MAX_SECONDS
+    (EventSource reconnects on its own). Returns 503 when this worker
+    already holds STATS_STREAM_MAX_CLIENTS streams.
+    """
+    app = current_app._get_current_object()
+    config = app.config
+    broadcaster = get_broadcaster(app)
+    if not broadcaster.try_subscribe(config["STATS_STREAM_MAX_CLIENTS"]):
+        return jsonify({
+            "error": "stream_unavailable",
+            "message": "Too many live stats connections. Use /api/stats instead.",
+        }), 503
+
+    def events():
+        try:
+            yield "retry: 5000\n\n"
+            deadline = time.monotonic() + config["STATS_STREAM_MAX_SECONDS"]
+            version, stats = broadcaster.wait_for_change(0, timeout=5)
+            if stats is not None:
+                yield f"data: {json.dumps(stats)}\n\n"
+            while time.monotonic() < deadline:
+                new_version, stats = broadcaster.wait_for_change(
+                    version, timeout=config["STATS_STREAM_HEARTBEAT_SECONDS"]
+                )
+                if new_version != version and stats is not None:
+                    version = new_version
+                    yield f"data: {json.dumps(stats)}\n\n"
+                else:
+                    yield ": keepalive\n\n"
+        finally:
+            broadcaster.unsubscribe()
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+
+@prompt_bp.route("/api/prompt/analyze", methods=["POST"])
+def analyze():
+    """
+    POST /api/prompt/analyze
+
+    Accepts {"prompt_body": ..., "system_prompt": ...} and returns
+    deterministic structure metrics: sections, XML tags, system prompt,
+    variable placeholders, length and an approximate token count. Results
+    are cached by content hash, so repeated analyses of the same text are
+    free; "cached" says whether this one was.
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "invalid_request", "message": "No JSON payload provided"}), 400
+
+    prompt_body = data.get("prompt_body") or ""
+    system_prompt = data.get("system_prompt") or ""
+    if not isinstance(prompt_body, str) or not isinstance(system_prompt, str) or not prompt_body.strip():
+        return jsonify({"error": "validation_error", "message": "prompt_body is required"}), 400
+    if len(prompt_body) + len(system_prompt) > current_app.config["ANALYZE_MAX_CHARS"]:
+        return jsonify({
+            "error": "validation_error",
+            "message": f"Prompt is longer than {current_app.config['ANALYZE_MAX_CHARS']} characters",
+        }), 413
+
+    try:
+        content_hash, metrics, cached = analyze_prompt(prompt_body, system_prompt)
+    except Exception as e:
+        return jsonify({
+            "error": "service_error",
+            "message": "Failed to analyze prompt. Please try again.",
+        }), 503
+    return jsonify({"content_hash": content_hash, "cached": cached, **metrics}), 200
+
+
 @prompt_bp.route("/api/prompt", methods=["POST"])
 def create_prompt():
     """
     POST /api/prompt
 
     Accepts a custom user prompt and saves it to the database for future serving.
+    The response's "duplicate_of" names an existing prompt it nearly copies, if any.
     """
     data = request.get_json()
     if not data:
@@ -72,8 +182,8 @@ def create_prompt():
     if not title or not prompt_body:
         return jsonify({"error": "validation_error", "message": "Title and Prompt Body are required"}), 400
         
-    category = data.get("category", "custom").strip() or "custom"
     description = data.get("description", "").strip()
+    category = data.get("category", "").strip() or categorize(title, description, prompt_body)
     
     # Import db and models
     from models import db, Prompt
@@ -88,16 +198,23 @@ def create_prompt():
         prompt_body=prompt_body,
         category=category,
         source_slug=slug,
-        source_url="user-submission"
+        source_url="user-submission",
+        enriched_version=1,
+        **enrich(title, description, prompt_body, ""),
     )
     
     try:
         db.session.add(new_prompt)
+        db.session.flush()
+        duplicates = index_prompts(db.session, [new_prompt.id])
+        record_submission()
         db.session.commit()
+        publish_stats_changed()
         return jsonify({
             "message": "Prompt submitted successfully!",
             "id": new_prompt.id,
-            "slug": new_prompt.source_slug
+            "slug": new_prompt.source_slug,
+            "duplicate_of": duplicates.get(new_prompt.id),
         }), 201
     except Exception as e:
         db.session.rollback()
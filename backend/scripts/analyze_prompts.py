@@ -0,0 +1,102 @@
+"""
+Batch structure analysis: run the prompt analyzer over the whole corpus.
+
+Usage:
+    python scripts/analyze_prompts.py
+
+Results go into prompt_analysis, the same content-hash-keyed table behind
+POST /api/prompt/analyze, so texts that were already analyzed (by this
+script or the API, under the current ANALYZER_VERSION) are skipped and
+identical texts are analyzed once. Prints a corpus-wide summary at the end.
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+from collections import Counter
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+from app import create_app
+from models import db, Prompt, PromptAnalysis
+from services.prompt_analyzer import ANALYZER_VERSION, analysis_key, analyze_text, store_analyses
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def _known_hashes(keys):
+    return set(db.session.scalars(
+        select(PromptAnalysis.content_hash).where(
+            PromptAnalysis.content_hash.in_(keys),
+            PromptAnalysis.analyzer_version == ANALYZER_VERSION,
+        )
+    ))
+
+
+def analyze_corpus():
+    """Analyze every prompt whose text has no current analysis; returns a summary Counter."""
+    started = time.monotonic()
+    scanned = analyzed = 0
+    summary = Counter()
+
+    # Keyset pages by id, so each page can be committed on its own
+    after = 0
+    while True:
+        rows = db.session.execute(
+            select(Prompt.id, Prompt.prompt_body, Prompt.system_prompt)
+            .where(Prompt.id > after)
+            .order_by(Prompt.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        after = rows[-1].id
+        scanned += len(rows)
+
+        pending = {analysis_key(row.prompt_body, row.system_prompt): row for row in rows}
+        known = _known_hashes(list(pending))
+        results = {
+            key: analyze_text(row.prompt_body, row.system_prompt)
+            for key, row in pending.items() if key not in known
+        }
+        store_analyses(db.session, results)
+        db.session.commit()
+        analyzed += len(results)
+
+    for (metrics,) in db.session.query(PromptAnalysis.metrics).filter_by(analyzer_version=ANALYZER_VERSION):
+        summary["texts"] += 1
+        summary["with_xml_tags"] += bool(metrics["xml_tags"]["count"])
+        summary["with_variables"] += bool(metrics["variables"]["count"])
+        summary["with_sections"] += bool(metrics["sections"]["count"])
+        summary["with_system_prompt"] += metrics["system_prompt"]["present"]
+        summary["approx_tokens"] += metrics["approx_tokens"]
+
+    logger.info(f"Scanned {scanned} prompts in {time.monotonic() - started:.2f}s; "
+                f"analyzed {analyzed} new texts.")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze the structure of every prompt in the corpus.")
+    parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        summary = analyze_corpus()
+
+    texts = summary["texts"] or 1
+    logger.info(f"Analyzed texts: {summary['texts']}")
+    for key in ("with_xml_tags", "with_variables", "with_sections", "with_system_prompt"):
+        logger.info(f"  {key.replace('_', ' ')}: {summary[key]} ({summary[key] / texts:.0%})")
+    logger.info(f"  average approx tokens: {summary['approx_tokens'] / texts:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Offline extraction benchmark and regression check for the scraper.
+
+Usage:
+    python scripts/scrape_prompts.py --record fixtures/library     # once, with network
+    python scripts/bench_extraction.py fixtures/library             # parse HTML directly
+    python scripts/bench_extraction.py fixtures/library --playwright
+    python scripts/bench_extraction.py fixtures/library --repeat 20
+
+Re-extracts every recorded page and compares the result with the
+expected.json written at record time, then reports throughput. Whitespace
+runs are collapsed before comparing, since the direct parser reads text
+content where the browser reads rendered inner text.
+
+Exits non-zero if any page no longer extracts to the recorded result.
+"""
+
+import os
+import re
+import sys
+import time
+import asyncio
+import argparse
+
+import scrape_prompts
+from scrape_fixtures import LIBRARY_FILE, PAGES_DIR, load_expected
+
+COMPARED_FIELDS = ("title", "description", "prompt_body", "system_prompt", "category", "source_url")
+
+
+def _normalize(value):
+    return re.sub(r"\s+", " ", value or "").strip()
+
+
+def compare(expected, actual):
+    """Return {slug: [field, ...]} for every slug whose extraction differs."""
+    mismatches = {}
+    for slug, want in expected.items():
+        got = actual.get(slug)
+        if got is None:
+            mismatches[slug] = ["<missing>"]
+            continue
+        fields = [f for f in COMPARED_FIELDS if _normalize(want.get(f)) != _normalize(got.get(f))]
+        if fields:
+            mismatches[slug] = fields
+    return mismatches
+
+
+def extract_direct(fixture_dir):
+    """Parse the recorded library and detail pages without a browser."""
+    with open(os.path.join(fixture_dir, LIBRARY_FILE), encoding="utf-8") as f:
+        slugs = scrape_prompts.parse_library_html(f.read())
+
+    results = {}
+    for slug in slugs:
+        path = os.path.join(fixture_dir, PAGES_DIR, f"{slug}.html")
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            results[slug] = scrape_prompts.parse_prompt_html(f.read(), slug)
+    return results
+
+
+def extract_playwright(fixture_dir, pages):
+    """Run the real scraper against the fixtures via request routing."""
+    collected = []
+    asyncio.run(scrape_prompts.run(1, pages, 0, profile="lite", replay_dir=fixture_dir,
+                                   dry_run=True, results=collected))
+    return {p["source_slug"]: p for p in collected}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scraper extraction against recorded fixtures.")
+    parser.add_argument("fixture_dir")
+    parser.add_argument("--playwright", action="store_true",
+                        help="Replay through Chromium instead of parsing HTML directly.")
+    parser.add_argument("--pages", type=int, default=4, help="Concurrent pages in --playwright mode.")
+    parser.add_argument("--repeat", type=int, default=1, help="Extraction passes to time.")
+    args = parser.parse_args()
+
+    expected = load_expected(args.fixture_dir)
+
+    started = time.monotonic()
+    for _ in range(max(1, args.repeat)):
+        if args.playwright:
+            actual = extract_playwright(args.fixture_dir, args.pages)
+        else:
+            actual = extract_direct(args.fixture_dir)
+    elapsed = time.monotonic() - started
+
+    pages = len(actual) * max(1, args.repeat)
+    mode = "playwright replay" if args.playwright else "direct parse"
+    print(f"📊 {mode}: {pages} pages in {elapsed:.2f}s ({pages / elapsed if elapsed else 0:.1f} pages/s)")
+
+    mismatches = compare(expected, actual)
+    if mismatches:
+        for slug, fields in sorted(mismatches.items()):
+            print(f"  ❌ {slug}: {', '.join(fields)}")
+        print(f"❌ {len(mismatches)}/{len(expected)} pages differ from expected.json")
+        sys.exit(1)
+    print(f"✅ All {len(expected)} recorded pages match expected.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Maintenance job: roll up serve_log into daily tables and apply retention.
+
+Usage:
+    python scripts/compact_serve_log.py
+    python scripts/compact_serve_log.py --retention-days 30
+
+Intended to run from cron. Each run only aggregates the serves logged since
+the previous one, so running it every few minutes keeps /api/analytics/*
+fresh at negligible cost. Safe to re-run at any time:
+  1. Creates upcoming monthly serve_log partitions (PostgreSQL)
+  2. Folds new serve_log rows into the serve_daily_* rollup tables
+  3. Drops partitions (or deletes rows on SQLite) older than the retention window
+"""
+
+import os
+import sys
+import argparse
+import logging
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from services.serve_log_service import ensure_partitions, apply_retention
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Roll up and prune serve_log.")
+    parser.add_argument("--retention-days", type=int, default=None,
+                        help="Override SERVE_LOG_RETENTION_DAYS for this run.")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        created = ensure_partitions()
+        if created:
+            logger.info(f"Created partitions: {', '.join(created)}")
+
+        result = apply_retention(retention_days=args.retention_days)
+        rollup = result["rollup"]
+        logger.info(f"Rolled up {rollup['rows']} serve_log rows ({rollup['start']} → {rollup['end']}).")
+        if result["dropped_partitions"]:
+            logger.info(f"Dropped partitions: {', '.join(result['dropped_partitions'])}")
+        logger.info(f"Deleted {result['deleted_rows']} rows older than {result['cutoff']}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Enrichment backfill: compute derived prompt columns across a process pool.
+
+Usage:
+    python scripts/enrich_prompts.py                # rows behind their content_version
+    python scripts/enrich_prompts.py --all          # recompute every row
+    python scripts/enrich_prompts.py --workers 8
+
+Finds prompts whose enriched_version differs from content_version (never
+enriched, or changed by a writer that does not enrich inline, such as the
+Playwright scraper), computes char_length, token_estimate, normalized_text
+and content_hash in worker processes, and writes them back in batches. Each
+update is guarded by the content_version that was read, so a prompt edited
+mid-run is left for the next run instead of being stamped with stale values.
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import bindparam, or_, select, update
+from app import create_app
+from models import db, Prompt
+from services.enrichment import DERIVED_COLUMNS, enrich_batch
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 2000
+CHUNK_SIZE = 250  # rows per task handed to a worker process
+
+
+def _stale_page(after, everything):
+    query = (
+        select(Prompt.id, Prompt.content_version, Prompt.title, Prompt.description,
+               Prompt.prompt_body, Prompt.system_prompt)
+        .where(Prompt.id > after)
+        .order_by(Prompt.id)
+        .limit(BATCH_SIZE)
+    )
+    if not everything:
+        query = query.where(or_(Prompt.enriched_version.is_(None),
+                                Prompt.enriched_version != Prompt.content_version))
+    return [tuple(row) for row in db.session.execute(query)]
+
+
+def enrich_corpus(workers=None, everything=False):
+    """Enrich stale prompts page by page; returns the number of rows written."""
+    table = Prompt.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("b_id"), table.c.content_version == bindparam("b_version"))
+        .values(enriched_version=bindparam("b_version"),
+                **{col: bindparam(col) for col in DERIVED_COLUMNS})
+    )
+
+    started = time.monotonic()
+    written = 0
+    after = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            rows = _stale_page(after, everything)
+            if not rows:
+                break
+            after = rows[-1][0]
+            chunks = [rows[i:i + CHUNK_SIZE] for i in range(0, len(rows), CHUNK_SIZE)]
+            params = [item for result in pool.map(enrich_batch, chunks) for item in result]
+            db.session.connection().execute(stmt, params)
+            db.session.commit()
+            written += len(params)
+            elapsed = time.monotonic() - started
+            logger.info(f"Enriched {written} prompts ({written / elapsed if elapsed else 0:.0f} rows/s).")
+
+    logger.info(f"Done: {written} prompts enriched in {time.monotonic() - started:.2f}s.")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill derived prompt columns in parallel.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: one per CPU).")
+    parser.add_argument("--all", action="store_true", help="Recompute every prompt, not just stale ones.")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        enrich_corpus(workers=args.workers, everything=args.all)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Near-duplicate backfill: MinHash/LSH-index prompts that have no signature yet.
+
+Usage:
+    python scripts/index_near_duplicates.py           # index unindexed prompts
+    python scripts/index_near_duplicates.py --all     # rebuild the whole index
+    python scripts/index_near_duplicates.py --threshold 0.7
+
+New prompts are indexed as they are ingested (prompts.chat sync, user
+submissions); this fills in everything else, such as the scraped library
+or rows that existed before the index did. Pages are processed in id order
+and committed one at a time, so older prompts become cluster roots.
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+from collections import Counter
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, update
+from app import create_app
+from models import db, Prompt, PromptLshBand
+from services.near_duplicates import index_prompts
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def index_corpus(rebuild=False, threshold=None):
+    """Index prompts page by page; returns the number of prompts flagged as duplicates."""
+    if rebuild:
+        db.session.execute(PromptLshBand.__table__.delete())
+        db.session.execute(update(Prompt).values(minhash=None, duplicate_of=None))
+        db.session.commit()
+
+    started = time.monotonic()
+    indexed = flagged = 0
+    after = 0
+    while True:
+        ids = db.session.scalars(
+            select(Prompt.id)
+            .where(Prompt.id > after, Prompt.minhash.is_(None))
+            .order_by(Prompt.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not ids:
+            break
+        after = ids[-1]
+        flagged += len(index_prompts(db.session, ids, threshold=threshold))
+        db.session.commit()
+        indexed += len(ids)
+        logger.info(f"Indexed {indexed} prompts ({flagged} near duplicates so far).")
+
+    logger.info(f"Indexed {indexed} prompts in {time.monotonic() - started:.2f}s; "
+                f"{flagged} flagged as near duplicates.")
+
+    clusters = Counter(db.session.scalars(select(Prompt.duplicate_of).where(Prompt.duplicate_of.is_not(None))))
+    for root, copies in clusters.most_common(10):
+        logger.info(f"  prompt {root}: {copies} near duplicates")
+    return flagged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the MinHash/LSH near-duplicate index.")
+    parser.add_argument("--all", action="store_true", help="Drop and rebuild the whole index.")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="Similarity threshold (default: NEAR_DUPLICATE_THRESHOLD).")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        index_corpus(rebuild=args.all, threshold=args.threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Bulk reclassification: re-run the shared keyword classifier over the corpus.
+
+Usage:
+    python scripts/reclassify_prompts.py            # apply changes
+    python scripts/reclassify_prompts.py --dry-run  # report only
+
+User submissions keep the category their author chose unless --include-user
+is given. prompts.chat rows are left alone: the sync classifies them with the
+upstream category as a hint, which is not stored, so classifying them here
+without it would fight every later sync. Only rows whose category actually
+changes are updated, in batches.
+
+Category is not part of a prompt's content: content_version is left as is
+(so cached prompt text stays valid), and serving reads the category fresh
+with each claim.
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+from collections import Counter
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import update
+from app import create_app
+from models import db, Prompt
+from services.classifier import categorize
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def reclassify(dry_run=False, include_user=False):
+    """Classify every prompt and write back the ones whose category changed."""
+    query = db.session.query(Prompt.id, Prompt.title, Prompt.description, Prompt.prompt_body,
+                             Prompt.category)
+    query = query.filter(Prompt.source_url.notlike("https://prompts.chat/%"))
+    if not include_user:
+        query = query.filter(Prompt.source_url != "user-submission")
+
+    started = time.monotonic()
+    scanned = 0
+    changes = []
+    moves = Counter()
+    for prompt_id, title, description, body, current in query.yield_per(BATCH_SIZE):
+        scanned += 1
+        category = categorize(title, description, body)
+        if category != current:
+            changes.append({"id": prompt_id, "category": category})
+            moves[(current, category)] += 1
+    elapsed = time.monotonic() - started
+
+    logger.info(f"Classified {scanned} prompts in {elapsed:.2f}s; {len(changes)} would change.")
+    for (old, new), count in moves.most_common(10):
+        logger.info(f"  {old} → {new}: {count}")
+
+    if dry_run or not changes:
+        return len(changes)
+
+    for i in range(0, len(changes), BATCH_SIZE):
+        db.session.execute(update(Prompt), changes[i:i + BATCH_SIZE])
+    db.session.commit()
+    logger.info(f"Updated {len(changes)} prompts.")
+    return len(changes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reclassify prompts with the shared keyword classifier.")
+    parser.add_argument("--dry-run", action="store_true", help="Report changes without writing them.")
+    parser.add_argument("--include-user", action="store_true",
+                        help="Also reclassify user submissions.")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        reclassify(dry_run=args.dry_run, include_user=args.include_user)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+On-disk cache for the Playwright scraper.
+
+One entry per slug, stored as two files in the cache directory:
+  <slug>.json — validators (ETag / Last-Modified), a hash of the raw HTTP body,
+                the extracted prompt and a hash of it
+  <slug>.html — the last rendered HTML of the detail page
+
+The scraper uses an entry to skip work on re-runs: a 304 (or an identical raw
+body) means the page was not re-rendered at all, and an identical extracted
+result means nothing needs to be written to the database.
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+from datetime import datetime, timezone
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".scrape_cache"
+)
+
+
+def content_hash(data):
+    """sha256 hex digest of bytes, str, or a JSON-serialisable object."""
+    if isinstance(data, (dict, list)):
+        data = json.dumps(data, sort_keys=True, ensure_ascii=False)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class ScrapeCache:
+    """Slug-keyed store of rendered pages, extracted results, and HTTP validators."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, slug, ext):
+        return os.path.join(self.cache_dir, f"{slug}.{ext}")
+
+    def get(self, slug):
+        """Return the cached entry dict for slug, or None."""
+        try:
+            with open(self._path(slug, "json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get_html(self, slug):
+        """Return the last rendered HTML for slug, or None."""
+        try:
+            with open(self._path(slug, "html"), encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, slug, entry, html=None):
+        """Write an entry (and optionally its rendered HTML) atomically."""
+        entry = dict(entry, cached_at=datetime.now(timezone.utc).isoformat())
+        if entry.get("result") is not None:
+            entry["result_hash"] = content_hash(entry["result"])
+        if html is not None:
+            entry["html_hash"] = content_hash(html)
+            self._write(self._path(slug, "html"), html)
+        self._write(self._path(slug, "json"), json.dumps(entry, indent=2, ensure_ascii=False))
+
+    def _write(self, path, text):
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+
+def validators_from_headers(headers):
+    """Pick the revalidation headers out of a response header dict."""
+    return {
+        "etag": headers.get("etag"),
+        "last_modified": headers.get("last-modified"),
+    }
@@ -0,0 +1,165 @@
+"""
+Record/replay fixtures for the Playwright scraper.
+
+A fixture directory holds a snapshot of the prompt library as the scraper saw
+it, so extraction can be benchmarked and regression-tested without network:
+
+  <dir>/library.html        rendered library index
+  <dir>/pages/<slug>.html   rendered detail page per prompt
+  <dir>/expected.json       {slug: extracted prompt} at record time
+
+Replay works two ways: through Playwright request routing (the browser gets
+the recorded HTML for library/detail URLs and nothing else), or by parsing
+the HTML directly with the standard library, no browser involved.
+"""
+
+import os
+import json
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+LIBRARY_FILE = "library.html"
+PAGES_DIR = "pages"
+EXPECTED_FILE = "expected.json"
+
+
+class FixtureRecorder:
+    """Saves rendered pages and extracted results while the scraper runs."""
+
+    def __init__(self, fixture_dir):
+        self.fixture_dir = fixture_dir
+        self.expected = {}
+        os.makedirs(os.path.join(fixture_dir, PAGES_DIR), exist_ok=True)
+
+    def save_library(self, html):
+        self._write(os.path.join(self.fixture_dir, LIBRARY_FILE), html)
+
+    def save_detail(self, slug, html, prompt_data):
+        self._write(os.path.join(self.fixture_dir, PAGES_DIR, f"{slug}.html"), html)
+        self.expected[slug] = prompt_data
+
+    def close(self):
+        """Write expected.json for every page recorded in this run."""
+        self._write(
+            os.path.join(self.fixture_dir, EXPECTED_FILE),
+            json.dumps(self.expected, indent=2, sort_keys=True, ensure_ascii=False),
+        )
+
+    @staticmethod
+    def _write(path, text):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+def load_expected(fixture_dir):
+    with open(os.path.join(fixture_dir, EXPECTED_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def fixture_path(fixture_dir, url):
+    """Map a library or detail URL to its recorded file (which may not exist)."""
+    path = urlsplit(url).path.rstrip("/")
+    if "/prompt-library/" not in path:
+        return None
+    slug = path.split("/prompt-library/")[-1]
+    if slug == "library":
+        return os.path.join(fixture_dir, LIBRARY_FILE)
+    return os.path.join(fixture_dir, PAGES_DIR, f"{slug}.html")
+
+
+async def install_replay_routes(context, fixture_dir):
+    """
+    Serve recorded pages to every page in `context` and abort all other requests.
+
+    Create the context with java_script_enabled=False: the recordings are
+    already-rendered DOM, and running the site's scripts against them would
+    only try to re-hydrate from the network.
+    """
+    async def handler(route):
+        path = fixture_path(fixture_dir, route.request.url)
+        if path is None or not os.path.exists(path):
+            await route.abort()
+            return
+        with open(path, encoding="utf-8") as f:
+            await route.fulfill(status=200, content_type="text/html; charset=utf-8", body=f.read())
+
+    await context.route("**/*", handler)
+
+
+class _PageParser(HTMLParser):
+    """
+    Collects what the scraper reads from a page: link hrefs, the first h1,
+    the description meta tag, the first paragraph inside article/main/.content,
+    and the text of every <pre> block.
+    """
+
+    CONTENT_TAGS = {"article", "main"}
+    VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input",
+                 "link", "meta", "source", "track", "wbr"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.hrefs = []
+        self.h1 = None
+        self.meta_description = None
+        self.first_paragraph = None
+        self.pre_texts = []
+        self._stack = []
+        self._capture = None  # (kind, depth, parts)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "a" and attrs.get("href"):
+            self.hrefs.append(attrs["href"])
+        if tag == "meta" and self.meta_description is None:
+            if attrs.get("name") == "description" or attrs.get("property") == "og:description":
+                self.meta_description = attrs.get("content") or ""
+        if tag in self.VOID_TAGS:
+            return
+
+        in_content = any(
+            t in self.CONTENT_TAGS or "content" in (classes or "").split()
+            for t, classes in self._stack
+        )
+        self._stack.append((tag, attrs.get("class")))
+
+        if self._capture is None:
+            if tag == "h1" and self.h1 is None:
+                self._capture = ("h1", len(self._stack), [])
+            elif tag == "p" and self.first_paragraph is None and in_content:
+                self._capture = ("p", len(self._stack), [])
+            elif tag == "pre":
+                self._capture = ("pre", len(self._stack), [])
+
+    def handle_endtag(self, tag):
+        if tag in self.VOID_TAGS:
+            return
+        # Pop to the matching open tag, tolerating unclosed children
+        while self._stack:
+            open_tag, _ = self._stack.pop()
+            if self._capture and len(self._stack) < self._capture[1]:
+                self._finish_capture()
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self._capture:
+            self._capture[2].append(data)
+
+    def _finish_capture(self):
+        kind, _, parts = self._capture
+        text = "".join(parts)
+        if kind == "h1":
+            self.h1 = text.strip()
+        elif kind == "p":
+            self.first_paragraph = text.strip()
+        else:
+            self.pre_texts.append(text)
+        self._capture = None
+
+
+def parse_html(html):
+    parser = _PageParser()
+    parser.feed(html)
+    parser.close()
+    return parser
@@ -3,15 +3,37 @@ Playwright Scraper — Seeds the database with prompts from Anthropic's Prompt L
 
 Usage:
     python scripts/scrape_prompts.py
+    python scripts/scrape_prompts.py --contexts 2 --pages-per-context 4 --rate 4
+    python scripts/scrape_prompts.py --profile full
+    python scripts/scrape_prompts.py --record fixtures/library   # save pages for offline runs
+    python scripts/scrape_prompts.py --replay fixtures/library --dry-run
 
 This script:
   1. Navigates to the Anthropic Prompt Library index page
   2. Extracts all prompt slugs from the page
-  3. Visits each prompt's detail page to extract title, description, and prompt body
-  4. Upserts prompts into PostgreSQL (ON CONFLICT DO NOTHING for idempotency)
-  5. Updates the total_prompts counter in app_state
-
-Safe to re-run: existing prompts (including served ones) are never modified.
+  3. Visits each prompt's detail page to extract title, description, and prompt body,
+     using a bounded pool of browser pages (contexts × pages-per-context).
+     Pages already in the on-disk cache are revalidated first (ETag /
+     Last-Modified) and only re-rendered and upserted when they changed.
+  4. Streams prompts into batched upserts over one connection (ON CONFLICT on
+     source_slug for idempotency), and near-duplicate-indexes the prompts
+     each batch inserted or changed
+  5. Updates the total_prompts counter in app_state once, at the end
+
+Politeness is enforced by one global rate limiter shared by every page, so
+raising concurrency overlaps page rendering without increasing the request
+rate beyond --rate navigations per second.
+
+The default "lite" profile blocks images, fonts, stylesheets, media and
+analytics, and waits for the h1 / code block it reads instead of network
+idle. "full" loads pages exactly as a browser would.
+
+Safe to re-run: prompts are upserted on source_slug. A prompt whose
+description, prompt body or system prompt changed on the site is updated in
+place, its derived columns (services/enrichment.py) recomputed and its
+content_version bumped (so API workers drop their cached copy); title, category and serving state (is_served, serve_order) are left
+as they are. A re-run against an unchanged site writes nothing to the
+database; pass --no-cache to force every page to be rendered and upserted.
 """
 
 import os
@@ -19,12 +41,22 @@ import sys
 import re
 import time
 import json
+import asyncio
+import argparse
 
-from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 from dotenv import load_dotenv
 import psycopg2
 from psycopg2.extras import execute_values
 
+# Add the parent directory to sys.path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.classifier import categorize
+from services.enrichment import DERIVED_COLUMNS, enrich, enrich_row
+from scrape_cache import ScrapeCache, DEFAULT_CACHE_DIR, content_hash, validators_from_headers
+from scrape_fixtures import FixtureRecorder, install_replay_routes, parse_html
+
 # Load environment
 load_dotenv()
 
@@ -38,80 +70,123 @@ if DATABASE_URL.startswith("postgres://"):
 
 BASE_URL = "https://docs.anthropic.com"
 LIBRARY_URL = f"{BASE_URL}/en/prompt-library/library"
-DELAY_BETWEEN_PAGES = 2  # seconds — be respectful to Anthropic's servers
-
-
-def categorize_prompt(title, description):
-    """Assign a category based on keywords in title/description."""
-    text = f"{title} {description}".lower()
-
-    categories = {
-        "coding": ["code", "python", "sql", "html", "css", "javascript", "git", "bug",
-                    "function", "latex", "excel", "formula", "script", "apps script",
-                    "spreadsheet", "csv", "json", "xml", "algorithm", "complexity"],
-        "writing": ["write", "story", "prose", "edit", "grammar", "poem", "alliteration",
-                     "portmanteau", "tongue twister", "memo", "email", "tweet", "pun",
-                     "riddle", "simile", "neologism"],
-        "analysis": ["extract", "classify", "analyze", "interpret", "detect", "organize",
-                      "data", "review", "insight", "report", "summarize", "grade",
-                      "estimate", "evaluate"],
-        "education": ["teach", "explain", "simplify", "lesson", "tutor", "socratic",
-                       "trivia", "interview", "career", "mentor", "coach"],
-        "creative": ["creative", "fashion", "brand", "product", "name", "design",
-                      "color", "mood", "dream", "sci-fi", "vr", "game", "travel",
-                       "culinary", "recipe", "fitness"],
-        "language": ["translate", "language", "idiom", "polyglot", "emoji", "airport",
-                      "direction", "decode"],
-        "productivity": ["meeting", "moderate", "pii", "motivat", "mindful", "ethical",
-                          "perspective", "cite", "source"],
-    }
-
-    for category, keywords in categories.items():
-        if any(kw in text for kw in keywords):
-            return category
-
-    return "general"
-
-
-def extract_prompts_from_code_block(page):
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+
+# Concurrency and politeness — be respectful to Anthropic's servers
+SCRAPER_CONTEXTS = int(os.getenv("SCRAPER_CONTEXTS", "1"))
+SCRAPER_PAGES_PER_CONTEXT = int(os.getenv("SCRAPER_PAGES_PER_CONTEXT", "4"))
+SCRAPER_RATE = float(os.getenv("SCRAPER_RATE", "2"))  # page navigations per second, all pages combined
+SCRAPER_REVALIDATE_RATE = float(os.getenv("SCRAPER_REVALIDATE_RATE", "10"))  # conditional GETs per second
+SCRAPER_CACHE_DIR = os.getenv("SCRAPER_CACHE_DIR", DEFAULT_CACHE_DIR)
+SCRAPER_PROFILE = os.getenv("SCRAPER_PROFILE", "lite")
+
+# API code block fields, compiled once: system="..." and "text": "..."
+SYSTEM_PROMPT_RE = re.compile(r'system\s*=\s*"((?:[^"\\]|\\.)*)"', re.DOTALL)
+USER_TEXT_RE = re.compile(r'"text"\s*:\s*"((?:[^"\\]|\\.)*)"', re.DOTALL)
+
+# Page-load profiles: how long to wait on navigation, and whether to block
+# heavy resources and wait on the elements we actually read instead.
+PROFILES = {
+    "full": {"wait_until": "networkidle", "lite": False},
+    "lite": {"wait_until": "domcontentloaded", "lite": True},
+}
+
+# Blocked in the lite profile. Done with CDP URL blocking rather than
+# page.route(): routing disables the browser HTTP cache, and the lite profile
+# relies on the shared context cache staying warm for scripts.
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.css", "*.mp4", "*.webm", "*.mp3",
+    "*google-analytics.com*", "*googletagmanager.com*", "*segment.com*", "*segment.io*",
+    "*posthog*", "*intercom*", "*hotjar*", "*sentry.io*", "*mixpanel*", "*amplitude*",
+    "*clarity.ms*", "*/_vercel/insights/*", "*/_vercel/speed-insights/*",
+]
+MAX_ATTEMPTS = 3
+
+
+class RateLimiter:
+    """Spaces out acquisitions so that at most `rate` happen per second overall."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class Progress:
+    """Prints changed/unchanged/failed counts with throughput and ETA."""
+
+    MARKS = {"changed": "✓", "unchanged": "=", "failed": "❌"}
+
+    def __init__(self, total):
+        self.total = total
+        self.counts = {status: 0 for status in self.MARKS}
+        self.started = time.monotonic()
+
+    @property
+    def failed(self):
+        return self.counts["failed"]
+
+    def report(self, slug, status):
+        self.counts[status] += 1
+        finished = sum(self.counts.values())
+        elapsed = time.monotonic() - self.started
+        rate = finished / elapsed if elapsed else 0.0
+        eta = (self.total - finished) / rate if rate else 0.0
+        print(f"  [{finished}/{self.total}] {self.MARKS[status]} {slug} "
+              f"({rate:.2f} pages/s, ETA {eta:.0f}s)")
+
+
+def _unescape(value):
+    return value.replace("\\n", "\n").replace('\\"', '"').replace("\\\\", "\\")
+
+
+def extract_prompts_from_code_text(text_content):
+    """
+    Extract both system prompt and user prompt from the text of one API code block.
+    Returns: { "system_prompt": str, "user_prompt": str } or None
+    """
+    # Look for API code blocks that contain messages
+    if "messages" not in text_content:
+        return None
+
+    result = {"system_prompt": "", "user_prompt": ""}
+
+    # Extract system prompt: system="..." or system="""..."""
+    sys_match = SYSTEM_PROMPT_RE.search(text_content)
+    if sys_match:
+        result["system_prompt"] = _unescape(sys_match.group(1)).strip()
+
+    # Extract user message text: "text": "..."
+    text_match = USER_TEXT_RE.search(text_content)
+    if text_match:
+        result["user_prompt"] = _unescape(text_match.group(1)).strip()
+
+    if result["system_prompt"] or result["user_prompt"]:
+        return result
+    return None
+
+
+async def extract_prompts_from_code_block(page):
     """
     Extract both system prompt and user prompt from the API code block.
     Returns: { "system_prompt": str, "user_prompt": str } or None
     """
     try:
-        code_blocks = page.query_selector_all("pre code, pre")
+        code_blocks = await page.query_selector_all("pre code, pre")
         for block in code_blocks:
-            text_content = block.inner_text()
-
-            # Look for API code blocks that contain messages
-            if "messages" not in text_content:
-                continue
-
-            result = {"system_prompt": "", "user_prompt": ""}
-
-            # Extract system prompt: system="..." or system="""..."""
-            sys_match = re.search(
-                r'system\s*=\s*"((?:[^"\\]|\\.)*)"',
-                text_content,
-                re.DOTALL,
-            )
-            if sys_match:
-                sys_text = sys_match.group(1)
-                sys_text = sys_text.replace("\\n", "\n").replace('\\"', '"').replace("\\\\", "\\")
-                result["system_prompt"] = sys_text.strip()
-
-            # Extract user message text: "text": "..."
-            text_match = re.search(
-                r'"text"\s*:\s*"((?:[^"\\]|\\.)*)"',
-                text_content,
-                re.DOTALL,
-            )
-            if text_match:
-                user_text = text_match.group(1)
-                user_text = user_text.replace("\\n", "\n").replace('\\"', '"').replace("\\\\", "\\")
-                result["user_prompt"] = user_text.strip()
-
-            if result["system_prompt"] or result["user_prompt"]:
+            result = extract_prompts_from_code_text(await block.inner_text())
+            if result:
                 return result
 
     except Exception as e:
@@ -120,217 +195,580 @@ def extract_prompts_from_code_block(page):
     return None
 
 
+async def new_scrape_page(context, profile="lite"):
+    """Open a page in `context`, blocking heavy resources for the lite profile."""
+    page = await context.new_page()
+    if PROFILES[profile]["lite"]:
+        cdp = await context.new_cdp_session(page)
+        await cdp.send("Network.enable")
+        await cdp.send("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+    return page
+
 
-def scrape_library(page):
+async def scrape_library(page, profile="lite"):
     """
     Scrape the Anthropic Prompt Library index page for all prompt slugs.
     Returns a list of unique slugs.
     """
     print(f"📖 Navigating to library index: {LIBRARY_URL}")
-    page.goto(LIBRARY_URL, wait_until="networkidle", timeout=30000)
-    time.sleep(2)
+    await page.goto(LIBRARY_URL, wait_until=PROFILES[profile]["wait_until"], timeout=30000)
+    if PROFILES[profile]["lite"]:
+        await page.wait_for_selector('a[href*="/prompt-library/"]', timeout=15000)
 
     # Extract all links matching /en/prompt-library/<slug>
-    links = page.query_selector_all('a[href*="/prompt-library/"]')
-    slugs = set()
+    links = await page.query_selector_all('a[href*="/prompt-library/"]')
+    slugs = slugs_from_hrefs([await link.get_attribute("href") for link in links])
 
-    for link in links:
-        href = link.get_attribute("href")
+    print(f"✅ Found {len(slugs)} unique prompt slugs")
+    return slugs
+
+
+def slugs_from_hrefs(hrefs):
+    """Return the sorted unique prompt slugs linked from the library index."""
+    slugs = set()
+    for href in hrefs:
         if href and "/prompt-library/" in href:
             # Extract slug — handle both relative and absolute URLs
             parts = href.rstrip("/").split("/prompt-library/")
             if len(parts) == 2 and parts[1] and parts[1] != "library":
                 slugs.add(parts[1])
-
-    print(f"✅ Found {len(slugs)} unique prompt slugs")
     return sorted(slugs)
 
 
-def scrape_prompt_detail(page, slug, attempt=1, max_attempts=3):
+def parse_library_html(html):
+    """Browser-free equivalent of scrape_library for already-rendered HTML."""
+    return slugs_from_hrefs(parse_html(html).hrefs)
+
+
+def parse_prompt_html(html, slug):
+    """Browser-free equivalent of scrape_prompt_detail for already-rendered HTML."""
+    page = parse_html(html)
+    description = page.meta_description or page.first_paragraph or ""
+    extracted = next(filter(None, map(extract_prompts_from_code_text, page.pre_texts)), None)
+    return build_prompt_data(slug, page.h1, description, extracted)
+
+
+def detail_url(slug):
+    return f"{BASE_URL}/en/prompt-library/{slug}"
+
+
+async def load_prompt_page(page, slug, profile="lite"):
+    """Navigate to a prompt's detail page and return the navigation response."""
+    response = await page.goto(detail_url(slug), wait_until=PROFILES[profile]["wait_until"], timeout=30000)
+    if PROFILES[profile]["lite"]:
+        await page.wait_for_selector("h1", timeout=15000)
+        try:
+            await page.wait_for_selector("pre code, pre", timeout=5000)
+        except PlaywrightTimeoutError:
+            pass  # Some prompts have no code block; extraction falls back to the description
+    return response
+
+
+async def extract_prompt_detail(page, slug):
+    """Extract a prompt's data from its already-loaded detail page."""
+    # Extract title from h1
+    h1 = await page.query_selector("h1")
+    title = (await h1.inner_text()).strip() if h1 else None
+
+    # Extract description from meta or first paragraph
+    description = ""
+    meta_desc = await page.query_selector('meta[name="description"], meta[property="og:description"]')
+    if meta_desc:
+        description = await meta_desc.get_attribute("content") or ""
+    if not description:
+        first_p = await page.query_selector("article p, main p, .content p")
+        if first_p:
+            description = (await first_p.inner_text()).strip()
+
+    # Extract prompts from code block (system + user)
+    extracted = await extract_prompts_from_code_block(page)
+    return build_prompt_data(slug, title, description, extracted)
+
+
+def build_prompt_data(slug, title, description, extracted):
+    """Assemble the prompt row from the fields read off a detail page."""
+    title = title or slug.replace("-", " ").title()
+    system_prompt = ""
+    prompt_body = ""
+    if extracted:
+        system_prompt = extracted.get("system_prompt", "")
+        prompt_body = extracted.get("user_prompt", "")
+    if not prompt_body:
+        # Fallback: use description as prompt body
+        prompt_body = description or f"Prompt: {title}"
+
+    category = categorize(title, description, prompt_body)
+
+    return enrich_row({
+        "title": title,
+        "description": description,
+        "prompt_body": prompt_body,
+        "system_prompt": system_prompt,
+        "category": category,
+        "source_slug": slug,
+        "source_url": detail_url(slug),
+    })
+
+
+async def scrape_prompt_detail(page, slug, profile="lite"):
     """
     Navigate to a prompt's detail page and extract its data.
-    Retries up to max_attempts times on failure.
+    Raises on navigation/extraction failure; retries are scheduled by the caller.
     """
-    url = f"{BASE_URL}/en/prompt-library/{slug}"
+    await load_prompt_page(page, slug, profile)
+    return await extract_prompt_detail(page, slug)
 
-    try:
-        page.goto(url, wait_until="networkidle", timeout=30000)
-        time.sleep(1)
-
-        # Extract title from h1
-        h1 = page.query_selector("h1")
-        title = h1.inner_text().strip() if h1 else slug.replace("-", " ").title()
-
-        # Extract description from meta or first paragraph
-        description = ""
-        meta_desc = page.query_selector('meta[name="description"], meta[property="og:description"]')
-        if meta_desc:
-            description = meta_desc.get_attribute("content") or ""
-        if not description:
-            first_p = page.query_selector("article p, main p, .content p")
-            if first_p:
-                description = first_p.inner_text().strip()
-
-        # Extract prompts from code block (system + user)
-        extracted = extract_prompts_from_code_block(page)
-        system_prompt = ""
-        prompt_body = ""
-        if extracted:
-            system_prompt = extracted.get("system_prompt", "")
-            prompt_body = extracted.get("user_prompt", "")
-        if not prompt_body:
-            # Fallback: use description as prompt body
-            prompt_body = description or f"Prompt: {title}"
-
-        category = categorize_prompt(title, description)
-
-        return {
-            "title": title,
-            "description": description,
-            "prompt_body": prompt_body,
-            "system_prompt": system_prompt,
-            "category": category,
-            "source_slug": slug,
-            "source_url": url,
-        }
 
-    except Exception as e:
-        if attempt < max_attempts:
-            wait_time = 2 ** attempt
-            print(f"  ⚠ Attempt {attempt} failed for {slug}: {e}. Retrying in {wait_time}s...")
-            time.sleep(wait_time)
-            return scrape_prompt_detail(page, slug, attempt + 1, max_attempts)
-        else:
-            print(f"  ❌ Failed to scrape {slug} after {max_attempts} attempts: {e}")
+async def revalidate(page, slug, entry):
+    """
+    Ask the server whether the cached copy of a detail page is still current.
+
+    Sends a conditional GET with the cached ETag / Last-Modified. A 304, or a
+    200 whose raw body hashes the same as last time, counts as unchanged.
+    Refreshes the validators in `entry` from the response.
+    """
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = await page.context.request.get(detail_url(slug), headers=headers, fail_on_status_code=False)
+    if response.status == 304:
+        return True
+    if not response.ok:
+        return False
+
+    raw_hash = content_hash(await response.body())
+    unchanged = raw_hash == entry.get("raw_hash")
+    entry.update(validators_from_headers(response.headers), raw_hash=raw_hash)
+    return unchanged
+
+
+async def scrape_slug(page, slug, cache, known_slugs, limiter, revalidate_limiter, profile="lite",
+                      recorder=None):
+    """
+    Scrape one slug, using the cache to skip unchanged pages.
+
+    Returns the prompt data if it is new or changed, or None if the database
+    already holds the current version.
+    """
+    entry = cache.get(slug) if cache else None
+    stored = entry is not None and slug in known_slugs
+
+    if stored:
+        await revalidate_limiter.wait()
+        if await revalidate(page, slug, entry):
+            cache.put(slug, entry)
             return None
 
+    await limiter.wait()
+    response = await load_prompt_page(page, slug, profile)
+    prompt_data = await extract_prompt_detail(page, slug)
+    if recorder:
+        recorder.save_detail(slug, await page.content(), prompt_data)
+    if not cache:
+        return prompt_data
+
+    entry = entry or {}
+    if response is not None:
+        entry.update(validators_from_headers(await response.all_headers()))
+        # Hash the raw document too, so the next run can revalidate by body
+        # even when the server sends no ETag / Last-Modified
+        try:
+            entry["raw_hash"] = content_hash(await response.body())
+        except Exception:
+            entry.pop("raw_hash", None)
+    unchanged = stored and entry.get("result_hash") == content_hash(prompt_data)
+    cache.put(slug, dict(entry, result=prompt_data), html=await page.content())
+    return None if unchanged else prompt_data
 
-def upsert_prompts(prompts):
+
+async def scrape_details(pages, slugs, limiter, on_result, cache=None, known_slugs=(),
+                         revalidate_limiter=None, profile="lite", recorder=None):
     """
-    Insert prompts into database. Uses ON CONFLICT DO NOTHING (Postgres)
-    or INSERT OR IGNORE (SQLite) for idempotency.
-    Returns count of newly inserted prompts.
+    Scrape every slug's detail page using a fixed pool of pages.
+
+    Each page runs one worker pulling slugs from a shared queue. A failed slug
+    is put back on the queue after an exponential backoff delay, so the page
+    that failed moves on to other work instead of sleeping. Only new or
+    changed prompts are passed to on_result; if it raises, the slug counts
+    as failed.
+
+    Returns the number of slugs that failed after MAX_ATTEMPTS attempts.
     """
+    revalidate_limiter = revalidate_limiter or limiter
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    progress = Progress(len(slugs))
+    outstanding = len(slugs)
+    finished = asyncio.Event()
+
+    for slug in slugs:
+        queue.put_nowait((slug, 1))
+    if not slugs:
+        finished.set()
+
+    def settle(slug, status):
+        nonlocal outstanding
+        progress.report(slug, status)
+        outstanding -= 1
+        if outstanding == 0:
+            finished.set()
+
+    async def worker(page):
+        while True:
+            slug, attempt = await queue.get()
+            try:
+                prompt_data = await scrape_slug(page, slug, cache, known_slugs,
+                                                limiter, revalidate_limiter, profile, recorder)
+            except Exception as e:
+                if attempt < MAX_ATTEMPTS:
+                    wait_time = 2 ** attempt
+                    print(f"  ⚠ Attempt {attempt} failed for {slug}: {e}. Retrying in {wait_time}s...")
+                    loop.call_later(wait_time, queue.put_nowait, (slug, attempt + 1))
+                else:
+                    print(f"  ❌ Failed to scrape {slug} after {MAX_ATTEMPTS} attempts: {e}")
+                    settle(slug, "failed")
+                continue
+            if prompt_data is None:
+                settle(slug, "unchanged")
+                continue
+            try:
+                await on_result(prompt_data)
+            except Exception as e:
+                # Not retried: the page scraped fine, storing it did not
+                print(f"  ❌ Failed to store {slug}: {e}")
+                settle(slug, "failed")
+                continue
+            settle(slug, "changed")
+
+    workers = [asyncio.create_task(worker(page)) for page in pages]
+    await finished.wait()
+    for task in workers:
+        task.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+
+    return progress.failed
+
+
+# Derived columns (services/enrichment.py) are written with the content, so
+# a changed prompt is enriched for the content_version it is bumped to
+SQLITE_UPSERT = """
+    INSERT INTO prompts
+    (title, description, prompt_body, system_prompt, category, source_slug, source_url,
+     char_length, token_estimate, normalized_text, content_hash, enriched_version, scraped_at, is_served)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, 0)
+    ON CONFLICT(source_slug) DO UPDATE SET
+        system_prompt = excluded.system_prompt,
+        prompt_body = excluded.prompt_body,
+        description = excluded.description,
+        char_length = excluded.char_length,
+        token_estimate = excluded.token_estimate,
+        normalized_text = excluded.normalized_text,
+        content_hash = excluded.content_hash,
+        content_version = prompts.content_version + 1,
+        enriched_version = prompts.content_version + 1
+    WHERE prompts.system_prompt IS NOT excluded.system_prompt
+       OR prompts.prompt_body IS NOT excluded.prompt_body
+       OR prompts.description IS NOT excluded.description
+    RETURNING id
+"""
+
+POSTGRES_UPSERT = """
+    INSERT INTO prompts
+    (title, description, prompt_body, system_prompt, category, source_slug, source_url,
+     char_length, token_estimate, normalized_text, content_hash, enriched_version)
+    VALUES %s
+    ON CONFLICT (source_slug) DO UPDATE SET
+        system_prompt = EXCLUDED.system_prompt,
+        prompt_body = EXCLUDED.prompt_body,
+        description = EXCLUDED.description,
+        char_length = EXCLUDED.char_length,
+        token_estimate = EXCLUDED.token_estimate,
+        normalized_text = EXCLUDED.normalized_text,
+        content_hash = EXCLUDED.content_hash,
+        content_version = prompts.content_version + 1,
+        enriched_version = prompts.content_version + 1
+    WHERE prompts.system_prompt IS DISTINCT FROM EXCLUDED.system_prompt
+       OR prompts.prompt_body IS DISTINCT FROM EXCLUDED.prompt_body
+       OR prompts.description IS DISTINCT FROM EXCLUDED.description
+    RETURNING id
+"""
+
+UPSERT_BATCH_SIZE = 50
+
+
+def _connect():
+    """Open a DB-API connection to DATABASE_URL. Returns (conn, is_sqlite)."""
     is_sqlite = DATABASE_URL.startswith("sqlite")
-    
     if is_sqlite:
         import sqlite3
         # Extract path from sqlite:///...
-        db_path = DATABASE_URL.replace("sqlite:///", "")
-        conn = sqlite3.connect(db_path)
-    else:
-        conn = psycopg2.connect(DATABASE_URL)
-    
-    cur = conn.cursor()
-
-    inserted = 0
-    for prompt in prompts:
+        # Used from a worker thread while scraping (never two at once)
+        return sqlite3.connect(DATABASE_URL.replace("sqlite:///", ""), check_same_thread=False), True
+    return psycopg2.connect(DATABASE_URL), False
+
+
+def _prompt_row(prompt):
+    if any(col not in prompt for col in DERIVED_COLUMNS):
+        prompt = dict(prompt, **enrich(prompt["title"], prompt["description"], prompt["prompt_body"],
+                                       prompt.get("system_prompt", "")))
+    return (
+        prompt["title"],
+        prompt["description"],
+        prompt["prompt_body"],
+        prompt.get("system_prompt", ""),
+        prompt["category"],
+        prompt["source_slug"],
+        prompt["source_url"],
+        *(prompt[col] for col in DERIVED_COLUMNS),
+        1,  # enriched_version of a new row (content_version 1)
+    )
+
+
+class PromptWriter:
+    """
+    Streams prompts into batched upserts over a single connection.
+
+    Prompts are buffered and written UPSERT_BATCH_SIZE at a time in one
+    transaction (one execute_values statement on Postgres; row by row on
+    SQLite, whose executemany drops RETURNING rows). The ids each batch
+    inserted or changed are then near-duplicate-indexed through the app's
+    session. total_prompts is recomputed once, on close, and only if anything
+    was written — a run that changes nothing leaves the database untouched.
+    """
+
+    def __init__(self, batch_size=UPSERT_BATCH_SIZE):
+        self.conn, self.is_sqlite = _connect()
+        self.batch_size = batch_size
+        self.pending = {}
+        self.written = 0
+        self._app = None
+
+    def existing_slugs(self):
+        """Return the set of source_slugs already stored in the prompts table."""
+        cur = self.conn.cursor()
+        cur.execute("SELECT source_slug FROM prompts")
+        slugs = {row[0] for row in cur.fetchall()}
+        cur.close()
+        self.conn.rollback()
+        return slugs
+
+    def add(self, prompt):
+        """Queue a prompt, flushing once a full batch is buffered."""
+        # Keyed by slug: one upsert statement cannot touch the same row twice
+        self.pending[prompt["source_slug"]] = prompt
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write all buffered prompts in one statement and commit."""
+        if not self.pending:
+            return
+        prompts = list(self.pending.values())
+        self.pending = {}
+
+        cur = self.conn.cursor()
+        written_ids = []
         try:
-            if is_sqlite:
+            written_ids = self._upsert(cur, [_prompt_row(p) for p in prompts])
+            self.conn.commit()
+        except Exception as e:
+            print(f"  ⚠ Batch upsert failed ({e}); retrying row by row")
+            self.conn.rollback()
+            written_ids = []
+            for prompt in prompts:
+                try:
+                    ids = self._upsert(cur, [_prompt_row(prompt)])
+                    self.conn.commit()
+                    written_ids.extend(ids)
+                except Exception as e:
+                    print(f"  ⚠ DB error for {prompt['source_slug']}: {e}")
+                    self.conn.rollback()
+        finally:
+            cur.close()
+        self.written += len(written_ids)
+        self._index(written_ids)
+
+    def _upsert(self, cur, rows):
+        """Upsert rows; returns the ids of those inserted or changed."""
+        if self.is_sqlite:
+            ids = []
+            for row in rows:
+                cur.execute(SQLITE_UPSERT, row)
+                ids.extend(r[0] for r in cur.fetchall())
+            return ids
+        return [r[0] for r in execute_values(cur, POSTGRES_UPSERT, rows, page_size=len(rows), fetch=True)]
+
+    def _index(self, prompt_ids):
+        """Near-duplicate-index freshly written prompts; a failure only leaves them for the backfill."""
+        if not prompt_ids:
+            return
+        if self._app is None:
+            # Imported here: the app is only needed once something is written
+            from app import app
+            self._app = app
+        from models import db
+        from services.near_duplicates import index_prompts
+        with self._app.app_context():
+            try:
+                index_prompts(db.session, prompt_ids)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"  ⚠ Near-duplicate indexing failed ({e}); "
+                      f"run scripts/index_near_duplicates.py to catch up")
+
+    def close(self):
+        """Flush, refresh the total_prompts counter if needed, and close the connection."""
+        self.flush()
+        if self.written:
+            cur = self.conn.cursor()
+            cur.execute("SELECT COUNT(*) FROM prompts")
+            total = cur.fetchone()[0]
+            if self.is_sqlite:
                 cur.execute(
-                    """
-                    INSERT INTO prompts 
-                    (title, description, prompt_body, system_prompt, category, source_slug, source_url, scraped_at, is_served)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, 0)
-                    ON CONFLICT(source_slug) DO UPDATE SET
-                        system_prompt = excluded.system_prompt,
-                        prompt_body = excluded.prompt_body,
-                        description = excluded.description
-                    """,
-                    (
-                        prompt["title"],
-                        prompt["description"],
-                        prompt["prompt_body"],
-                        prompt.get("system_prompt", ""),
-                        prompt["category"],
-                        prompt["source_slug"],
-                        prompt["source_url"],
-                    ),
+                    "INSERT OR REPLACE INTO app_state (key, value_int) VALUES ('total_prompts', ?)",
+                    (total,),
                 )
             else:
                 cur.execute(
-                    """
-                    INSERT INTO prompts (title, description, prompt_body, system_prompt, category, source_slug, source_url)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (source_slug) DO UPDATE SET
-                        system_prompt = EXCLUDED.system_prompt,
-                        prompt_body = EXCLUDED.prompt_body,
-                        description = EXCLUDED.description
-                    """,
-                    (
-                        prompt["title"],
-                        prompt["description"],
-                        prompt["prompt_body"],
-                        prompt.get("system_prompt", ""),
-                        prompt["category"],
-                        prompt["source_slug"],
-                        prompt["source_url"],
-                    ),
+                    "UPDATE app_state SET value_int = %s WHERE key = 'total_prompts'",
+                    (total,),
                 )
-            if cur.rowcount > 0:
-                inserted += 1
-        except Exception as e:
-            print(f"  ⚠ DB error for {prompt['source_slug']}: {e}")
-            conn.rollback()
-            continue
+            self.conn.commit()
+            cur.close()
+        self.conn.close()
 
-    # Update total_prompts counter
-    if is_sqlite:
-        cur.execute("SELECT COUNT(*) FROM prompts")
-        total = cur.fetchone()[0]
-        cur.execute(
-            "INSERT OR REPLACE INTO app_state (key, value_int) VALUES ('total_prompts', ?)",
-            (total,),
-        )
-    else:
-        cur.execute("SELECT COUNT(*) FROM prompts")
-        total = cur.fetchone()[0]
-        cur.execute(
-            "UPDATE app_state SET value_int = %s WHERE key = 'total_prompts'",
-            (total,),
-        )
-
-    conn.commit()
-    cur.close()
-    conn.close()
-
-    return inserted
+
+def upsert_prompts(prompts):
+    """
+    Insert or update prompts in the database (ON CONFLICT on source_slug).
+    Returns count of inserted or updated prompts.
+    """
+    writer = PromptWriter()
+    for prompt in prompts:
+        writer.add(prompt)
+    writer.close()
+    return writer.written
 
 
-def main():
-    """Main entry point: scrape the library and populate the database."""
-    print("🚀 Daily Prompt Scraper — Starting")
-    print(f"📡 Database: {DATABASE_URL[:50]}...")
+async def run(contexts, pages_per_context, rate, cache_dir=None, profile="lite",
+              record_dir=None, replay_dir=None, dry_run=False, results=None):
+    """
+    Scrape the library with a pool of contexts × pages and populate the database.
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                       "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        )
-        page = context.new_page()
+    record_dir saves every rendered page as a fixture; replay_dir serves pages
+    from fixtures instead of the network. With dry_run nothing is written to
+    the database. Extracted prompts are also appended to `results` if given.
+    """
+    print("🚀 Daily Prompt Scraper — Starting")
+    if replay_dir:
+        print(f"📼 Replaying fixtures from {replay_dir}")
+        rate, cache_dir = 0, None
+    if record_dir:
+        print(f"⏺  Recording fixtures to {record_dir}")
+        cache_dir = None
+    print(f"📡 Database: {'(dry run)' if dry_run else DATABASE_URL[:50] + '...'}")
+    print(f"🧵 Page pool: {contexts} context(s) × {pages_per_context} page(s), {rate} req/s, "
+          f"{profile} profile")
+
+    limiter = RateLimiter(rate)
+    revalidate_limiter = RateLimiter(SCRAPER_REVALIDATE_RATE)
+    cache = ScrapeCache(cache_dir) if cache_dir else None
+    recorder = FixtureRecorder(record_dir) if record_dir else None
+    writer = None if dry_run else PromptWriter()
+    known_slugs = writer.existing_slugs() if cache and writer else set()
+    if cache:
+        print(f"🗄  Cache: {cache_dir} ({len(known_slugs)} prompts already stored)")
+
+    # The writer blocks on the database when a batch fills, so it runs in a
+    # thread (one call at a time) instead of stalling the pages on the loop
+    write_lock = asyncio.Lock()
+
+    async def on_result(prompt_data):
+        if results is not None:
+            results.append(prompt_data)
+        if writer:
+            async with write_lock:
+                await asyncio.to_thread(writer.add, prompt_data)
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        pages = []
+        for _ in range(contexts):
+            context = await browser.new_context(user_agent=USER_AGENT,
+                                                java_script_enabled=not replay_dir)
+            if replay_dir:
+                await install_replay_routes(context, replay_dir)
+            for _ in range(pages_per_context):
+                pages.append(await new_scrape_page(context, profile))
 
         # Step 1: Get all prompt slugs
-        slugs = scrape_library(page)
+        await limiter.wait()
+        slugs = await scrape_library(pages[0], profile)
+        if recorder:
+            recorder.save_library(await pages[0].content())
 
         if not slugs:
             print("❌ No prompt slugs found — page structure may have changed. Aborting.")
-            browser.close()
+            await browser.close()
+            if writer:
+                writer.close()
             sys.exit(1)
 
         # Step 2: Scrape each prompt's detail page
-        total_inserted = 0
-        for i, slug in enumerate(slugs, 1):
-            print(f"  [{i}/{len(slugs)}] Scraping: {slug}")
-            prompt_data = scrape_prompt_detail(page, slug)
-            if prompt_data:
-                inserted = upsert_prompts([prompt_data])
-                total_inserted += inserted
-            time.sleep(DELAY_BETWEEN_PAGES)
-
-        browser.close()
-
-    print(f"\n📊 Scraper finished. Total new prompts inserted: {total_inserted}")
+        started = time.monotonic()
+        failed = await scrape_details(pages, slugs, limiter, on_result, cache=cache,
+                                      known_slugs=known_slugs,
+                                      revalidate_limiter=revalidate_limiter, profile=profile,
+                                      recorder=recorder)
+        elapsed = time.monotonic() - started
+
+        await browser.close()
+
+    if recorder:
+        recorder.close()
+    written = 0
+    if writer:
+        await asyncio.to_thread(writer.close)
+        written = writer.written
+    print(f"\n📊 Scraper finished in {elapsed:.1f}s ({len(slugs) / elapsed if elapsed else 0:.1f} pages/s). "
+          f"Prompts inserted or updated: {written} ({failed} failed)")
+    return failed
+
+
+def main():
+    """Main entry point: parse pool settings and run the scraper."""
+    parser = argparse.ArgumentParser(description="Scrape Anthropic's Prompt Library.")
+    parser.add_argument("--contexts", type=int, default=SCRAPER_CONTEXTS,
+                        help="Browser contexts to open (default: SCRAPER_CONTEXTS or 1).")
+    parser.add_argument("--pages-per-context", type=int, default=SCRAPER_PAGES_PER_CONTEXT,
+                        help="Concurrent pages per context (default: SCRAPER_PAGES_PER_CONTEXT or 4).")
+    parser.add_argument("--rate", type=float, default=SCRAPER_RATE,
+                        help="Max page navigations per second across all pages (default: SCRAPER_RATE or 2).")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=SCRAPER_PROFILE,
+                        help="Page-load profile (default: SCRAPER_PROFILE or lite).")
+    parser.add_argument("--cache-dir", default=SCRAPER_CACHE_DIR,
+                        help="Directory for the page/result cache (default: backend/.scrape_cache).")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Render and upsert every page, ignoring the cache.")
+    parser.add_argument("--record", metavar="DIR",
+                        help="Save rendered pages and extracted results to a fixture directory.")
+    parser.add_argument("--replay", metavar="DIR",
+                        help="Serve pages from a fixture directory instead of the network.")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Scrape and extract, but write nothing to the database.")
+    args = parser.parse_args()
+
+    if args.record and args.replay:
+        parser.error("--record and --replay are mutually exclusive")
+
+    cache_dir = None if args.no_cache else args.cache_dir
+    asyncio.run(run(max(1, args.contexts), max(1, args.pages_per_context), args.rate,
+                    cache_dir, args.profile, record_dir=args.record, replay_dir=args.replay,
+                    dry_run=args.dry_run))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,152 @@
+"""
+Corpus snapshots: export the prompts table to a snapshot file, or seed a node from one.
+
+Usage:
+    python scripts/snapshot_prompts.py export corpus.dps
+    python scripts/snapshot_prompts.py import corpus.dps
+    python scripts/snapshot_prompts.py show corpus.dps --id 42
+
+Snapshots carry prompt content, category, source and a content hash per row
+(format in services/snapshot.py). Serving state is not exported — a seeded
+node starts its own serve cycle. Import keeps the exported ids, skips rows
+whose id or source_slug already exists, and verifies every content hash.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+from datetime import datetime, timezone
+
+# Add the parent directory to sys.path to import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import case, select, func, text
+from models import db, Prompt, AppState
+from services.snapshot import SnapshotWriter, SnapshotReader, SnapshotError, prompt_content_hash
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("id", "title", "description", "prompt_body", "system_prompt", "category",
+           "source_slug", "source_url", "scraped_at", "content_hash")
+IMPORT_BATCH_SIZE = 1000
+
+
+def export_snapshot(path):
+    """Write every prompt, in id order, to a snapshot at `path`."""
+    table = Prompt.__table__
+    # The stored hash is used when it was computed for the current content
+    stored_hash = case(
+        (table.c.enriched_version == table.c.content_version, table.c.content_hash),
+        else_=None,
+    ).label("stored_hash")
+    query = select(*(table.c[col] for col in COLUMNS if col != "content_hash"), stored_hash).order_by(table.c.id)
+
+    started = time.monotonic()
+    count = 0
+    with SnapshotWriter(path, COLUMNS, meta={"exported_at": datetime.now(timezone.utc).isoformat()}) as writer:
+        result = db.session.execute(query.execution_options(yield_per=IMPORT_BATCH_SIZE))
+        for row in result.mappings():
+            row = dict(row)
+            row["scraped_at"] = row["scraped_at"].isoformat() if row["scraped_at"] else None
+            row["content_hash"] = row.pop("stored_hash") or prompt_content_hash(
+                row["title"], row["description"], row["prompt_body"], row["system_prompt"]
+            )
+            writer.add(row)
+            count += 1
+    elapsed = time.monotonic() - started
+
+    logger.info(f"Exported {count} prompts to {path} ({os.path.getsize(path) / 1024:.0f} KiB) in {elapsed:.2f}s.")
+    return count
+
+
+def _insert_batch(rows):
+    if db.engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    table = Prompt.__table__
+    stmt = insert(table).values(rows).on_conflict_do_nothing().returning(table.c.id)
+    return len(db.session.execute(stmt).fetchall())
+
+
+def import_snapshot(path):
+    """Bulk-load a snapshot into the prompts table. Returns the number of rows inserted."""
+    started = time.monotonic()
+    inserted = 0
+    with SnapshotReader(path) as reader:
+        batch = []
+        for block in reader.iter_blocks():
+            for row in block:
+                expected = prompt_content_hash(
+                    row["title"], row["description"], row["prompt_body"], row["system_prompt"]
+                )
+                if row.pop("content_hash", expected) != expected:
+                    raise SnapshotError(f"{path}: content hash mismatch for prompt {row['id']}")
+                if row["scraped_at"]:
+                    row["scraped_at"] = datetime.fromisoformat(row["scraped_at"])
+                row["is_served"] = False
+                batch.append(row)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                inserted += _insert_batch(batch)
+                batch = []
+        if batch:
+            inserted += _insert_batch(batch)
+        total_in_file = len(reader)
+
+    # Ids came from the snapshot, so move the sequence past them
+    if db.engine.dialect.name == "postgresql":
+        db.session.execute(text("SELECT setval('prompts_id_seq', (SELECT COALESCE(MAX(id), 1) FROM prompts))"))
+
+    total = db.session.scalar(select(func.count()).select_from(Prompt))
+    state = db.session.get(AppState, "total_prompts")
+    if state:
+        state.value_int = total
+    db.session.commit()
+
+    elapsed = time.monotonic() - started
+    logger.info(f"Imported {inserted} of {total_in_file} prompts in {elapsed:.2f}s "
+                f"({total_in_file - inserted} already present). Total prompts: {total}.")
+    return inserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import a prompts corpus snapshot.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("export", help="Write the prompts table to a snapshot.").add_argument("path")
+    sub.add_parser("import", help="Load a snapshot into the prompts table.").add_argument("path")
+    show = sub.add_parser("show", help="Print snapshot info, or one prompt by id.")
+    show.add_argument("path")
+    show.add_argument("--id", type=int, help="Prompt id to look up.")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        # Reads the file only; no database needed
+        with SnapshotReader(args.path) as reader:
+            if args.id is None:
+                print(json.dumps(dict(reader.header, count=len(reader)), indent=2))
+                return
+            row = reader.get(args.id)
+        if row is None:
+            logger.error(f"Prompt {args.id} is not in {args.path}.")
+            sys.exit(1)
+        print(json.dumps(row, indent=2, ensure_ascii=False))
+        return
+
+    # Imported here: importing app builds the app, which creates and alters tables
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        if args.command == "export":
+            export_snapshot(args.path)
+        else:
+            import_snapshot(args.path)
+
+
+if __name__ == "__main__":
+    main()
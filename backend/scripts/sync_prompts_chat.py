@@ -1,103 +1,455 @@
+"""
+prompts.chat sync — Imports prompts from the prompts.chat public API.
+
+Usage:
+    python scripts/sync_prompts_chat.py              # incremental (daily cron)
+    python scripts/sync_prompts_chat.py --full       # walk every page
+    python scripts/sync_prompts_chat.py --full --restart   # ignore a saved checkpoint
+
+Incremental mode requests pages newest-first and stops at the first page that
+reaches the high-water mark (app_state 'sync_watermark', the newest createdAt
+already synced, in epoch minutes), so a daily run takes one or two requests.
+New prompts are inserted and changed ones updated in place.
+
+Full mode runs when there is no watermark yet, when a full sync was
+interrupted, or with --full. It also catches edits to older prompts, which
+never reach the front of a newest-first listing. Page 1 is fetched first to
+learn totalPages; the remaining pages are fetched concurrently (bounded by
+--workers) over keep-alive connections, one per worker thread, with retries
+and backoff. Pages are committed strictly in order and app_state
+'sync_checkpoint_page' is advanced in the same transaction, so an
+interrupted sync resumes after the last committed page.
+
+PROMPTS_CHAT_API_URL overrides the endpoint (e.g. a local stand-in server
+serving api_sample.json-shaped pages).
+"""
 import os
 import sys
 import json
-import urllib.request
-import urllib.error
-from datetime import datetime
+import time
+import argparse
+import itertools
+import threading
+import http.client
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
 import logging
 
 # Add the parent directory to sys.path to import app modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from sqlalchemy import select, or_
 from app import create_app
-from models import db, Prompt
+from models import db, Prompt, AppState
+from services.classifier import categorize
+from services.near_duplicates import index_prompts
+from services.enrichment import DERIVED_COLUMNS, enrich_row
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-API_URL = "https://prompts.chat/api/prompts?page={page}&perPage=50"
+API_URL = os.getenv("PROMPTS_CHAT_API_URL", "https://prompts.chat/api/prompts")
+API_SORT = os.getenv("PROMPTS_CHAT_SORT", "newest")
+PER_PAGE = 50
+SYNC_WORKERS = int(os.getenv("SYNC_WORKERS", "4"))
+MAX_ATTEMPTS = 4
+CHECKPOINT_KEY = "sync_checkpoint_page"
+WATERMARK_KEY = "sync_watermark"
+# An upstream prompt counts as changed only when one of these differs
+CONTENT_COLUMNS = ("title", "description", "prompt_body")
+# Written when it has changed; category is re-derived from the new content.
+# scraped_at stays the first-ingestion time that recency weighting uses.
+UPDATED_COLUMNS = CONTENT_COLUMNS + ("category",)
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class PageFetchError(Exception):
+    """A page could not be fetched after all retries."""
+
+
+class NotNewestFirst(Exception):
+    """The API returned a page that is not sorted by createdAt descending."""
+
+
+class PromptsChatClient:
+    """
+    HTTP client for the prompts.chat API with one keep-alive connection per thread.
+
+    Connections are reused across requests and re-opened after any error.
+    Network errors, 429 and 5xx responses are retried with exponential backoff.
+    """
+
+    def __init__(self, api_url=API_URL, per_page=PER_PAGE, sort=API_SORT, timeout=30):
+        parts = urllib.parse.urlsplit(api_url)
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.path = parts.path or "/"
+        self.per_page = per_page
+        self.sort = sort
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            conn = cls(self.netloc, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _reset(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+        self._local.conn = None
+
+    def get_page(self, page):
+        """Return the decoded JSON for one page, raising PageFetchError after retries."""
+        query = urllib.parse.urlencode({"page": page, "perPage": self.per_page, "sort": self.sort})
+        last_error = None
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                conn = self._connection()
+                conn.request("GET", f"{self.path}?{query}", headers={
+                    "User-Agent": "DailyPrompt/1.0",
+                    "Accept": "application/json",
+                    "Connection": "keep-alive",
+                })
+                response = conn.getresponse()
+                body = response.read()
+                if response.status == 200:
+                    return json.loads(body.decode())
+                last_error = f"HTTP {response.status}"
+                if response.status != 429 and response.status < 500:
+                    break
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                last_error = e
+                self._reset()
+
+            if attempt < MAX_ATTEMPTS:
+                wait_time = 2 ** attempt
+                logger.warning(f"Page {page}: attempt {attempt} failed ({last_error}). Retrying in {wait_time}s...")
+                time.sleep(wait_time)
+
+        raise PageFetchError(f"page {page}: {last_error}")
+
+
+def fetch_page(page, client=None):
+    """Fetch a single page of prompts from prompts.chat. Returns None on failure."""
+    try:
+        return (client or PromptsChatClient()).get_page(page)
+    except PageFetchError as e:
+        logger.error(f"Error fetching {e}")
+        return None
+
+
+def fetch_pages(client, pages, workers):
+    """
+    Yield (page, data) for each page in order, fetching up to `workers` ahead.
+
+    Raises PageFetchError for the first page that cannot be fetched; pages
+    after it are not yielded.
+    """
+    pages = list(pages)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = {}
+        next_index = 0
+        try:
+            for page in pages:
+                # Keep a bounded window of requests running ahead of the consumer
+                while next_index < len(pages) and len(in_flight) < workers * 2:
+                    in_flight[pages[next_index]] = pool.submit(client.get_page, pages[next_index])
+                    next_index += 1
+                yield page, in_flight.pop(page).result()
+        finally:
+            for future in in_flight.values():
+                future.cancel()
+
+
+def _get_state(key):
+    state = db.session.get(AppState, key)
+    return state.value_int if state else 0
+
+
+def _set_state(key, value):
+    """Write an app_state counter (caller commits)."""
+    state = db.session.get(AppState, key)
+    if not state:
+        state = AppState(key=key, value_int=0)
+        db.session.add(state)
+    state.value_int = value
+
+
+def get_watermark():
+    """Return the newest createdAt already synced, or None before the first full sync."""
+    minutes = _get_state(WATERMARK_KEY)
+    return EPOCH + timedelta(minutes=minutes) if minutes else None
 
-def fetch_page(page):
-    """Fetch a single page of prompts from prompts.chat."""
-    url = API_URL.format(page=page)
-    req = urllib.request.Request(url, headers={'User-Agent': 'DailyPrompt/1.0'})
+
+def set_watermark(created_at):
+    _set_state(WATERMARK_KEY, int((created_at - EPOCH).total_seconds() // 60))
+
+
+def parse_timestamp(value):
+    """Parse an API timestamp such as '2026-02-24T10:05:13.661Z'; None if missing."""
+    if not value:
+        return None
     try:
-        with urllib.request.urlopen(req) as response:
-            return json.loads(response.read().decode())
-    except urllib.error.URLError as e:
-        logger.error(f"Error fetching page {page}: {e}")
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
         return None
 
-def sync_prompts():
-    """Sync prompts from the API to the local database."""
+
+def prompt_rows(items):
+    """Map one page of API items to prompts rows, de-duplicated by slug."""
+    rows = {}
+    for item in items:
+        slug = item.get("slug")
+        if not slug:
+            continue
+
+        category_name = categorize(
+            item.get("title", ""),
+            item.get("description", ""),
+            item.get("content", ""),
+            hint=(item.get("category") or {}).get("name"),
+        )
+
+        rows[slug] = {
+            "title": item.get("title") or "Untitled",
+            "description": item.get("description") or "",
+            "prompt_body": item.get("content") or "",
+            "system_prompt": "",  # API doesn't seem to explicitly separate this
+            "category": category_name,
+            "source_slug": slug,
+            "source_url": f"https://prompts.chat/prompt/{slug}",
+            "scraped_at": datetime.now(timezone.utc),
+            "is_served": False,
+        }
+        enrich_row(rows[slug])
+    return list(rows.values())
+
+
+def upsert_prompts(rows):
+    """
+    Insert new rows and update changed ones in one statement.
+
+    INSERT ... ON CONFLICT (source_slug) DO UPDATE only touches rows whose
+    content (CONTENT_COLUMNS) actually differs — a category that differs only
+    because the row was reclassified is not a change — and RETURNING reports
+    which slugs were written;
+    comparing them with the slugs that existed beforehand splits the count
+    into inserted and updated. Updated rows get a new content_version, so
+    API workers stop serving cached text. Serving state (is_served,
+    serve_order) is never overwritten. Derived columns come precomputed in
+    the rows (see prompt_rows), and written rows are (re)indexed for near
+    duplicates. Caller commits.
+
+    Returns:
+        (inserted, updated)
+    """
+    if not rows:
+        return 0, 0
+    if db.engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    table = Prompt.__table__
+    slugs = [row["source_slug"] for row in rows]
+    existing = set(db.session.execute(
+        select(table.c.source_slug).where(table.c.source_slug.in_(slugs))
+    ).scalars())
+
+    stmt = insert(table).values(rows)
+    changed = or_(*(table.c[col].is_distinct_from(stmt.excluded[col]) for col in CONTENT_COLUMNS))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.source_slug],
+        set_={
+            **{col: stmt.excluded[col] for col in UPDATED_COLUMNS + DERIVED_COLUMNS},
+            "content_version": table.c.content_version + 1,
+            "enriched_version": table.c.content_version + 1,
+        },
+        where=changed,
+    ).returning(table.c.id, table.c.source_slug)
+
+    written = dict(db.session.execute(stmt).all())
+    index_prompts(db.session, list(written))
+    slugs_written = set(written.values())
+    return len(slugs_written - existing), len(slugs_written & existing)
+
+
+def store_page(page, data, checkpoint=True):
+    """
+    Upsert one page, advancing the checkpoint in the same transaction.
+
+    Returns:
+        (inserted, updated, unchanged, newest createdAt on the page or None)
+    """
+    items = data.get("prompts") or []
+    rows = prompt_rows(items)
+    inserted, updated = upsert_prompts(rows)
+    if checkpoint:
+        _set_state(CHECKPOINT_KEY, page)
+    db.session.commit()
+
+    created = [c for c in (parse_timestamp(item.get("createdAt")) for item in items) if c]
+    return inserted, updated, len(rows) - inserted - updated, max(created, default=None)
+
+
+def _log_page(page, total_pages, inserted, updated, unchanged):
+    if inserted or updated:
+        logger.info(f"Page {page}/{total_pages}: Inserted {inserted}, Updated {updated}, Unchanged {unchanged}")
+    else:
+        logger.info(f"Page {page}/{total_pages}: All {unchanged} prompts unchanged.")
+
+
+def sync_full(client, workers, restart=False):
+    """
+    Walk every page, resuming from the checkpoint unless `restart`.
+
+    Returns (inserted, updated, newest createdAt seen), or None if the sync
+    stopped early (the checkpoint then points at the last committed page).
+    """
+    totals = [0, 0]
+    newest = None
+
+    start = 1 if restart else _get_state(CHECKPOINT_KEY) + 1
+    if start > 1:
+        logger.info(f"Resuming after checkpoint: page {start - 1} already committed.")
+
+    try:
+        # Page 1 tells us how many pages there are
+        logger.info("Fetching page 1...")
+        first = client.get_page(1)
+        total_pages = first.get("totalPages") or 1
+        if start > total_pages:
+            logger.info(f"Checkpoint is past the last page ({total_pages}); starting over.")
+            start = 1
+
+        logger.info(f"Syncing pages {start}-{total_pages} with {workers} workers...")
+        pages = fetch_pages(client, range(max(start, 2), total_pages + 1), workers)
+        if start == 1:
+            pages = itertools.chain([(1, first)], pages)
+
+        for page, data in pages:
+            try:
+                inserted, updated, unchanged, page_newest = store_page(page, data)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Database error on page {page}: {e}. Stopping; re-run to resume.")
+                return None
+
+            _log_page(page, total_pages, inserted, updated, unchanged)
+            totals[0] += inserted
+            totals[1] += updated
+            if page_newest and (newest is None or page_newest > newest):
+                newest = page_newest
+    except PageFetchError as e:
+        logger.error(f"Could not fetch {e}. Stopping; re-run to resume from the checkpoint.")
+        return None
+
+    # Completed — the next full sync starts from page 1 again
+    _set_state(CHECKPOINT_KEY, 0)
+    return totals[0], totals[1], newest
+
+
+def sync_incremental(client, watermark):
+    """
+    Fetch newest-first pages until one reaches `watermark`.
+
+    Returns (inserted, updated, newest createdAt seen), or None if the sync
+    stopped early. Raises NotNewestFirst if the API ignored the sort order,
+    since stopping at the watermark would then skip prompts.
+    """
+    totals = [0, 0]
+    newest = None
+    page = 1
+    while True:
+        try:
+            data = client.get_page(page)
+        except PageFetchError as e:
+            logger.error(f"Could not fetch {e}. The watermark was not advanced; re-run to retry.")
+            return None
+
+        items = data.get("prompts") or []
+        created = [parse_timestamp(item.get("createdAt")) for item in items]
+        if any(c is None for c in created) or created != sorted(created, reverse=True):
+            raise NotNewestFirst(f"Page {page} is not ordered newest-first")
+
+        try:
+            inserted, updated, unchanged, page_newest = store_page(page, data, checkpoint=False)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Database error on page {page}: {e}. The watermark was not advanced.")
+            return None
+
+        total_pages = data.get("totalPages") or page
+        _log_page(page, total_pages, inserted, updated, unchanged)
+        totals[0] += inserted
+        totals[1] += updated
+        if page_newest and (newest is None or page_newest > newest):
+            newest = page_newest
+
+        # Sorted newest-first, so once the page reaches the watermark the
+        # rest of the catalog has already been synced
+        if not items or created[-1] <= watermark or page >= total_pages:
+            return totals[0], totals[1], newest
+        page += 1
+
+
+def sync_prompts(workers=SYNC_WORKERS, restart=False, full=False):
+    """
+    Sync prompts from the API to the local database.
+
+    Runs incrementally from the watermark when possible, otherwise a full
+    sync. Returns True on success, False if the sync stopped early.
+    """
     app = create_app()
     with app.app_context():
-        # Get start page
-        page = 1
-        total_synced = 0
-        total_skipped = 0
-        
-        while True:
-            logger.info(f"Fetching page {page}...")
-            data = fetch_page(page)
-            
-            if not data or not data.get("prompts"):
-                logger.info("No more prompts found or API error. Stopping.")
-                break
-            
-            prompts_list = data["prompts"]
-            inserted = 0
-            skipped = 0
-            
-            for item in prompts_list:
-                slug = item.get("slug")
-                if not slug:
-                    continue
-                
-                # Check if prompt already exists by source_slug
-                existing = Prompt.query.filter_by(source_slug=slug).first()
-                if existing:
-                    skipped += 1
-                    continue
-                
-                category_name = "general"
-                if item.get("category") and item["category"].get("name"):
-                    category_name = item["category"]["name"]
-                
-                new_prompt = Prompt(
-                    title=item.get("title", "Untitled"),
-                    description=item.get("description", ""),
-                    prompt_body=item.get("content", ""),
-                    system_prompt="", # API doesn't seem to explicitly separate this
-                    category=category_name,
-                    source_slug=slug,
-                    source_url=f"https://prompts.chat/prompt/{slug}"
-                )
-                
-                db.session.add(new_prompt)
-                inserted += 1
-            
-            if inserted > 0:
-                try:
-                    db.session.commit()
-                    logger.info(f"Page {page}: Inserted {inserted}, Skipped {skipped} (already exist)")
-                    total_synced += inserted
-                except Exception as e:
-                    db.session.rollback()
-                    logger.error(f"Database error on page {page}: {e}")
-            else:
-                logger.info(f"Page {page}: All {skipped} prompts already exist.")
-            
-            total_skipped += skipped
-            
-            # Check if we've reached the last page
-            if page >= data.get("totalPages", page):
-                break
-                
-            page += 1
-            
-        logger.info(f"Sync complete. Total new prompts added: {total_synced}. Total skipped (already exist): {total_skipped}.")
+        client = PromptsChatClient()
+        watermark = get_watermark()
+
+        result = None
+        if full or watermark is None or _get_state(CHECKPOINT_KEY):
+            logger.info("Running a full sync...")
+        else:
+            logger.info(f"Running an incremental sync from {watermark.isoformat()}...")
+            try:
+                result = sync_incremental(client, watermark)
+            except NotNewestFirst as e:
+                logger.warning(f"{e}; falling back to a full sync.")
+                full = True
+            if result is None and not full:
+                return False
+        if result is None:
+            result = sync_full(client, workers, restart=restart)
+        if result is None:
+            return False
+
+        inserted, updated, newest = result
+        if newest and (watermark is None or newest > watermark):
+            set_watermark(newest)
+        db.session.commit()
+        logger.info(f"Sync complete. Total new prompts added: {inserted}. Total updated: {updated}.")
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync prompts from prompts.chat.")
+    parser.add_argument("--workers", type=int, default=SYNC_WORKERS,
+                        help="Pages fetched concurrently (default: SYNC_WORKERS or 4).")
+    parser.add_argument("--full", action="store_true",
+                        help="Walk every page instead of stopping at the watermark.")
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignore any saved checkpoint and start a full sync from page 1.")
+    args = parser.parse_args()
 
-if __name__ == "__main__":
     logger.info("Starting prompts.chat sync process...")
-    sync_prompts()
+    if not sync_prompts(workers=max(1, args.workers), restart=args.restart, full=args.full):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Analytics Service — Read-side queries over the serve_daily_* rollups.
+
+Nothing here touches serve_log: every query reads pre-aggregated daily rows,
+so cost depends on the window length (days × categories/sources), not on
+how many serves have been logged. The rollups are maintained by
+services.serve_log_service.rollup_serve_log (run via
+scripts/compact_serve_log.py) and, for submissions, by record_submission.
+Reads go to the read replica when one is configured.
+"""
+
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import bindparam, text
+from models import db, ServeDailyTotal, ServeDailyCategory, ServeDailySource
+from services.serve_log_service import get_rollup_watermark
+from services.read_replica import read_only
+
+MAX_WINDOW_DAYS = 365
+
+
+def _window_start(days):
+    """First day (UTC) of a window of `days` days ending today."""
+    days = max(1, min(int(days), MAX_WINDOW_DAYS))
+    return datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+
+
+def _as_of(session):
+    return get_rollup_watermark(session).isoformat()
+
+
+def record_submission():
+    """Count a user submission against today's totals (caller commits)."""
+    db.session.execute(
+        text("""
+            INSERT INTO serve_daily_totals (day, serves, unique_clients, submissions)
+            VALUES (:day, 0, 0, 1)
+            ON CONFLICT (day) DO UPDATE
+                SET submissions = serve_daily_totals.submissions + 1
+        """).bindparams(bindparam("day", type_=ServeDailyTotal.day.type)),
+        {"day": datetime.now(timezone.utc).date()},
+    )
+
+
+@read_only
+def serves_over_time(session, days=30):
+    """Return serves per day for the last `days` days."""
+    rows = (
+        session.query(ServeDailyTotal)
+        .filter(ServeDailyTotal.day >= _window_start(days))
+        .order_by(ServeDailyTotal.day)
+        .all()
+    )
+    return {
+        "as_of": _as_of(session),
+        "days": [{"day": r.day.isoformat(), "serves": r.serves} for r in rows],
+    }
+
+
+@read_only
+def unique_clients_per_day(session, days=30):
+    """Return distinct client count per day for the last `days` days."""
+    rows = (
+        session.query(ServeDailyTotal)
+        .filter(ServeDailyTotal.day >= _window_start(days))
+        .order_by(ServeDailyTotal.day)
+        .all()
+    )
+    return {
+        "as_of": _as_of(session),
+        "days": [{"day": r.day.isoformat(), "unique_clients": r.unique_clients} for r in rows],
+    }
+
+
+@read_only
+def top_categories(session, days=30, limit=10):
+    """Return the most-served categories over the last `days` days."""
+    serves = db.func.sum(ServeDailyCategory.serves).label("serves")
+    rows = (
+        session.query(ServeDailyCategory.category, serves)
+        .filter(ServeDailyCategory.day >= _window_start(days))
+        .group_by(ServeDailyCategory.category)
+        .order_by(serves.desc())
+        .limit(max(1, min(int(limit), 100)))
+        .all()
+    )
+    return {
+        "as_of": _as_of(session),
+        "categories": [{"category": category, "serves": int(count)} for category, count in rows],
+    }
+
+
+@read_only
+def served_vs_submitted(session, days=30):
+    """
+    Compare user submissions with serves over the last `days` days.
+
+    Returns serves broken down by source, the number of prompts users
+    submitted, and how often a user-submitted prompt was served per
+    submission.
+    """
+    start = _window_start(days)
+
+    submitted = (
+        session.query(db.func.coalesce(db.func.sum(ServeDailyTotal.submissions), 0))
+        .filter(ServeDailyTotal.day >= start)
+        .scalar()
+    )
+    by_source = dict(
+        session.query(ServeDailySource.source, db.func.sum(ServeDailySource.serves))
+        .filter(ServeDailySource.day >= start)
+        .group_by(ServeDailySource.source)
+        .all()
+    )
+    served = {source: int(count) for source, count in by_source.items()}
+    total_served = sum(served.values())
+    served_user = served.get("user", 0)
+
+    return {
+        "as_of": _as_of(session),
+        "submitted": int(submitted),
+        "served": total_served,
+        "served_by_source": served,
+        "user_share_of_serves": round(served_user / total_served, 4) if total_served else 0.0,
+        "serves_per_submission": round(served_user / submitted, 4) if submitted else None,
+    }
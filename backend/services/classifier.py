@@ -0,0 +1,156 @@
+"""
+Classifier — Keyword-based category assignment shared by every ingestion path.
+
+Used by the Playwright scraper, the prompts.chat sync, and user submissions.
+categorize() tries one precompiled alternation per category with .search(),
+in declaration order, and stops at the first that matches. scores()/rank()
+count every hit instead, with all keywords compiled into a single
+trie-shaped regex so counting is one left-to-right pass.
+
+Keywords match as plain substrings (e.g. "code" inside "decode"), and a text
+gets the first category, in declaration order, with any keyword hit — the
+same answers as the original per-category `any(kw in text ...)` loop, so
+reclassifying does not move prompts that were already classified.
+"""
+
+import re
+from collections import Counter
+
+DEFAULT_CATEGORY = "general"
+
+CATEGORY_KEYWORDS = {
+    "coding": ["code", "python", "sql", "html", "css", "javascript", "git", "bug",
+               "function", "latex", "excel", "formula", "script", "apps script",
+               "spreadsheet", "csv", "json", "xml", "algorithm", "complexity"],
+    "writing": ["write", "story", "prose", "edit", "grammar", "poem", "alliteration",
+                "portmanteau", "tongue twister", "memo", "email", "tweet", "pun",
+                "riddle", "simile", "neologism"],
+    "analysis": ["extract", "classify", "analyze", "interpret", "detect", "organize",
+                 "data", "review", "insight", "report", "summarize", "grade",
+                 "estimate", "evaluate"],
+    "education": ["teach", "explain", "simplify", "lesson", "tutor", "socratic",
+                  "trivia", "interview", "career", "mentor", "coach"],
+    "creative": ["creative", "fashion", "brand", "product", "name", "design",
+                 "color", "mood", "dream", "sci-fi", "vr", "game", "travel",
+                 "culinary", "recipe", "fitness"],
+    "language": ["translate", "language", "idiom", "polyglot", "emoji", "airport",
+                 "direction", "decode"],
+    "productivity": ["meeting", "moderate", "pii", "motivat", "mindful", "ethical",
+                     "perspective", "cite", "source"],
+}
+
+
+def _trie_regex(words):
+    """
+    Build a regex source matching any of `words`, factored as a prefix trie.
+
+    ["code", "color", "css"] becomes "c(?:o(?:de|lor)|ss)", so at each text
+    position the engine follows one branch instead of trying every keyword.
+    Longer alternatives are tried first, giving the longest keyword that
+    starts at a position.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node):
+        branches = []
+        for ch in sorted(node, key=lambda c: (c == "", c)):
+            if ch == "":
+                continue
+            branches.append(re.escape(ch) + emit(node[ch]))
+        optional = "" in node
+        if not branches:
+            return ""
+        if len(branches) == 1 and not optional:
+            return branches[0]
+        body = "(?:" + "|".join(branches) + ")"
+        return body + "?" if optional else body
+
+    return emit(trie)
+
+
+class KeywordClassifier:
+    """
+    Single-pass multi-category keyword classifier.
+
+    Scores are the number of keyword occurrences per category, for
+    reporting; categorize() picks the first category in declaration order
+    that has any hit, whatever the counts.
+    """
+
+    def __init__(self, keywords=CATEGORY_KEYWORDS, default=DEFAULT_CATEGORY):
+        self.default = default
+        self.order = {category: i for i, category in enumerate(keywords)}
+
+        owners = {}
+        for category, words in keywords.items():
+            for word in words:
+                owners.setdefault(word.lower(), []).append(category)
+
+        # The regex reports only the longest keyword starting at each
+        # position, so credit every keyword that is a prefix of it too
+        # (e.g. "direction" also counts "dir" if both were keywords).
+        self._credits = {}
+        for word in owners:
+            cats = []
+            for other, other_cats in owners.items():
+                if word.startswith(other):
+                    cats.extend(other_cats)
+            self._credits[word] = cats
+
+        # Zero-width lookahead so a match can start at every position
+        self._pattern = re.compile(f"(?=({_trie_regex(owners)}))")
+        # For categorize(): any keyword of the category, anywhere
+        self._first_match = [
+            (category, re.compile(_trie_regex([word.lower() for word in words])))
+            for category, words in keywords.items() if words
+        ]
+
+    def scores(self, text):
+        """Return a Counter of category -> keyword hits for `text`."""
+        counts = Counter()
+        for match in self._pattern.finditer(text.lower()):
+            counts.update(self._credits[match.group(1)])
+        return counts
+
+    def rank(self, text, limit=None):
+        """Return [(category, score), ...] best first, ties in declaration order."""
+        ranked = sorted(self.scores(text).items(), key=lambda kv: (-kv[1], self.order[kv[0]]))
+        return ranked[:limit] if limit else ranked
+
+    def categorize(self, text):
+        """Return the first declared category with a keyword in `text`, or the default."""
+        text = text.lower()
+        for category, pattern in self._first_match:
+            if pattern.search(text):
+                return category
+        return self.default
+
+
+# Built once per process and shared by all callers
+default_classifier = KeywordClassifier()
+
+
+# How much of the prompt body to read when there is no description
+BODY_SAMPLE_CHARS = 500
+
+
+def categorize(title, description="", body="", hint=None):
+    """
+    Ingestion step: assign a category to a prompt.
+
+    A `hint` (e.g. an upstream category name) is used when it names one of
+    our categories. Otherwise the title and description are classified,
+    falling back to the start of the body when there is no description.
+    """
+    if hint:
+        normalized = hint.strip().lower()
+        if normalized in default_classifier.order or normalized == DEFAULT_CATEGORY:
+            return normalized
+    if not description and body:
+        description = body[:BODY_SAMPLE_CHARS]
+    return default_classifier.categorize(f"{title or ''} {description or ''}")
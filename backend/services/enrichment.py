@@ -0,0 +1,62 @@
+"""
+Enrichment — Derived columns computed once per prompt content version.
+
+enrich() turns a prompt's text into the columns in DERIVED_COLUMNS:
+
+  - char_length:     characters in system prompt + body
+  - token_estimate:  approximate tokens (services.prompt_analyzer.estimate_tokens)
+  - normalized_text: lowercased body with punctuation and runs of whitespace
+                     collapsed, for matching and search
+  - content_hash:    services.snapshot.prompt_content_hash of the content
+
+prompts.enriched_version records the content_version the columns were
+computed for. Ingestion paths that know the content (POST /api/prompt, the
+prompts.chat sync, the Playwright scraper) enrich inline; anything else —
+migrations, manual edits — leaves enriched_version behind content_version,
+and scripts/enrich_prompts.py catches those rows up across a process pool.
+
+The functions here are pure (no app or database), so pool workers can run
+them without an application context.
+"""
+
+import re
+import unicodedata
+from services.prompt_analyzer import estimate_tokens
+from services.snapshot import prompt_content_hash
+
+DERIVED_COLUMNS = ("char_length", "token_estimate", "normalized_text", "content_hash")
+
+_NON_WORD = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def normalize_text(text):
+    """Lowercase, NFKC-fold, and reduce punctuation/whitespace runs to single spaces."""
+    folded = unicodedata.normalize("NFKC", text or "").lower()
+    return _NON_WORD.sub(" ", folded).strip()
+
+
+def enrich(title, description, prompt_body, system_prompt):
+    """Derived column values for one prompt's content."""
+    text = f"{system_prompt}\n{prompt_body}" if system_prompt else (prompt_body or "")
+    return {
+        "char_length": len(text),
+        "token_estimate": estimate_tokens(text),
+        "normalized_text": normalize_text(prompt_body),
+        "content_hash": prompt_content_hash(title, description, prompt_body, system_prompt),
+    }
+
+
+def enrich_row(row, version=1):
+    """Add the derived columns (and enriched_version) to an insert/update row dict."""
+    row.update(enrich(row.get("title"), row.get("description"), row.get("prompt_body"),
+                      row.get("system_prompt")))
+    row["enriched_version"] = version
+    return row
+
+
+def enrich_batch(rows):
+    """Process-pool entry point: [(id, version, title, description, body, system)] -> update dicts."""
+    return [
+        {"b_id": pid, "b_version": version, **enrich(title, description, body, system)}
+        for pid, version, title, description, body, system in rows
+    ]
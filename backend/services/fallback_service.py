@@ -0,0 +1,470 @@
+"""
+Fallback Service — Keeps /api/prompt/daily up while the database is unavailable.
+
+serve_prompt() wraps serve_next_prompt (or serve_prompts, for a batch) in a
+circuit breaker. After
+CIRCUIT_FAILURE_THRESHOLD consecutive database errors the breaker opens and,
+for CIRCUIT_RESET_SECONDS, serves come from an in-memory copy of the corpus
+instead of waiting on the database; then one request probes it again.
+
+Degraded serves:
+  1. Pick a prompt this worker has not handed out yet (best effort: each
+     worker tracks its own picks, starting from the unserved set it last saw)
+  2. Append the serve to a local JSONL journal (SERVE_JOURNAL_PATH)
+  3. Once the database answers again, the journal is replayed into serve_log
+     and the served flags; replay skips entries already in serve_log, so a
+     journal that is replayed twice does no harm. Serves older than the
+     rollup watermark go straight into the serve_daily_* rollups too
+
+The corpus is refreshed every FALLBACK_REFRESH_SECONDS after a successful
+serve, fetching text only for new or changed prompts (by content_version).
+A worker that starts during an outage loads FALLBACK_SNAPSHOT_PATH instead,
+if set (see scripts/snapshot_prompts.py).
+"""
+
+import os
+import glob
+import json
+import time
+import random
+import logging
+import threading
+from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy import select, update, text, bindparam
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+from models import db, Prompt, ServeLog
+from services.prompt_cache import CONTENT_COLUMNS
+from services.near_duplicates import pool_clause
+from services.prompt_service import serve_next_prompt, serve_prompts
+from services.serve_log_service import fold_replayed_serves
+from services.stats_stream import publish_stats_changed
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean "the database is unavailable", as opposed to a bug
+DATABASE_ERRORS = (DBAPIError, PoolTimeoutError)
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker: closed → open → half-open probe → closed."""
+
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        """True if a database call should be attempted now."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_seconds and not self._probing:
+                # Half-open: let exactly one request through to probe
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info("Database reachable again; closing circuit.")
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def release_probe(self):
+        """Free the half-open probe slot after an attempt that proved nothing either way."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning(f"{self.failures} consecutive database errors; opening circuit.")
+                self.opened_at = time.monotonic()
+
+
+class FallbackCorpus:
+    """In-memory prompt contents plus this worker's view of what is unserved."""
+
+    def __init__(self):
+        self.contents = {}   # id -> content dict
+        self.versions = {}   # id -> content_version
+        # Unserved ids as a list for O(1) random picks, plus each id's position
+        # in it so one can be swap-removed in O(1) too
+        self.unserved = []
+        self._positions = {}
+        self.loaded_at = None
+        self._lock = threading.Lock()
+
+    def is_stale(self, max_age):
+        return self.loaded_at is None or time.monotonic() - self.loaded_at >= max_age
+
+    def refresh(self, session):
+        """Reload from the database, fetching text only for new or changed prompts."""
+        rows = session.execute(
+            select(Prompt.id, Prompt.content_version, Prompt.category, Prompt.is_served).where(pool_clause())
+        ).all()
+        versions = {row.id: row.content_version for row in rows}
+        changed = [pid for pid, version in versions.items() if self.versions.get(pid) != version]
+
+        contents = {pid: self.contents[pid] for pid in versions if pid not in changed}
+        # Reclassification changes category without a new content_version
+        for row in rows:
+            content = contents.get(row.id)
+            if content is not None and content["category"] != (row.category or ""):
+                contents[row.id] = dict(content, category=row.category or "")
+        for i in range(0, len(changed), 1000):
+            batch = changed[i:i + 1000]
+            for row in session.execute(
+                select(Prompt.id, *(getattr(Prompt, col) for col in CONTENT_COLUMNS))
+                .where(Prompt.id.in_(batch))
+            ).mappings():
+                contents[row["id"]] = {col: row[col] or "" for col in CONTENT_COLUMNS}
+
+        with self._lock:
+            self.contents = contents
+            self.versions = versions
+            self._set_unserved(row.id for row in rows if not row.is_served and row.id in contents)
+            self.loaded_at = time.monotonic()
+
+    def load_snapshot(self, path):
+        """Load contents from a snapshot file (all prompts count as unserved)."""
+        from services.snapshot import SnapshotReader
+        with SnapshotReader(path) as reader:
+            contents = {row["id"]: {col: row.get(col) or "" for col in CONTENT_COLUMNS} for row in reader}
+        with self._lock:
+            self.contents = contents
+            self.versions = {}
+            self._set_unserved(contents)
+            # Stale on purpose: replace it from the database as soon as possible
+            self.loaded_at = None
+        logger.info(f"Loaded {len(contents)} prompts from snapshot {path}.")
+
+    def pick(self):
+        """Take a random prompt not yet handed out, starting over once all have been."""
+        with self._lock:
+            if not self.contents:
+                return None
+            if not self.unserved:
+                self._set_unserved(self.contents)
+            prompt_id = self.unserved[random.randrange(len(self.unserved))]
+            self._discard(prompt_id)
+            return prompt_id, self.contents[prompt_id], len(self.contents), len(self.unserved)
+
+    def mark_served(self, prompt_ids):
+        with self._lock:
+            for prompt_id in prompt_ids:
+                self._discard(prompt_id)
+
+    def _set_unserved(self, prompt_ids):
+        self.unserved = list(prompt_ids)
+        self._positions = {prompt_id: i for i, prompt_id in enumerate(self.unserved)}
+
+    def _discard(self, prompt_id):
+        """Remove an id by moving the last one into its slot."""
+        i = self._positions.pop(prompt_id, None)
+        if i is None:
+            return
+        last = self.unserved.pop()
+        if last != prompt_id:
+            self.unserved[i] = last
+            self._positions[last] = i
+
+
+class ServeJournal:
+    """Append-only JSONL file of serves made while the database was down."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, entry):
+        line = (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            # One write() per line on an O_APPEND descriptor, so lines from
+            # several workers never interleave
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+
+    def has_pending(self):
+        return os.path.exists(self.path) or bool(glob.glob(f"{self.path}.replay-*"))
+
+    def claim(self):
+        """
+        Move pending entries aside for replay and return [(file, entries)].
+
+        The rename is atomic, so when several workers recover at once only one
+        of them claims the live journal. Files left over from a failed replay
+        are claimed again.
+        """
+        if os.path.exists(self.path):
+            try:
+                os.rename(self.path, f"{self.path}.replay-{os.getpid()}-{time.time_ns()}")
+            except FileNotFoundError:
+                pass  # another worker got there first
+
+        claimed = []
+        for name in sorted(glob.glob(f"{self.path}.replay-*")):
+            entries = []
+            with open(name, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue  # torn last line from a crash
+            claimed.append((name, entries))
+        return claimed
+
+
+_breaker = None
+_corpus = FallbackCorpus()
+_journal = None
+_replay_lock = threading.Lock()
+_init_lock = threading.Lock()
+
+
+def _components():
+    global _breaker, _journal
+    if _breaker is None:
+        with _init_lock:
+            if _breaker is None:
+                config = current_app.config
+                _journal = ServeJournal(config["SERVE_JOURNAL_PATH"])
+                _breaker = CircuitBreaker(config["CIRCUIT_FAILURE_THRESHOLD"], config["CIRCUIT_RESET_SECONDS"])
+    return _breaker, _corpus, _journal
+
+
+def circuit_open():
+    """True while this worker's circuit is open and serves come from the fallback corpus."""
+    return _components()[0].is_open
+
+
+def serve_prompt(client_ip=None, user_agent=None, count=None):
+    """
+    Serve the next prompt from the database, or from the fallback corpus
+    while the database is unavailable.
+
+    With `count`, serve a batch and return {"prompts": [...], "stats": {...}}
+    instead of a single prompt.
+
+    Raises the database error if there is nothing to fall back on.
+    """
+    breaker, corpus, journal = _components()
+
+    def serve():
+        if count is None:
+            return serve_next_prompt(client_ip=client_ip, user_agent=user_agent)
+        return serve_prompts(count, client_ip=client_ip, user_agent=user_agent)
+
+    if not current_app.config["DEGRADED_MODE_ENABLED"]:
+        return serve()
+
+    error = None
+    if breaker.allow():
+        try:
+            result = serve()
+        except DATABASE_ERRORS as e:
+            db.session.rollback()
+            breaker.record_failure()
+            error = e
+        except Exception:
+            # A bug, not an outage: surface it, but let the next request probe
+            breaker.release_probe()
+            raise
+        else:
+            breaker.record_success()
+            _after_success(corpus, journal, result)
+            return result
+
+    degraded = _serve_degraded(corpus, journal, client_ip, user_agent, count)
+    if degraded is None:
+        if error is not None:
+            raise error
+        raise RuntimeError("database circuit is open and no fallback corpus is loaded")
+    return degraded
+
+
+def _after_success(corpus, journal, result):
+    """Housekeeping once the database has answered: replay, then refresh."""
+    try:
+        if journal.has_pending():
+            replay_journal(journal)
+        if result is not None:
+            prompts = result["prompts"] if "prompts" in result else [result]
+            corpus.mark_served(prompt["id"] for prompt in prompts)
+        if corpus.is_stale(current_app.config["FALLBACK_REFRESH_SECONDS"]):
+            corpus.refresh(db.session)
+            db.session.rollback()
+    except DATABASE_ERRORS as e:
+        db.session.rollback()
+        logger.warning(f"Fallback housekeeping failed ({e.__class__.__name__}); will retry.")
+    except Exception:
+        # The serve itself is committed; never turn it into an error response
+        db.session.rollback()
+        logger.exception("Fallback housekeeping failed; will retry.")
+
+
+def _serve_degraded(corpus, journal, client_ip, user_agent, count=None):
+    if not corpus.contents:
+        snapshot = current_app.config.get("FALLBACK_SNAPSHOT_PATH")
+        if not snapshot or not os.path.exists(snapshot):
+            return None
+        corpus.load_snapshot(snapshot)
+
+    prompts = []
+    picked_ids = set()
+    total = remaining = 0
+    wanted = min(count or 1, len(corpus.contents))
+    # pick() starts over once everything has been handed out, which can
+    # repeat a prompt already in this batch; skip those
+    for _ in range(wanted * 2):
+        if len(prompts) == wanted:
+            break
+        picked = corpus.pick()
+        if picked is None:
+            break
+        if picked[0] in picked_ids:
+            continue
+        prompt_id, content, total, remaining = picked
+        picked_ids.add(prompt_id)
+
+        served_at = datetime.now(timezone.utc)
+        journal.append({
+            "prompt_id": prompt_id,
+            "served_at": served_at.isoformat(),
+            "client_ip": client_ip,
+            "user_agent": user_agent,
+        })
+        prompts.append({
+            "id": prompt_id,
+            **content,
+            # Assigned when the journal is replayed
+            "serve_order": None,
+            "served_at": served_at.isoformat(),
+        })
+    if not prompts:
+        return None
+
+    # This worker's view while the database is unreachable
+    stats = {"total": total, "served": total - remaining, "remaining": remaining}
+    if count is None:
+        return {**prompts[0], "stats": stats, "degraded": True}
+    return {"prompts": prompts, "stats": stats, "degraded": True}
+
+
+def replay_journal(journal=None):
+    """
+    Write journaled serves into serve_log and the prompts' served flags.
+
+    Entries already present in serve_log (same prompt and served_at) are
+    skipped, and prompts deleted in the meantime are ignored. Returns the
+    number of serves replayed.
+    """
+    journal = journal or _components()[2]
+    if not _replay_lock.acquire(blocking=False):
+        return 0
+    try:
+        replayed = 0
+        for name, entries in journal.claim():
+            replayed += _replay_entries(entries)
+            db.session.commit()
+            os.remove(name)
+        if replayed:
+            logger.info(f"Replayed {replayed} serves from the degraded-mode journal.")
+            publish_stats_changed()
+        return replayed
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        _replay_lock.release()
+
+
+def _utc_naive(value):
+    """Comparable form of a timestamp, whether or not the driver returned a tz-aware one."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _replay_entries(entries):
+    valid = []
+    for entry in entries:
+        try:
+            valid.append({
+                "prompt_id": int(entry["prompt_id"]),
+                "served_at": datetime.fromisoformat(entry["served_at"]),
+                "client_ip": entry.get("client_ip"),
+                "user_agent": entry.get("user_agent"),
+            })
+        except (KeyError, TypeError, ValueError):
+            logger.warning(f"Skipping malformed journal entry: {entry!r}")
+    if not valid:
+        return 0
+
+    # Which prompts still exist and which serves are already logged, a
+    # batch of prompt ids per query rather than one query per entry
+    log = ServeLog.__table__
+    prompt_ids = sorted({e["prompt_id"] for e in valid})
+    start = min(e["served_at"] for e in valid)
+    end = max(e["served_at"] for e in valid)
+    existing_ids = set()
+    logged = set()
+    for i in range(0, len(prompt_ids), 1000):
+        batch = prompt_ids[i:i + 1000]
+        existing_ids.update(db.session.scalars(select(Prompt.id).where(Prompt.id.in_(batch))))
+        logged.update(
+            (prompt_id, _utc_naive(served_at))
+            for prompt_id, served_at in db.session.execute(
+                select(log.c.prompt_id, log.c.served_at)
+                .where(log.c.prompt_id.in_(batch), log.c.served_at >= start, log.c.served_at <= end)
+            )
+        )
+
+    pending = []
+    for entry in sorted(valid, key=lambda e: e["served_at"]):
+        key = (entry["prompt_id"], _utc_naive(entry["served_at"]))
+        if entry["prompt_id"] in existing_ids and key not in logged:
+            logged.add(key)  # a line journaled twice is replayed once
+            pending.append(entry)
+    if not pending:
+        return 0
+
+    log_ids = db.session.scalars(log.insert().returning(log.c.id), pending).all()
+    fold_replayed_serves(log_ids)
+
+    # Hand out serve_order values in the order the serves happened
+    last = db.session.execute(
+        text("""
+            UPDATE app_state SET value_int = value_int + :n
+            WHERE key = 'serve_counter'
+            RETURNING value_int
+        """),
+        {"n": len(pending)},
+    ).scalar() or len(pending)
+    first = last - len(pending) + 1
+    db.session.execute(
+        update(Prompt.__table__)
+        .where(Prompt.__table__.c.id == bindparam("b_id"))
+        .values(is_served=True, served_at=bindparam("b_served_at"), serve_order=bindparam("b_order")),
+        [
+            {"b_id": e["prompt_id"], "b_served_at": e["served_at"], "b_order": first + i}
+            for i, e in enumerate(pending)
+        ],
+    )
+    return len(pending)
@@ -0,0 +1,193 @@
+"""
+Near Duplicates — MinHash/LSH index that flags lightly edited copies of a prompt.
+
+Comparing every prompt with every other is O(n²). Instead, at ingestion:
+
+  1. prompt_body is normalized and cut into word shingles (SHINGLE_WORDS long)
+  2. A MinHash signature of NUM_PERM values estimates Jaccard similarity
+     between two prompts' shingle sets; it is stored in prompts.minhash
+  3. The signature is split into BANDS bands of ROWS values; each band is
+     hashed to a bucket and stored in prompt_lsh_band. Prompts sharing any
+     (band, bucket) pair are candidates — one indexed lookup per batch
+  4. Candidates whose estimated similarity reaches NEAR_DUPLICATE_THRESHOLD
+     are duplicates: the newer prompt's duplicate_of points at the oldest
+     prompt of the cluster
+
+With 16 bands of 4 rows, pairs above ~0.5 similarity almost always become
+candidates and pairs below ~0.3 almost never do, so the threshold check only
+looks at a handful of rows. With SERVE_EXCLUDE_DUPLICATES the serving pool
+(and its stats) leaves out prompts that have a duplicate_of.
+"""
+
+import re
+import struct
+import random
+import hashlib
+from flask import current_app, has_app_context
+from sqlalchemy import delete, select, tuple_, update, true
+from models import db, Prompt, PromptLshBand
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+
+_MERSENNE = (1 << 61) - 1
+_MASK32 = (1 << 32) - 1
+# Fixed seed: signatures must stay comparable across processes and releases
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERM)]
+_SIGNATURE = struct.Struct(f"<{NUM_PERM}I")
+_BAND = struct.Struct(f"<{ROWS}I")
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def shingles(text):
+    """Set of SHINGLE_WORDS-word shingles of the lowercased text."""
+    words = _WORD.findall((text or "").lower())
+    if len(words) <= SHINGLE_WORDS:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def signature(text):
+    """
+    MinHash signature (tuple of NUM_PERM 32-bit ints) of the text's shingles,
+    or None for text with no words: every such text would get the same
+    signature and be flagged as a copy of all the others.
+    """
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+        for s in shingles(text)
+    ]
+    if not hashes:
+        return None
+    return tuple(min((a * h + b) % _MERSENNE for h in hashes) & _MASK32 for a, b in _PERMUTATIONS)
+
+
+def pack(sig):
+    return _SIGNATURE.pack(*sig)
+
+
+def unpack(blob):
+    return _SIGNATURE.unpack(blob)
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(a == b for a, b in zip(sig_a, sig_b)) / NUM_PERM
+
+
+def band_keys(sig):
+    """[(band, bucket)] for a signature; bucket is a signed 64-bit hash of the band's rows."""
+    return [
+        (band, int.from_bytes(
+            hashlib.blake2b(_BAND.pack(*sig[band * ROWS:(band + 1) * ROWS]), digest_size=8).digest(),
+            "little", signed=True,
+        ))
+        for band in range(BANDS)
+    ]
+
+
+def excluding_duplicates():
+    return has_app_context() and current_app.config["SERVE_EXCLUDE_DUPLICATES"]
+
+
+def pool_sql():
+    """Extra SQL condition restricting the serving pool ("" unless SERVE_EXCLUDE_DUPLICATES)."""
+    return "AND duplicate_of IS NULL" if excluding_duplicates() else ""
+
+
+def pool_clause():
+    """pool_sql() as a SQLAlchemy expression."""
+    return Prompt.duplicate_of.is_(None) if excluding_duplicates() else true()
+
+
+def index_prompts(session, prompt_ids, threshold=None):
+    """
+    (Re)compute signatures and bands for the given prompts and flag near
+    duplicates of older prompts. Caller commits.
+
+    Prompts in the same call are matched against each other as well as
+    against the stored index. Prompts without a signature (no words in the
+    body) are left out of the index and never flagged. Returns
+    {prompt_id: duplicate_of} for the prompts found to be duplicates.
+    """
+    if not prompt_ids:
+        return {}
+    if threshold is None:
+        threshold = current_app.config["NEAR_DUPLICATE_THRESHOLD"]
+
+    rows = session.execute(
+        select(Prompt.id, Prompt.prompt_body).where(Prompt.id.in_(prompt_ids)).order_by(Prompt.id)
+    ).all()
+    if not rows:
+        return {}
+    sigs = {}
+    for row in rows:
+        sig = signature(row.prompt_body)
+        if sig is not None:
+            sigs[row.id] = sig
+    keys = {pid: band_keys(sig) for pid, sig in sigs.items()}
+    ids = list(sigs)
+    unsigned = [row.id for row in rows if row.id not in sigs]
+
+    # Candidates from the stored index, in one lookup for the whole batch
+    session.execute(delete(PromptLshBand).where(PromptLshBand.prompt_id.in_([row.id for row in rows])))
+    all_keys = list({key for ks in keys.values() for key in ks})
+    buckets = {}
+    for i in range(0, len(all_keys), 500):
+        for band, bucket, pid in session.execute(
+            select(PromptLshBand.band, PromptLshBand.bucket, PromptLshBand.prompt_id)
+            .where(tuple_(PromptLshBand.band, PromptLshBand.bucket).in_(all_keys[i:i + 500]))
+        ):
+            buckets.setdefault((band, bucket), set()).add(pid)
+
+    stored = {}
+    candidate_ids = {pid for members in buckets.values() for pid in members} - set(ids)
+    if candidate_ids:
+        stored = {
+            row.id: (unpack(row.minhash), row.duplicate_of)
+            for row in session.execute(
+                select(Prompt.id, Prompt.minhash, Prompt.duplicate_of)
+                .where(Prompt.id.in_(candidate_ids), Prompt.minhash.is_not(None))
+            )
+        }
+
+    duplicates = {}
+    for pid in ids:
+        sig = sigs[pid]
+        best = None
+        for key in keys[pid]:
+            for other in buckets.get(key, ()):
+                if other >= pid:
+                    continue  # only point at older prompts, so clusters cannot loop
+                if other in sigs:
+                    other_sig, other_root = sigs[other], duplicates.get(other)
+                elif other in stored:
+                    other_sig, other_root = stored[other]
+                else:
+                    continue
+                score = similarity(sig, other_sig)
+                if score >= threshold and (best is None or score > best[0]):
+                    best = (score, other_root or other)
+        if best is not None:
+            duplicates[pid] = best[1]
+        # Visible to the rest of this batch
+        for key in keys[pid]:
+            buckets.setdefault(key, set()).add(pid)
+
+    session.execute(
+        update(Prompt.__table__)
+        .where(Prompt.__table__.c.id == db.bindparam("b_id"))
+        .values(minhash=db.bindparam("b_minhash"), duplicate_of=db.bindparam("b_duplicate_of")),
+        [{"b_id": pid, "b_minhash": pack(sigs[pid]), "b_duplicate_of": duplicates.get(pid)} for pid in ids]
+        + [{"b_id": pid, "b_minhash": None, "b_duplicate_of": None} for pid in unsigned],
+    )
+    if ids:
+        session.execute(PromptLshBand.__table__.insert(), [
+            {"band": band, "bucket": bucket, "prompt_id": pid}
+            for pid in ids for band, bucket in keys[pid]
+        ])
+    return duplicates
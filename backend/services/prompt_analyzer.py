@@ -0,0 +1,194 @@
+"""
+Prompt Analyzer — Deterministic structure metrics for a prompt's text.
+
+analyze_text() looks only at the text, so the result for a given prompt body
+and system prompt never changes. Results are therefore keyed by content hash
+(see services/snapshot.prompt_content_hash) and ANALYZER_VERSION:
+
+  1. A per-worker LRU (ANALYSIS_CACHE_SIZE entries) answers repeats in memory
+  2. The prompt_analysis table answers repeats across workers and restarts
+  3. Only text never seen before is analyzed, and the result is stored
+
+Bump ANALYZER_VERSION whenever the metrics change; older rows are then
+ignored and recomputed on demand (or by scripts/analyze_prompts.py).
+"""
+
+import re
+import math
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from models import db, PromptAnalysis
+from services.snapshot import prompt_content_hash
+
+ANALYZER_VERSION = 1
+
+# Rough English average for Claude-style BPE tokenizers
+CHARS_PER_TOKEN = 4
+
+MARKDOWN_HEADING = re.compile(r"^\s{0,3}(#{1,6})\s+(.+?)\s*#*\s*$", re.MULTILINE)
+# "Instructions:" / "Step 2: ..." style labels on a line of their own
+LABEL_HEADING = re.compile(r"^\s*([A-Z][\w ]{1,40}):\s*$", re.MULTILINE)
+XML_OPEN = re.compile(r"<([A-Za-z][\w\-.]*)(?:\s[^<>]*)?>")
+XML_CLOSE = re.compile(r"</([A-Za-z][\w\-.]*)\s*>")
+# {{VAR}} (Anthropic library), ${Var} / ${Var:default} (prompts.chat), [VAR]
+VARIABLE_PATTERNS = (
+    re.compile(r"\{\{\s*([^{}]+?)\s*\}\}"),
+    re.compile(r"\$\{\s*([^{}:]+?)\s*(?::[^{}]*)?\}"),
+    re.compile(r"\[([A-Z][A-Z0-9_ ]{1,40})\]"),
+)
+ROLE_STATEMENT = re.compile(r"^\s*(?:you are|you're|act as|i want you to act as)\b", re.IGNORECASE)
+
+
+def estimate_tokens(text):
+    """Approximate token count (~CHARS_PER_TOKEN characters per token)."""
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def _xml_tags(text):
+    opened = Counter(XML_OPEN.findall(text))
+    closed = Counter(XML_CLOSE.findall(text))
+    paired = sorted(tag for tag in opened if closed.get(tag))
+    unclosed = sorted(tag for tag in opened if opened[tag] > closed.get(tag, 0))
+    return {"tags": paired, "count": sum(min(opened[t], closed[t]) for t in paired), "unclosed": unclosed}
+
+
+def _sections(text):
+    titles = [m.group(2) for m in MARKDOWN_HEADING.finditer(text)]
+    titles += [m.group(1) for m in LABEL_HEADING.finditer(text)]
+    return titles
+
+
+def _variables(text):
+    names = []
+    for pattern in VARIABLE_PATTERNS:
+        for name in pattern.findall(text):
+            if name not in names:
+                names.append(name)
+    return names
+
+
+def analyze_text(prompt_body, system_prompt=""):
+    """Structure metrics for a prompt body and optional system prompt."""
+    body = prompt_body or ""
+    system = system_prompt or ""
+    combined = f"{system}\n{body}" if system else body
+
+    xml = _xml_tags(combined)
+    sections = _sections(combined)
+    variables = _variables(combined)
+    return {
+        "length": {
+            "chars": len(combined),
+            "words": len(combined.split()),
+            "lines": combined.count("\n") + 1 if combined else 0,
+        },
+        "approx_tokens": estimate_tokens(combined),
+        "system_prompt": {
+            "present": bool(system.strip()),
+            "chars": len(system),
+            # A role set at the top of the body is a system prompt in disguise
+            "role_statement": bool(ROLE_STATEMENT.match(system or body)),
+        },
+        "sections": {"count": len(sections), "titles": sections},
+        "xml_tags": xml,
+        "variables": {"count": len(variables), "names": variables},
+    }
+
+
+def analysis_key(prompt_body, system_prompt=""):
+    return prompt_content_hash("", "", prompt_body, system_prompt)
+
+
+class AnalysisCache:
+    """Thread-safe LRU of analysis results keyed by content hash."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+            return result
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnalysisCache(current_app.config["ANALYSIS_CACHE_SIZE"])
+    return _cache
+
+
+def store_analyses(session, results):
+    """Insert {content_hash: metrics} into prompt_analysis, replacing older analyzer versions."""
+    if not results:
+        return
+    now = datetime.now(timezone.utc)
+    rows = [
+        {"content_hash": key, "analyzer_version": ANALYZER_VERSION, "metrics": metrics, "analyzed_at": now}
+        for key, metrics in results.items()
+    ]
+    dialect = postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(PromptAnalysis).values(rows)
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=["content_hash"],
+        set_={
+            "analyzer_version": stmt.excluded.analyzer_version,
+            "metrics": stmt.excluded.metrics,
+            "analyzed_at": stmt.excluded.analyzed_at,
+        },
+        where=PromptAnalysis.analyzer_version < stmt.excluded.analyzer_version,
+    ))
+
+
+def analyze_prompt(prompt_body, system_prompt=""):
+    """
+    Return (content_hash, metrics, cached) for a prompt, from the LRU, the
+    prompt_analysis table, or a fresh analysis (which is then stored). A
+    database error only skips the table; the analysis is still returned.
+    """
+    key = analysis_key(prompt_body, system_prompt)
+    cache = get_cache()
+    metrics = cache.get(key)
+    if metrics is not None:
+        return key, metrics, True
+
+    try:
+        row = db.session.get(PromptAnalysis, key)
+    except SQLAlchemyError:
+        # Analysis needs no database; carry on without the stored copy
+        db.session.rollback()
+        row = None
+    if row is not None and row.analyzer_version == ANALYZER_VERSION:
+        cache.put(key, row.metrics)
+        return key, row.metrics, True
+
+    metrics = analyze_text(prompt_body, system_prompt)
+    try:
+        store_analyses(db.session, {key: metrics})
+        db.session.commit()
+    except SQLAlchemyError:
+        # The analysis itself is still good; it is simply not persisted
+        db.session.rollback()
+    cache.put(key, metrics)
+    return key, metrics, False
@@ -0,0 +1,116 @@
+"""
+Prompt Cache — Per-worker LRU of prompt content, bounded in bytes.
+
+Prompt text almost never changes, so the serve transaction only claims ids;
+title, description, body and the rest come from this cache. Entries are keyed
+by (id, content_version): every writer that changes a prompt bumps its
+version, so an updated prompt simply misses and the stale entry ages out.
+The cached category may lag a reclassification (which leaves the version
+alone), so serving takes category from the claim instead.
+Misses are fetched in one query for the whole batch.
+"""
+
+import threading
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import select
+from models import db, Prompt
+
+CONTENT_COLUMNS = ("title", "description", "prompt_body", "system_prompt", "category", "source_url")
+# Precomputed at ingestion (services/enrichment.py) and served alongside the text
+DERIVED_COLUMNS = ("token_estimate",)
+
+
+def _entry_size(content):
+    return sum(len((content[col] or "").encode("utf-8")) for col in CONTENT_COLUMNS)
+
+
+class PromptContentCache:
+    """Thread-safe LRU of content dicts keyed by (prompt_id, content_version)."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, content):
+        size = _entry_size(content)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._entries[key] = (content, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return this process's cache, created on first use from PROMPT_CACHE_MAX_BYTES."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PromptContentCache(current_app.config["PROMPT_CACHE_MAX_BYTES"])
+    return _cache
+
+
+def get_contents(keys):
+    """
+    Return {prompt_id: content dict} for (prompt_id, content_version) pairs.
+
+    Cache misses are loaded with a single query. If a prompt was updated
+    after it was claimed, the newer content is returned (and cached under
+    its own version).
+    """
+    cache = get_cache()
+    contents = {}
+    missing = []
+    for prompt_id, version in keys:
+        content = cache.get((prompt_id, version))
+        if content is None:
+            missing.append(prompt_id)
+        else:
+            contents[prompt_id] = content
+
+    if missing:
+        table = Prompt.__table__
+        rows = db.session.execute(
+            select(table.c.id, table.c.content_version,
+                   *(table.c[col] for col in CONTENT_COLUMNS + DERIVED_COLUMNS))
+            .where(table.c.id.in_(missing))
+        ).mappings()
+        for row in rows:
+            content = {col: row[col] for col in CONTENT_COLUMNS + DERIVED_COLUMNS}
+            content["system_prompt"] = content["system_prompt"] or ""
+            cache.put((row["id"], row["content_version"]), content)
+            contents[row["id"]] = content
+    return contents
@@ -5,24 +5,106 @@ Uses a CTE with FOR UPDATE SKIP LOCKED to guarantee:
   1. No two concurrent requests get the same prompt
   2. A prompt is never served twice
   3. The serve counter increments atomically
+
+One statement claims a whole batch of prompts and advances the serve counter
+by the batch size. Which prompts are claimed follows SELECTION_POLICY: random
+among all unserved prompts, or weighted by source/category/age bucket (see
+services/selection.py). The claim only returns ids and content versions; prompt
+text is filled in from the per-worker content cache after the transaction
+commits.
 """
 
 from datetime import datetime, timezone
-from sqlalchemy import text
+from sqlalchemy import bindparam, exists, false, insert, select, text, true, update
 from models import db, Prompt, ServeLog, AppState
+from services.prompt_cache import get_contents
+from services.read_replica import read_only
+from services.stats_stream import publish_stats_changed
+from services.selection import datetime_params, get_index, is_weighted
+from services.near_duplicates import pool_clause, pool_sql
+
+
+@read_only
+def get_stats(session):
+    """Return total, served, and remaining prompt counts (read replica if configured)."""
+    return _count_stats(session)
 
 
-def get_stats():
-    """Return total, served, and remaining prompt counts."""
-    total = db.session.query(Prompt).count()
-    served = db.session.query(Prompt).filter_by(is_served=True).count()
+def _count_stats(session):
+    # One count per side of is_served, each an index-only scan of its partial
+    # index (revision 011). With SERVE_EXCLUDE_DUPLICATES, near duplicates
+    # are not part of the pool.
+    def count(served):
+        return (
+            session.query(db.func.count(Prompt.id))
+            .filter(Prompt.is_served == served, pool_clause())
+            .scalar()
+        )
+
+    served = count(true())
+    remaining = count(false())
     return {
-        "total": total,
+        "total": served + remaining,
         "served": served,
-        "remaining": total - served,
+        "remaining": remaining,
     }
 
 
+# Claim the prompts chosen by {picks} (a next_prompts CTE of ids, plus the
+# selection bucket each came from) and number them from the counter.
+# MATERIALIZED keeps the random picks from being evaluated twice.
+CLAIM_SQL = """
+    WITH {picks},
+    counter AS (
+        UPDATE app_state
+        SET value_int = value_int + (SELECT COUNT(*) FROM next_prompts)
+        WHERE key = 'serve_counter'
+        RETURNING value_int
+    ),
+    numbered AS (
+        SELECT id, bucket,
+               ROW_NUMBER() OVER () AS rn,
+               COUNT(*) OVER () AS n
+        FROM next_prompts
+    )
+    UPDATE prompts
+    SET is_served  = TRUE,
+        served_at  = NOW(),
+        serve_order = COALESCE((SELECT value_int FROM counter), 0) - numbered.n + numbered.rn
+    FROM numbered
+    WHERE prompts.id = numbered.id
+    RETURNING prompts.id, prompts.content_version, prompts.category,
+              prompts.serve_order, prompts.served_at, numbered.bucket
+"""
+
+# Up to :n random unserved prompts
+RANDOM_PICKS = """
+    next_prompts AS MATERIALIZED (
+        SELECT id, NULL::integer AS bucket
+        FROM prompts
+        WHERE is_served = FALSE {pool}
+        ORDER BY RANDOM()
+        LIMIT :n
+        FOR UPDATE SKIP LOCKED
+    )
+"""
+
+# Up to :k_i random unserved prompts from selection bucket i
+BUCKET_PICK = """
+    pick_{i} AS (
+        SELECT id, {i} AS bucket
+        FROM prompts
+        WHERE is_served = FALSE AND {where} {pool}
+        ORDER BY RANDOM()
+        LIMIT :k_{i}
+        FOR UPDATE SKIP LOCKED
+    )
+"""
+
+# Claim rounds before giving up on rows that stay locked by other requests
+MAX_CLAIM_ROUNDS = 3
+
+
 def serve_next_prompt(client_ip=None, user_agent=None):
     """
     Atomically select and mark a random unserved prompt.
@@ -30,107 +112,176 @@ def serve_next_prompt(client_ip=None, user_agent=None):
     Returns:
         dict: The served prompt data with stats, or None if all exhausted.
     """
+    batch = serve_prompts(1, client_ip=client_ip, user_agent=user_agent)
+    if batch is None:
+        return None
+    return {**batch["prompts"][0], "stats": batch["stats"]}
+
+
+def serve_prompts(count, client_ip=None, user_agent=None):
+    """
+    Atomically select and mark up to `count` distinct random unserved prompts.
+
+    Everything happens in one transaction: the claim, one multi-row
+    serve_log insert, and one stats count. If the pool runs dry partway
+    through, the other prompts are reset to unserved (keeping the ones just
+    claimed, so the batch never repeats itself) and the remainder is claimed
+    from the fresh pool. A batch is shorter than `count` only when the
+    corpus is smaller or the remaining rows stay locked by other requests.
+
+    Returns:
+        dict: {"prompts": [...], "stats": {...}}, or None if nothing could be served.
+    """
     is_sqlite = db.engine.url.drivername == 'sqlite'
+    claim = _claim_sqlite if is_sqlite else _claim_postgres
+    if is_weighted():
+        claim = _claim_weighted_sqlite if is_sqlite else _claim_weighted_postgres
+
+    claimed = []
+    reset_done = False
+    for _ in range(MAX_CLAIM_ROUNDS + 1):
+        claimed.extend(claim(count - len(claimed)))
+        if len(claimed) >= count:
+            break
 
-    if not is_sqlite:
-        # Step 1: PostgreSQL Atomic Selection using CTE
-        result = db.session.execute(
-            text("""
-                WITH next_prompt AS (
-                    SELECT id
-                    FROM prompts
-                    WHERE is_served = FALSE
-                    ORDER BY RANDOM()
-                    LIMIT 1
-                    FOR UPDATE SKIP LOCKED
-                )
-                UPDATE prompts
-                SET is_served  = TRUE,
-                    served_at  = NOW(),
-                    serve_order = COALESCE(
-                        (SELECT value_int FROM app_state WHERE key = 'serve_counter'),
-                        0
-                    ) + 1
-                FROM next_prompt
-                WHERE prompts.id = next_prompt.id
-                RETURNING prompts.id, prompts.title, prompts.description,
-                          prompts.prompt_body, prompts.system_prompt,
-                          prompts.category, prompts.source_url,
-                          prompts.serve_order, prompts.served_at
-            """)
+        claimed_ids = [row.id for row in claimed]
+        unserved_left = db.session.scalar(
+            select(exists().where(Prompt.is_served == false(), pool_clause(), Prompt.id.notin_(claimed_ids)))
         )
-        row = result.fetchone()
-    else:
-        # Step 1: SQLite Path (No SKIP LOCKED, manual transaction)
-        # Select random ID
-        next_prompt = Prompt.query.filter_by(is_served=False).order_by(db.func.random()).first()
-        if not next_prompt:
-            row = None
-        else:
-            # Update the prompt
-            next_prompt.is_served = True
-            next_prompt.served_at = datetime.now(timezone.utc)
-            
-            # Get current counter
-            counter = AppState.query.filter_by(key='serve_counter').first()
-            if not counter:
-                counter = AppState(key='serve_counter', value_int=0)
-                db.session.add(counter)
-            
-            counter.value_int += 1
-            next_prompt.serve_order = counter.value_int
-            
-            # Build a mock row object for consistency
-            from collections import namedtuple
-            PromptRow = namedtuple('PromptRow', ['id', 'title', 'description', 'prompt_body', 
-                                              'system_prompt', 'category', 'source_url', 
-                                              'serve_order', 'served_at'])
-            row = PromptRow(
-                next_prompt.id, next_prompt.title, next_prompt.description,
-                next_prompt.prompt_body, next_prompt.system_prompt or "",
-                next_prompt.category, next_prompt.source_url,
-                next_prompt.serve_order, next_prompt.served_at
-            )
-            db.session.add(next_prompt)
-
-    if row is None:
-        # All prompts exhausted - RESET and LOOP
-        db.session.execute(text("UPDATE prompts SET is_served = FALSE"))
-        db.session.commit()
-        
-        # Recursive call to try again with the fresh set
-        return serve_next_prompt(client_ip=client_ip, user_agent=user_agent)
-
-    # Step 2: Increment the global counter (already done for SQLite)
-    if not is_sqlite:
+        if unserved_left:
+            # Unserved but locked by concurrent requests; try again
+            continue
+        if reset_done:
+            # Corpus is smaller than the batch
+            break
+        # All prompts exhausted - RESET everything this batch has not claimed
         db.session.execute(
-            text("UPDATE app_state SET value_int = value_int + 1 WHERE key = 'serve_counter'")
+            update(Prompt)
+            .where(Prompt.id.notin_(claimed_ids))
+            .values(is_served=False)
         )
+        reset_done = True
+        if is_weighted():
+            get_index().invalidate()
 
-    # Step 3: Insert audit log
-    serve_log = ServeLog(
-        prompt_id=row.id,
-        served_at=datetime.now(timezone.utc),
-        client_ip=client_ip,
-        user_agent=user_agent,
-    )
-    db.session.add(serve_log)
+    if not claimed:
+        db.session.rollback()
+        return None
 
-    # Step 4: Commit the transaction
+    # One multi-row insert for the whole batch
+    now = datetime.now(timezone.utc)
+    db.session.execute(insert(ServeLog).values([
+        {"prompt_id": row.id, "served_at": now, "client_ip": client_ip, "user_agent": user_agent}
+        for row in claimed
+    ]))
+
+    # Counted on the primary, inside the transaction, so it reflects this batch
+    stats = _count_stats(db.session)
     db.session.commit()
+    publish_stats_changed()
 
-    # Step 5: Build response
-    prompt_data = {
-        "id": row.id,
-        "title": row.title,
-        "description": row.description,
-        "prompt_body": row.prompt_body,
-        "system_prompt": row.system_prompt or "",
-        "category": row.category,
-        "source_url": row.source_url,
-        "serve_order": row.serve_order,
-        "served_at": row.served_at.isoformat() if row.served_at else None,
-        "stats": get_stats(),
-    }
+    # Prompt text from the content cache, after the locks are released.
+    # Category comes from the claim: reclassification changes it without a
+    # new content_version.
+    contents = get_contents([(row.id, row.content_version) for row in claimed])
+    prompts = [
+        {
+            "id": row.id,
+            **contents[row.id],
+            "category": row.category,
+            "serve_order": row.serve_order,
+            "served_at": row.served_at.isoformat() if row.served_at else None,
+        }
+        for row in claimed
+    ]
+    return {"prompts": prompts, "stats": stats}
+
+
+def _claim_postgres(n):
+    return db.session.execute(text(CLAIM_SQL.format(picks=RANDOM_PICKS.format(pool=pool_sql()))), {"n": n}).fetchall()
+
+
+def _claim_weighted_postgres(n):
+    """One claim statement with a SKIP LOCKED pick per bucket chosen by the selection policy."""
+    index = get_index()
+    wanted = index.plan(db.session, n)
+    if not wanted:
+        return []
+
+    buckets = list(wanted)
+    picks, params = [], {}
+    for i, bucket in enumerate(buckets):
+        where, bucket_params = index.bucket_filter(bucket, f"b{i}")
+        picks.append(BUCKET_PICK.format(i=i, where=where, pool=pool_sql()))
+        params.update(bucket_params)
+        params[f"k_{i}"] = wanted[bucket]
+    union = " UNION ALL ".join(f"SELECT id, bucket FROM pick_{i}" for i in range(len(buckets)))
+    picks.append(f"next_prompts AS MATERIALIZED ({union})")
+
+    rows = db.session.execute(
+        text(CLAIM_SQL.format(picks=",".join(picks))).bindparams(*datetime_params(params)),
+        params,
+    ).fetchall()
+    claimed = {}
+    for row in rows:
+        claimed[buckets[row.bucket]] = claimed.get(buckets[row.bucket], 0) + 1
+    index.record_claims(wanted, claimed)
+    return rows
 
-    return prompt_data
+
+def _claim_sqlite(n):
+    """SQLite path: no SKIP LOCKED, but writers are serialized anyway."""
+    rows = (
+        db.session.query(Prompt.id, Prompt.content_version, Prompt.category)
+        .filter(Prompt.is_served == false(), pool_clause())
+        .order_by(db.func.random())
+        .limit(n)
+        .all()
+    )
+    return _mark_claimed_sqlite(rows)
+
+
+def _claim_weighted_sqlite(n):
+    index = get_index()
+    wanted = index.plan(db.session, n)
+    rows, claimed = [], {}
+    for bucket, k in wanted.items():
+        where, params = index.bucket_filter(bucket, "b")
+        picked = db.session.execute(
+            text(f"""
+                SELECT id, content_version, category FROM prompts
+                WHERE is_served = :served AND {where} {pool_sql()}
+                ORDER BY RANDOM()
+                LIMIT :k
+            """).bindparams(*datetime_params(params)),
+            {**params, "k": k, "served": False},
+        ).all()
+        claimed[bucket] = len(picked)
+        rows.extend(picked)
+    index.record_claims(wanted, claimed)
+    return _mark_claimed_sqlite(rows)
+
+
+def _mark_claimed_sqlite(rows):
+    from collections import namedtuple
+    PromptRow = namedtuple('PromptRow', ['id', 'content_version', 'category', 'serve_order', 'served_at'])
+
+    if not rows:
+        return []
+
+    counter = AppState.query.filter_by(key='serve_counter').first()
+    if not counter:
+        counter = AppState(key='serve_counter', value_int=0)
+        db.session.add(counter)
+    first = (counter.value_int or 0) + 1
+    counter.value_int = (counter.value_int or 0) + len(rows)
+
+    served_at = datetime.now(timezone.utc)
+    db.session.execute(
+        update(Prompt.__table__)
+        .where(Prompt.__table__.c.id == bindparam("b_id"))
+        .values(is_served=True, served_at=served_at, serve_order=bindparam("b_order")),
+        [{"b_id": row.id, "b_order": first + i} for i, row in enumerate(rows)],
+    )
+    return [PromptRow(row.id, row.content_version, row.category, first + i, served_at)
+            for i, row in enumerate(rows)]
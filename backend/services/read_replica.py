@@ -0,0 +1,114 @@
+"""
+Read Replica — Routes read-only queries to REPLICA_DATABASE_URL when it is usable.
+
+The replica is configured as the "replica" bind (see config.py). A read runs
+there only while its replication lag is within REPLICA_MAX_LAG_SECONDS (checked
+at most every REPLICA_CHECK_INTERVAL_SECONDS); if the replica errors, reads go
+to the primary for REPLICA_RETRY_SECONDS before it is tried again. Writes —
+serving, submissions, ingestion — always use db.session on the primary.
+"""
+
+import time
+import logging
+import threading
+from functools import wraps
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from models import db
+
+logger = logging.getLogger(__name__)
+
+REPLICA_BIND = "replica"
+
+# Seconds behind the primary; 0 when fully replayed or not a standby
+PG_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+_state = {"checked_at": None, "lag": None, "down_until": 0.0}
+_lock = threading.Lock()
+
+
+def replica_engine():
+    """Return the replica engine, or None when no replica is configured."""
+    if REPLICA_BIND not in current_app.config.get("SQLALCHEMY_BINDS", {}):
+        return None
+    return db.engines[REPLICA_BIND]
+
+
+def _replica_lag(engine):
+    """Replication lag in seconds. Replicas other than Postgres standbys report 0."""
+    if engine.dialect.name != "postgresql":
+        return 0.0
+    with engine.connect() as conn:
+        return float(conn.execute(text(PG_LAG_SQL)).scalar() or 0)
+
+
+def _replica_usable(engine):
+    config = current_app.config
+    now = time.monotonic()
+    with _lock:
+        if now < _state["down_until"]:
+            return False
+        fresh = (
+            _state["checked_at"] is not None
+            and now - _state["checked_at"] < config["REPLICA_CHECK_INTERVAL_SECONDS"]
+        )
+        if fresh:
+            return _state["lag"] <= config["REPLICA_MAX_LAG_SECONDS"]
+
+    lag = _replica_lag(engine)
+    with _lock:
+        _state["checked_at"] = now
+        _state["lag"] = lag
+    if lag > config["REPLICA_MAX_LAG_SECONDS"]:
+        logger.warning(f"Replica is {lag:.1f}s behind; reading from the primary.")
+        return False
+    return True
+
+
+def _mark_down(error):
+    retry = current_app.config["REPLICA_RETRY_SECONDS"]
+    with _lock:
+        _state["down_until"] = time.monotonic() + retry
+        _state["checked_at"] = None
+    logger.warning(f"Replica unavailable ({error.__class__.__name__}); using the primary for {retry}s.")
+
+
+def run_read(fn):
+    """Call fn(session) on the replica when usable, otherwise on the primary."""
+    engine = replica_engine()
+    if engine is not None:
+        try:
+            if _replica_usable(engine):
+                with Session(engine) as session:
+                    return fn(session)
+        except DBAPIError as e:
+            _mark_down(e)
+    return fn(db.session)
+
+
+def read_only(fn):
+    """Decorator: run fn(session, ...) through run_read, so callers omit the session."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        return run_read(lambda session: fn(session, *args, **kwargs))
+    return wrapper
+
+
+def replica_status():
+    """Describe the replica routing state (for health checks)."""
+    if replica_engine() is None:
+        return {"configured": False}
+    with _lock:
+        return {
+            "configured": True,
+            "lag_seconds": _state["lag"],
+            "down": time.monotonic() < _state["down_until"],
+        }
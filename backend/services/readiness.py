@@ -0,0 +1,159 @@
+"""
+Readiness — Can this worker serve traffic right now?
+
+/health only says the process is up. /health/ready probes what serving
+actually depends on and turns "not ready" into a 503, so the platform stops
+routing to a worker that would only return errors:
+
+  1. Connection pool usage — checked out / (pool size + max overflow). A
+     saturated pool fails readiness without probing, since serving would
+     queue for a connection
+  2. A `SELECT 1` round trip, failing or slower than READINESS_MAX_LATENCY_MS
+     fails readiness. On Postgres it runs on a one-connection probe engine of
+     its own, whose connect, checkout and statement timeouts are all
+     READINESS_DB_TIMEOUT_MS, so a hung database fails the check quickly
+     instead of holding a request thread for DB_CONNECT_TIMEOUT
+  3. For information only: the age of this worker's live stats, the degraded
+     mode circuit, and the read replica's routing state
+
+Each worker probes at most once every READINESS_CACHE_SECONDS. One check
+probes at a time, outside the lock; concurrent and repeated checks in
+between get the last result, so an aggressive health checker adds no
+database load of its own.
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+from flask import current_app
+from sqlalchemy import create_engine, text
+from models import db
+from services.fallback_service import DATABASE_ERRORS, circuit_open
+from services.read_replica import replica_status
+from services.stats_stream import stats_age
+
+logger = logging.getLogger(__name__)
+
+# QueuePool's default when SQLALCHEMY_ENGINE_OPTIONS does not set max_overflow
+DEFAULT_MAX_OVERFLOW = 10
+
+_cached = {"at": None, "result": None, "probing": False}
+_lock = threading.Lock()
+_probe_engine = {"pid": None, "engine": None}
+
+
+def pool_usage(engine):
+    """Checked-out and overflow connections for a QueuePool (None for other pool types)."""
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return {"checked_out": None, "overflow": None, "capacity": None, "usage": None}
+    checked_out = pool.checkedout()
+    # The pool does not expose its overflow limit, so take it from the
+    # options the engine was built with; -1 means unbounded
+    options = current_app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {}
+    max_overflow = options.get("max_overflow", DEFAULT_MAX_OVERFLOW)
+    capacity = pool.size() + max_overflow if max_overflow >= 0 else None
+    return {
+        "checked_out": checked_out,
+        "overflow": max(pool.overflow(), 0),
+        "capacity": capacity,
+        "usage": round(checked_out / capacity, 3) if capacity else None,
+    }
+
+
+def probe_engine(engine, timeout_ms):
+    """
+    This process's engine for the round trip: a single pooled Postgres
+    connection with every timeout set to timeout_ms, or `engine` itself
+    for other databases. Rebuilt after a fork.
+    """
+    if engine.dialect.name != "postgresql":
+        return engine
+    if _probe_engine["pid"] != os.getpid():
+        seconds = timeout_ms / 1000
+        _probe_engine["engine"] = create_engine(
+            engine.url,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=seconds,
+            pool_pre_ping=False,
+            connect_args={
+                # libpq only takes whole seconds, and at least 2
+                "connect_timeout": max(2, math.ceil(seconds)),
+                "options": f"-c statement_timeout={timeout_ms}",
+            },
+        )
+        _probe_engine["pid"] = os.getpid()
+    return _probe_engine["engine"]
+
+
+def _database_latency_ms(engine, timeout_ms):
+    """Time one round trip; raises the database error on failure."""
+    engine = probe_engine(engine, timeout_ms)
+    started = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.rollback()
+    except DATABASE_ERRORS:
+        # Never keep a connection that may be broken for the next probe
+        if engine is _probe_engine["engine"]:
+            engine.dispose()
+        raise
+    return (time.perf_counter() - started) * 1000
+
+
+def probe():
+    """Run the checks above; returns a dict with "ready" and "reasons"."""
+    config = current_app.config
+    engine = db.engine
+    reasons = []
+
+    pool = pool_usage(engine)
+    latency_ms = None
+    if pool["usage"] is not None and pool["usage"] >= config["READINESS_MAX_POOL_USAGE"]:
+        reasons.append(f"connection pool {pool['checked_out']}/{pool['capacity']} checked out")
+    else:
+        try:
+            latency_ms = round(_database_latency_ms(engine, config["READINESS_DB_TIMEOUT_MS"]), 1)
+        except DATABASE_ERRORS as e:
+            reasons.append(f"database unreachable ({e.__class__.__name__})")
+        else:
+            if latency_ms > config["READINESS_MAX_LATENCY_MS"]:
+                reasons.append(f"database round trip {latency_ms}ms")
+
+    age = stats_age()
+    result = {
+        "ready": not reasons,
+        "reasons": reasons,
+        "database": {"latency_ms": latency_ms, "pool": pool},
+        "stats_age_seconds": round(age, 1) if age is not None else None,
+        "replica": replica_status(),
+    }
+    if config["DEGRADED_MODE_ENABLED"]:
+        result["circuit_open"] = circuit_open()
+    if reasons:
+        logger.warning(f"Not ready: {'; '.join(reasons)}.")
+    return result
+
+
+def check_readiness():
+    """Return this worker's readiness, probing at most once per READINESS_CACHE_SECONDS."""
+    max_age = current_app.config["READINESS_CACHE_SECONDS"]
+    with _lock:
+        fresh = _cached["at"] is not None and time.monotonic() - _cached["at"] < max_age
+        if fresh or (_cached["probing"] and _cached["result"] is not None):
+            return _cached["result"]
+        _cached["probing"] = True
+
+    try:
+        result = probe()
+    except Exception:
+        with _lock:
+            _cached["probing"] = False
+        raise
+    with _lock:
+        _cached.update(at=time.monotonic(), result=result, probing=False)
+    return result
@@ -0,0 +1,246 @@
+"""
+Selection — Weighted, category-balanced choice of which prompts to serve next.
+
+With SELECTION_POLICY=random (the default) a serve picks uniformly among all
+unserved prompts, so whichever source or category has the most prompts
+dominates. With SELECTION_POLICY=weighted, unserved prompts are grouped into
+buckets of (source, category, age band) and a bucket is chosen with
+probability proportional to its policy weight — not its size — before one
+random unserved prompt is claimed from it:
+
+    weight = SELECTION_SOURCE_WEIGHTS[source]      (default 1)
+           × SELECTION_CATEGORY_WEIGHTS[category]  (default 1)
+           × 0.5 ** age_band
+
+Age bands are SELECTION_RECENCY_HALF_LIFE_DAYS wide, measured on scraped_at;
+with a half-life of 0 every prompt is in band 0.
+
+Buckets are drawn from a Vose alias table, so a pick is O(1). Each worker
+keeps unserved counts per bucket and decrements them as it serves; the alias
+table is rebuilt (O(buckets)) only when the set of drawable buckets changes,
+and the counts are re-read with one GROUP BY every SELECTION_REFRESH_SECONDS,
+after a pool reset, or on the next plan after a claim comes back short.
+"""
+
+import time
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import bindparam, text, DateTime
+from services.serve_log_service import SOURCE_EXPR
+from services.near_duplicates import pool_sql
+
+# Prompts older than this many half-lives share the last band
+MAX_AGE_BANDS = 8
+
+# Per-source filters on prompts.source_url, matching SOURCE_EXPR
+SOURCE_FILTERS = {
+    "user": "source_url = 'user-submission'",
+    "prompts.chat": "source_url LIKE 'https://prompts.chat/%'",
+    "anthropic": "source_url <> 'user-submission' AND source_url NOT LIKE 'https://prompts.chat/%'",
+}
+
+
+def parse_weights(spec):
+    """Parse "name=weight,name=weight" into a dict; blank entries are ignored."""
+    weights = {}
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        name, _, value = item.rpartition("=")
+        if not name.strip():
+            raise ValueError(f"Invalid weight entry {item!r}; expected name=weight")
+        weights[name.strip()] = float(value)
+    return weights
+
+
+class AliasTable:
+    """Vose alias table: O(n) to build, O(1) to draw an index with probability ∝ weight."""
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = float(sum(weights))
+        self.prob = [0.0] * n
+        self.alias = [0] * n
+        if n == 0 or total <= 0:
+            self.prob = []
+            return
+
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def __len__(self):
+        return len(self.prob)
+
+    def draw(self, rng=random):
+        i = rng.randrange(len(self.prob))
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+
+class BucketIndex:
+    """Unserved counts per (source, category, band) plus the alias table over the non-empty ones."""
+
+    def __init__(self, source_weights, category_weights, half_life_days, refresh_seconds):
+        self.source_weights = source_weights
+        self.category_weights = category_weights
+        self.half_life = timedelta(days=half_life_days) if half_life_days > 0 else None
+        self.refresh_seconds = refresh_seconds
+        self.counts = {}
+        self.reference = None   # band boundaries are measured back from this time
+        self.refreshed_at = None
+        self._buckets = []      # alias table index -> bucket
+        self._table = AliasTable([])
+        self._lock = threading.Lock()
+
+    def weight(self, bucket):
+        source, category, band = bucket
+        return (
+            self.source_weights.get(source, 1.0)
+            * self.category_weights.get(category, 1.0)
+            * 0.5 ** band
+        )
+
+    def invalidate(self):
+        with self._lock:
+            self.refreshed_at = None
+
+    def refresh(self, session):
+        """Re-read unserved counts per bucket with one GROUP BY."""
+        reference = datetime.now(timezone.utc)
+        band_sql, params = self._band_case(reference)
+        rows = session.execute(
+            text(f"""
+                SELECT {SOURCE_EXPR} AS source, category, {band_sql} AS band, COUNT(*) AS n
+                FROM prompts
+                WHERE is_served = :served {pool_sql()}
+                GROUP BY 1, 2, 3
+            """).bindparams(*(bindparam(name, type_=DateTime(timezone=True)) for name in params)),
+            {**params, "served": False},
+        ).all()
+        counts = {(row.source, row.category, int(row.band)): row.n for row in rows}
+        with self._lock:
+            self.reference = reference
+            self.refreshed_at = time.monotonic()
+            self.counts = counts
+            # A bucket zeroed by a short claim keeps its key, so compare what
+            # is drawable rather than which buckets exist
+            if set(self._drawable()) != set(self._buckets):
+                self._rebuild()
+
+    def _band_case(self, reference):
+        """CASE expression giving each row its age band, with its boundary parameters."""
+        if self.half_life is None:
+            return "0", {}
+        params = {f"band_{b}": reference - self.half_life * b for b in range(1, MAX_AGE_BANDS)}
+        whens = " ".join(f"WHEN scraped_at > :band_{b} THEN {b - 1}" for b in range(1, MAX_AGE_BANDS))
+        return f"CASE {whens} ELSE {MAX_AGE_BANDS - 1} END", params
+
+    def _drawable(self):
+        return [bucket for bucket, n in self.counts.items() if n > 0 and self.weight(bucket) > 0]
+
+    def _rebuild(self):
+        self._buckets = self._drawable()
+        self._table = AliasTable([self.weight(bucket) for bucket in self._buckets])
+
+    def plan(self, session, n):
+        """
+        Choose buckets for the next n serves; returns {bucket: how many}.
+
+        A bucket is never asked for more prompts than this worker thinks it
+        still has, so the plan can come back short when most buckets are
+        nearly empty.
+        """
+        stale = (
+            self.refreshed_at is None
+            or time.monotonic() - self.refreshed_at >= self.refresh_seconds
+            or not len(self._table)
+        )
+        if stale:
+            self.refresh(session)
+
+        wanted = {}
+        with self._lock:
+            if not len(self._table):
+                return wanted
+            for _ in range(n * 4):
+                if sum(wanted.values()) == n:
+                    break
+                bucket = self._buckets[self._table.draw()]
+                if wanted.get(bucket, 0) < self.counts[bucket]:
+                    wanted[bucket] = wanted.get(bucket, 0) + 1
+        return wanted
+
+    def record_claims(self, wanted, claimed):
+        """
+        Update counts after a claim. A bucket that returned fewer prompts than
+        asked for is treated as empty, and the counts are re-read on the next
+        plan, since other workers' claims or a pool change may be the cause.
+        """
+        with self._lock:
+            emptied = False
+            for bucket, k in wanted.items():
+                got = claimed.get(bucket, 0)
+                if bucket not in self.counts:
+                    continue
+                if got < k:
+                    self.counts[bucket] = 0
+                    self.refreshed_at = None
+                else:
+                    self.counts[bucket] -= got
+                emptied = emptied or self.counts[bucket] <= 0
+            if emptied:
+                self._rebuild()
+
+    def bucket_filter(self, bucket, prefix):
+        """SQL condition selecting one bucket's prompts, with its parameters."""
+        source, category, band = bucket
+        conditions = [SOURCE_FILTERS[source], f"category = :{prefix}_category"]
+        params = {f"{prefix}_category": category}
+        if self.half_life is not None:
+            if band > 0:
+                conditions.append(f"scraped_at <= :{prefix}_newest")
+                params[f"{prefix}_newest"] = self.reference - self.half_life * band
+            if band < MAX_AGE_BANDS - 1:
+                conditions.append(f"scraped_at > :{prefix}_oldest")
+                params[f"{prefix}_oldest"] = self.reference - self.half_life * (band + 1)
+        return " AND ".join(conditions), params
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def is_weighted():
+    return current_app.config["SELECTION_POLICY"] == "weighted"
+
+
+def get_index():
+    """Return this worker's bucket index, built from config on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                config = current_app.config
+                _index = BucketIndex(
+                    parse_weights(config["SELECTION_SOURCE_WEIGHTS"]),
+                    parse_weights(config["SELECTION_CATEGORY_WEIGHTS"]),
+                    config["SELECTION_RECENCY_HALF_LIFE_DAYS"],
+                    config["SELECTION_REFRESH_SECONDS"],
+                )
+    return _index
+
+
+def datetime_params(params):
+    """bindparams() for the datetime values in a bucket_filter() parameter dict."""
+    return [bindparam(name, type_=DateTime(timezone=True))
+            for name, value in params.items() if isinstance(value, datetime)]
@@ -0,0 +1,340 @@
+"""
+Serve Log Service — Partition maintenance, daily rollups, and retention.
+
+On PostgreSQL, serve_log is range-partitioned by month on served_at
+(serve_log_YYYY_MM plus serve_log_default, see alembic revision 003).
+On SQLite it is a single table indexed by served_at.
+
+Rollups are incremental: app_state 'rollup_watermark' holds the served_at
+cutoff (in epoch minutes) up to which serve_log has been folded into the
+serve_daily_* tables that the analytics API reads. Each run only aggregates
+rows between the watermark and a few minutes ago, and retention never removes
+rows past the watermark, so every serve is counted exactly once before it is
+dropped.
+"""
+
+import re
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import bindparam, text
+from models import db, AppState, ServeLog, ServeDailyClient
+
+# Serves still in flight when a rollup starts must not fall below the new
+# watermark, so the newest few minutes are left for the next run.
+ROLLUP_LAG = timedelta(minutes=2)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+PARTITION_NAME = re.compile(r"^serve_log_(\d{4})_(\d{2})$")
+
+WINDOW = "serve_log.served_at >= :start AND serve_log.served_at < :end"
+
+# Where a prompt came from, derived from its source_url
+SOURCE_EXPR = """
+    CASE
+        WHEN prompts.source_url = 'user-submission' THEN 'user'
+        WHEN prompts.source_url LIKE 'https://prompts.chat/%' THEN 'prompts.chat'
+        ELSE 'anthropic'
+    END
+"""
+
+
+def _is_sqlite():
+    return db.engine.url.drivername == 'sqlite'
+
+
+def _month_start(dt):
+    return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_months(dt, n):
+    month = dt.month - 1 + n
+    return dt.replace(year=dt.year + month // 12, month=month % 12 + 1)
+
+
+def _day_expr(column):
+    """SQL expression truncating a served_at column to its UTC date."""
+    if _is_sqlite():
+        return f"DATE({column})"
+    return f"({column} AT TIME ZONE 'UTC')::date"
+
+
+def _window_params(statement, ids=False):
+    """
+    Bind :start / :end with serve_log's column type so SQLite gets its own
+    format, plus an expanding :ids list when the statement filters by row id.
+    """
+    params = [
+        bindparam("start", type_=ServeLog.served_at.type),
+        bindparam("end", type_=ServeLog.served_at.type),
+    ]
+    if ids:
+        params.append(bindparam("ids", expanding=True))
+    return text(statement).bindparams(*params)
+
+
+def get_rollup_watermark(session=None):
+    """Return the served_at cutoff below which serve_log is already rolled up."""
+    state = (session or db.session).get(AppState, "rollup_watermark")
+    if not state or not state.value_int:
+        return EPOCH
+    return EPOCH + timedelta(minutes=state.value_int)
+
+
+def _set_rollup_watermark(cutoff):
+    state = db.session.get(AppState, "rollup_watermark")
+    if not state:
+        state = AppState(key="rollup_watermark", value_int=0)
+        db.session.add(state)
+    state.value_int = int((cutoff - EPOCH).total_seconds() // 60)
+
+
+def ensure_partitions(months_ahead=None, now=None):
+    """
+    Create monthly serve_log partitions from the current month forward.
+
+    Rows that landed in serve_log_default for a month without a partition are
+    moved into the new partition. No-op on SQLite.
+
+    Returns:
+        list: Names of the partitions created.
+    """
+    if _is_sqlite():
+        return []
+
+    if months_ahead is None:
+        months_ahead = current_app.config["SERVE_LOG_PARTITIONS_AHEAD"]
+    now = now or datetime.now(timezone.utc)
+    existing = set(_list_partitions())
+
+    created = []
+    month = _month_start(now)
+    for _ in range(months_ahead + 1):
+        upper = _add_months(month, 1)
+        name = f"serve_log_{month:%Y_%m}"
+        if name not in existing:
+            _create_partition(name, month, upper)
+            created.append(name)
+        month = upper
+
+    db.session.commit()
+    return created
+
+
+def _create_partition(name, lower, upper):
+    params = {"start": lower, "end": upper}
+    stray = db.session.execute(
+        text("SELECT COUNT(*) FROM serve_log_default WHERE served_at >= :start AND served_at < :end"),
+        params,
+    ).scalar()
+
+    if stray:
+        # A partition cannot be attached while the default partition holds
+        # rows in its range, so park them in a temp table first.
+        db.session.execute(text("""
+            CREATE TEMP TABLE serve_log_stray ON COMMIT DROP AS
+            SELECT * FROM serve_log_default WHERE served_at >= :start AND served_at < :end
+        """), params)
+        db.session.execute(
+            text("DELETE FROM serve_log_default WHERE served_at >= :start AND served_at < :end"),
+            params,
+        )
+
+    db.session.execute(text(
+        f"CREATE TABLE {name} PARTITION OF serve_log "
+        f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+    ))
+
+    if stray:
+        db.session.execute(text("INSERT INTO serve_log SELECT * FROM serve_log_stray"))
+        db.session.execute(text("DROP TABLE serve_log_stray"))
+
+
+def _list_partitions():
+    """Return the monthly partition names attached to serve_log (PostgreSQL)."""
+    rows = db.session.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child  ON child.oid  = pg_inherits.inhrelid
+        WHERE parent.relname = 'serve_log'
+    """)).scalars()
+    return [name for name in rows if PARTITION_NAME.match(name)]
+
+
+def rollup_serve_log(now=None):
+    """
+    Fold serve_log rows newer than the watermark into the daily rollup tables.
+
+    Returns:
+        dict: The window that was rolled up and the number of log rows in it.
+    """
+    now = now or datetime.now(timezone.utc)
+    start = get_rollup_watermark()
+    end = (now - ROLLUP_LAG).replace(second=0, microsecond=0)
+    if end <= start:
+        return {"start": start.isoformat(), "end": start.isoformat(), "rows": 0}
+
+    params = {"start": start, "end": end}
+
+    rows = db.session.execute(
+        _window_params("SELECT COUNT(*) FROM serve_log WHERE served_at >= :start AND served_at < :end"),
+        params,
+    ).scalar()
+
+    if rows:
+        _fold_into_rollups(WINDOW, params)
+        _rollup_unique_clients(WINDOW, params)
+
+    _set_rollup_watermark(end)
+    db.session.commit()
+
+    return {"start": start.isoformat(), "end": end.isoformat(), "rows": rows}
+
+
+def fold_replayed_serves(log_ids):
+    """
+    Count serve_log rows written behind the rollup watermark into the rollups.
+
+    rollup_serve_log only reads serve_log past the watermark, so serves
+    inserted with an older served_at (a replayed degraded-mode journal) would
+    otherwise never reach serve_daily_*. Only the rows among `log_ids` below
+    the watermark are folded; the rest are left for the next rollup. Unique
+    clients are only added for the watermark's own day, since earlier days'
+    per-client rows are already pruned and their counts final. Does not commit.
+    """
+    if not log_ids:
+        return
+    watermark = get_rollup_watermark()
+    where = f"serve_log.id IN :ids AND {WINDOW}"
+    params = {"ids": list(log_ids), "start": EPOCH, "end": watermark}
+    _fold_into_rollups(where, params, ids=True)
+    open_day = watermark.replace(hour=0, minute=0, second=0, microsecond=0)
+    _rollup_unique_clients(where, dict(params, start=open_day), ids=True)
+
+
+def _fold_into_rollups(where, params, ids=False):
+    """Add the serve_log rows matching `where` to the per-day rollup tables."""
+    day = _day_expr("serve_log.served_at")
+
+    db.session.execute(_window_params(f"""
+        INSERT INTO serve_daily_prompt (day, prompt_id, serves)
+        SELECT {day}, serve_log.prompt_id, COUNT(*)
+        FROM serve_log
+        WHERE {where}
+        GROUP BY {day}, serve_log.prompt_id
+        ON CONFLICT (day, prompt_id) DO UPDATE
+            SET serves = serve_daily_prompt.serves + excluded.serves
+    """, ids), params)
+
+    db.session.execute(_window_params(f"""
+        INSERT INTO serve_daily_category (day, category, serves)
+        SELECT {day}, prompts.category, COUNT(*)
+        FROM serve_log
+        JOIN prompts ON prompts.id = serve_log.prompt_id
+        WHERE {where}
+        GROUP BY {day}, prompts.category
+        ON CONFLICT (day, category) DO UPDATE
+            SET serves = serve_daily_category.serves + excluded.serves
+    """, ids), params)
+
+    db.session.execute(_window_params(f"""
+        INSERT INTO serve_daily_source (day, source, serves)
+        SELECT {day}, {SOURCE_EXPR}, COUNT(*)
+        FROM serve_log
+        JOIN prompts ON prompts.id = serve_log.prompt_id
+        WHERE {where}
+        GROUP BY {day}, {SOURCE_EXPR}
+        ON CONFLICT (day, source) DO UPDATE
+            SET serves = serve_daily_source.serves + excluded.serves
+    """, ids), params)
+
+    db.session.execute(_window_params(f"""
+        INSERT INTO serve_daily_totals (day, serves, unique_clients, submissions)
+        SELECT {day}, COUNT(*), 0, 0
+        FROM serve_log
+        WHERE {where}
+        GROUP BY {day}
+        ON CONFLICT (day) DO UPDATE
+            SET serves = serve_daily_totals.serves + excluded.serves
+    """, ids), params)
+
+
+def _rollup_unique_clients(where, params, ids=False):
+    """
+    Track distinct clients per day and refresh serve_daily_totals.unique_clients.
+
+    serve_daily_client only needs to hold days that can still receive rows;
+    once the watermark has moved past a day its count is final and the
+    per-client rows are pruned.
+    """
+    day = _day_expr("serve_log.served_at")
+    db.session.execute(_window_params(f"""
+        INSERT INTO serve_daily_client (day, client_ip)
+        SELECT DISTINCT {day}, COALESCE(serve_log.client_ip, '')
+        FROM serve_log
+        WHERE {where}
+        ON CONFLICT (day, client_ip) DO NOTHING
+    """, ids), params)
+
+    db.session.execute(text("""
+        UPDATE serve_daily_totals
+        SET unique_clients = (
+            SELECT COUNT(*) FROM serve_daily_client
+            WHERE serve_daily_client.day = serve_daily_totals.day
+        )
+        WHERE day IN (SELECT DISTINCT day FROM serve_daily_client)
+    """))
+
+    db.session.execute(
+        text("DELETE FROM serve_daily_client WHERE day < :day").bindparams(
+            bindparam("day", type_=ServeDailyClient.day.type)
+        ),
+        {"day": params["end"].date()},
+    )
+
+
+def apply_retention(retention_days=None, now=None):
+    """
+    Roll up serve_log, then drop everything older than the retention window.
+
+    The cutoff is aligned to the start of a month so Postgres can drop whole
+    partitions instead of deleting rows, and it is never later than the
+    rollup watermark.
+
+    Returns:
+        dict: The cutoff used, dropped partitions, and deleted row count.
+    """
+    if retention_days is None:
+        retention_days = current_app.config["SERVE_LOG_RETENTION_DAYS"]
+    now = now or datetime.now(timezone.utc)
+
+    rollup = rollup_serve_log(now=now)
+    cutoff = min(_month_start(now - timedelta(days=retention_days)), get_rollup_watermark())
+    params = {"start": EPOCH, "end": cutoff}
+
+    dropped = []
+    if not _is_sqlite():
+        for name in sorted(_list_partitions()):
+            year, month = PARTITION_NAME.match(name).groups()
+            upper = _add_months(datetime(int(year), int(month), 1, tzinfo=timezone.utc), 1)
+            if upper <= cutoff:
+                db.session.execute(text(f"DROP TABLE {name}"))
+                dropped.append(name)
+        deleted = db.session.execute(
+            _window_params("DELETE FROM serve_log_default WHERE served_at >= :start AND served_at < :end"),
+            params,
+        ).rowcount
+    else:
+        deleted = db.session.execute(
+            _window_params("DELETE FROM serve_log WHERE served_at >= :start AND served_at < :end"),
+            params,
+        ).rowcount
+
+    db.session.commit()
+
+    return {
+        "rollup": rollup,
+        "cutoff": cutoff.isoformat(),
+        "dropped_partitions": dropped,
+        "deleted_rows": deleted,
+    }
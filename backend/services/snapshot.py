@@ -0,0 +1,209 @@
+"""
+Snapshot — Compact, seekable file format for the prompts corpus.
+
+Used to seed a fresh node (SQLite or Postgres) without scraping, and to read
+individual prompts straight from the file. Standard library only.
+
+Layout (little-endian):
+
+    b"DPSNAP01"  u32 header length  header JSON
+    block 0 … block N-1        zlib-compressed JSON arrays of BLOCK_RECORDS rows
+    index                      one INDEX_ENTRY per prompt, sorted by id:
+                               id, block offset, block length, slot in block
+    footer                     u64 index offset, u64 record count, b"DPSNAP01"
+
+Rows are stored as lists in header["columns"] order. Compressing blocks of
+rows rather than single rows keeps the ratio close to whole-file compression
+while a lookup by id still only inflates one block: the reader memory-maps
+the file and binary-searches the fixed-width index in place.
+"""
+
+import os
+import json
+import mmap
+import zlib
+import struct
+import hashlib
+import tempfile
+
+MAGIC = b"DPSNAP01"
+VERSION = 1
+BLOCK_RECORDS = 64
+HEADER_LEN = struct.Struct("<I")
+INDEX_ENTRY = struct.Struct("<qQII")
+FOOTER = struct.Struct("<QQ8s")
+
+
+class SnapshotError(Exception):
+    """The file is not a readable snapshot."""
+
+
+def prompt_content_hash(title, description, prompt_body, system_prompt):
+    """sha256 hex digest identifying a prompt's content."""
+    parts = (title or "", description or "", prompt_body or "", system_prompt or "")
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class SnapshotWriter:
+    """
+    Writes rows (dicts, in ascending id order) to a snapshot file.
+
+    The file is written to a temporary path and renamed on close, so readers
+    never see a partial snapshot.
+    """
+
+    def __init__(self, path, columns, meta=None):
+        if "id" not in columns:
+            raise ValueError("snapshot columns must include 'id'")
+        self.path = path
+        self.columns = list(columns)
+        self._id_col = self.columns.index("id")
+        self._block = []
+        self._index = []
+        self._last_id = None
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, self._tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        self._file = os.fdopen(fd, "wb")
+
+        header = json.dumps(dict(meta or {}, version=VERSION, columns=self.columns,
+                                 block_records=BLOCK_RECORDS)).encode("utf-8")
+        self._file.write(MAGIC + HEADER_LEN.pack(len(header)) + header)
+
+    def add(self, row):
+        values = [row.get(col) for col in self.columns]
+        prompt_id = values[self._id_col]
+        if self._last_id is not None and prompt_id <= self._last_id:
+            raise ValueError("snapshot rows must be added in ascending id order")
+        self._last_id = prompt_id
+        self._block.append(values)
+        if len(self._block) >= BLOCK_RECORDS:
+            self._flush_block()
+
+    def _flush_block(self):
+        if not self._block:
+            return
+        data = zlib.compress(json.dumps(self._block, ensure_ascii=False, default=str).encode("utf-8"), 6)
+        offset = self._file.tell()
+        self._file.write(data)
+        for slot, values in enumerate(self._block):
+            self._index.append((values[self._id_col], offset, len(data), slot))
+        self._block = []
+
+    def close(self):
+        """Write the index and footer, then move the file into place."""
+        self._flush_block()
+        index_offset = self._file.tell()
+        for entry in self._index:
+            self._file.write(INDEX_ENTRY.pack(*entry))
+        self._file.write(FOOTER.pack(index_offset, len(self._index), MAGIC))
+        self._file.close()
+        os.chmod(self._tmp, 0o644)
+        os.replace(self._tmp, self.path)
+        return len(self._index)
+
+    def abort(self):
+        self._file.close()
+        os.remove(self._tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class SnapshotReader:
+    """
+    Memory-mapped reader: random access by id, or sequential iteration.
+
+    Only the header and footer are parsed on open; get() binary-searches the
+    index in the mapping and inflates the one block holding the row.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise SnapshotError(f"{path}: empty file")
+
+        size = len(self._map)
+        if size < len(MAGIC) + HEADER_LEN.size + FOOTER.size or self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise SnapshotError(f"{path}: not a prompt snapshot")
+        self._index_offset, self.count, magic = FOOTER.unpack_from(self._map, size - FOOTER.size)
+        if magic != MAGIC or self._index_offset + self.count * INDEX_ENTRY.size != size - FOOTER.size:
+            self.close()
+            raise SnapshotError(f"{path}: truncated or corrupt snapshot")
+
+        (header_len,) = HEADER_LEN.unpack_from(self._map, len(MAGIC))
+        start = len(MAGIC) + HEADER_LEN.size
+        self.header = json.loads(self._map[start:start + header_len])
+        if self.header.get("version") != VERSION:
+            self.close()
+            raise SnapshotError(f"{path}: unsupported snapshot version {self.header.get('version')}")
+        self.columns = self.header["columns"]
+        self._cached_block = (None, None)
+
+    def __len__(self):
+        return self.count
+
+    def _entry(self, i):
+        return INDEX_ENTRY.unpack_from(self._map, self._index_offset + i * INDEX_ENTRY.size)
+
+    def _block(self, offset, length):
+        # Consecutive lookups usually land in the same block
+        if self._cached_block[0] != offset:
+            data = zlib.decompress(self._map[offset:offset + length])
+            self._cached_block = (offset, json.loads(data))
+        return self._cached_block[1]
+
+    def get(self, prompt_id):
+        """Return the row for prompt_id as a dict, or None."""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[0] < prompt_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self.count:
+            return None
+        entry_id, offset, length, slot = self._entry(lo)
+        if entry_id != prompt_id:
+            return None
+        return dict(zip(self.columns, self._block(offset, length)[slot]))
+
+    def ids(self):
+        for i in range(self.count):
+            yield self._entry(i)[0]
+
+    def iter_blocks(self):
+        """Yield each block as a list of row dicts, in id order."""
+        offset = None
+        for i in range(self.count):
+            entry_offset, length = self._entry(i)[1:3]
+            if entry_offset != offset:
+                offset = entry_offset
+                yield [dict(zip(self.columns, values)) for values in self._block(offset, length)]
+
+    def __iter__(self):
+        for block in self.iter_blocks():
+            yield from block
+
+    def close(self):
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,149 @@
+"""
+Stats Stream — Pushes prompt stats to /api/stats/stream subscribers when they change.
+
+One broadcaster per worker process fans out to all of its connected clients:
+  1. Something marks stats dirty — an in-process publish_stats_changed() call
+     after a serve, submission or reset, or, on PostgreSQL, a NOTIFY on the
+     stats_changed channel (a statement trigger on prompts, revision 006,
+     so every writer reaches every worker, scripts included)
+  2. The broadcaster thread recounts once, at most every
+     STATS_STREAM_MIN_INTERVAL seconds however many changes arrived
+  3. If the numbers moved, the version is bumped and waiting clients wake up
+
+Clients block on a condition variable rather than a per-client queue, so a
+burst of serves costs one count query per worker, not one per client.
+"""
+
+import time
+import select
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "stats_changed"
+
+
+class StatsBroadcaster:
+    """Holds the latest stats snapshot and wakes subscribers when it changes."""
+
+    def __init__(self, app, min_interval):
+        self.app = app
+        self.min_interval = min_interval
+        self.version = 0
+        self.stats = None
+        self.counted_at = None   # monotonic time of the last successful count
+        self.clients = 0
+        self._dirty = threading.Event()
+        self._changed = threading.Condition()
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+        self._dirty.set()
+        threading.Thread(target=self._run, name="stats-broadcaster", daemon=True).start()
+        with self.app.app_context():
+            from models import db
+            if db.engine.dialect.name == "postgresql":
+                url = db.engine.url.render_as_string(hide_password=False)
+                threading.Thread(target=self._listen, args=(url,), name="stats-listener", daemon=True).start()
+
+    def mark_dirty(self):
+        self._dirty.set()
+
+    def _run(self):
+        from models import db
+        from services.prompt_service import _count_stats
+
+        while True:
+            self._dirty.wait()
+            self._dirty.clear()
+            try:
+                with self.app.app_context():
+                    stats = _count_stats(db.session)
+                    db.session.remove()
+                self.counted_at = time.monotonic()
+            except Exception as e:
+                logger.warning(f"Stats stream: could not count stats ({e.__class__.__name__}).")
+                stats = None
+            if stats is not None and stats != self.stats:
+                with self._changed:
+                    self.stats = stats
+                    self.version += 1
+                    self._changed.notify_all()
+            time.sleep(self.min_interval)
+
+    def _listen(self, url):
+        """LISTEN on a dedicated connection and mark stats dirty on every NOTIFY."""
+        import psycopg2
+
+        backoff = 1
+        while True:
+            try:
+                conn = psycopg2.connect(url)
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {CHANNEL}")
+                backoff = 1
+                # Something may have changed while we were not listening
+                self._dirty.set()
+                while True:
+                    if select.select([conn], [], [], 30) != ([], [], []):
+                        conn.poll()
+                        if conn.notifies:
+                            conn.notifies.clear()
+                            self._dirty.set()
+            except Exception as e:
+                logger.warning(f"Stats stream: LISTEN connection lost ({e.__class__.__name__}); "
+                               f"reconnecting in {backoff}s.")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+
+    def wait_for_change(self, seen_version, timeout):
+        """Block until the version moves past seen_version or timeout; return (version, stats)."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != seen_version, timeout=timeout)
+            return self.version, self.stats
+
+    def try_subscribe(self, max_clients):
+        with self._changed:
+            if self.clients >= max_clients:
+                return False
+            self.clients += 1
+            return True
+
+    def unsubscribe(self):
+        with self._changed:
+            self.clients -= 1
+
+
+_broadcaster = None
+_lock = threading.Lock()
+
+
+def get_broadcaster(app):
+    """Return this worker's broadcaster, starting it on first use."""
+    global _broadcaster
+    if _broadcaster is None:
+        with _lock:
+            if _broadcaster is None:
+                _broadcaster = StatsBroadcaster(app, app.config["STATS_STREAM_MIN_INTERVAL"])
+    _broadcaster.start()
+    return _broadcaster
+
+
+def stats_age():
+    """Seconds since this worker's broadcaster last counted stats, or None if it has not."""
+    if _broadcaster is None or _broadcaster.counted_at is None:
+        return None
+    return time.monotonic() - _broadcaster.counted_at
+
+
+def publish_stats_changed():
+    """Tell this worker's subscribers that stats may have changed (no-op if none)."""
+    if _broadcaster is not None:
+        _broadcaster.mark_dirty()
@@ -0,0 +1,80 @@
+"""
+Warm-up — Load read-mostly data into the process before it starts serving.
+
+Called once in the gunicorn master (see gunicorn.conf.py) after the app is
+preloaded, so every forked worker starts with these already in memory and
+shares the pages copy-on-write instead of building its own copy on its
+first requests:
+
+  1. Prompt content for the unserved pool, up to PROMPT_CACHE_MAX_BYTES
+  2. The weighted-selection bucket counts and alias table (SELECTION_POLICY=weighted)
+  3. The degraded-mode fallback corpus (DEGRADED_MODE_ENABLED)
+
+Everything here is a cache: a worker whose copy goes stale refreshes it on
+its own schedule, exactly as if it had started cold.
+"""
+
+import time
+import logging
+from sqlalchemy import false, select
+from models import db, Prompt
+from services.prompt_cache import get_cache, get_contents
+from services.selection import get_index, is_weighted
+from services.near_duplicates import pool_clause
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def _warm_prompt_cache():
+    cache = get_cache()
+    keys = db.session.execute(
+        select(Prompt.id, Prompt.content_version)
+        .where(Prompt.is_served == false(), pool_clause())
+        .order_by(Prompt.id)
+    ).all()
+    for i in range(0, len(keys), BATCH_SIZE):
+        get_contents([tuple(key) for key in keys[i:i + BATCH_SIZE]])
+        if cache.size >= cache.max_bytes:
+            break
+    return len(cache)
+
+
+def warm_up(app):
+    """Load the caches above; returns {name: entries loaded} for logging."""
+    from services.fallback_service import _components
+
+    loaded = {}
+    started = time.monotonic()
+    with app.app_context():
+        try:
+            loaded["prompt_cache"] = _warm_prompt_cache()
+            if is_weighted():
+                index = get_index()
+                index.refresh(db.session)
+                loaded["selection_buckets"] = len(index.counts)
+            if app.config["DEGRADED_MODE_ENABLED"]:
+                corpus = _components()[1]
+                corpus.refresh(db.session)
+                loaded["fallback_corpus"] = len(corpus.contents)
+        except Exception as e:
+            # A cold start is slower, not broken
+            logger.warning(f"Warm-up stopped early ({e.__class__.__name__}: {e}).")
+        finally:
+            db.session.remove()
+    logger.info(f"Warm-up loaded {loaded} in {time.monotonic() - started:.2f}s.")
+    return loaded
+
+
+def dispose_engines(app, close=True):
+    """
+    Drop every pooled connection (primary and replica binds).
+
+    In the master before forking, close=True closes them; in a freshly
+    forked worker, close=False discards the inherited pool without touching
+    sockets that belong to the parent.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
@@ -0,0 +1,40 @@
+"""
+Shared pytest fixtures.
+
+Tests always run against a throwaway SQLite file: DATABASE_URL is replaced
+before the app is imported, so a configured production database is never
+touched (tests that need Postgres take TEST_POSTGRES_URL explicitly).
+"""
+
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [BACKEND_DIR, os.path.join(BACKEND_DIR, "scripts")]
+
+_db_dir = tempfile.mkdtemp(prefix="dailyprompt-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ["FLASK_ENV"] = "development"
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import app as flask_app
+    return flask_app
+
+
+@pytest.fixture
+def db_session(app):
+    """An app context over empty tables (app_state seeded); tables are rebuilt afterwards."""
+    from app import _ensure_app_state
+    from models import db
+
+    with app.app_context():
+        yield db.session
+        db.session.remove()
+        db.drop_all(bind_key=None)
+        db.create_all(bind_key=None)
+        _ensure_app_state()
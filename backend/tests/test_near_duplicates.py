@@ -0,0 +1,38 @@
+"""
+services/near_duplicates.py: MinHash signatures and the LSH index.
+"""
+
+from datetime import datetime, timezone
+
+from models import Prompt, PromptLshBand
+from services.near_duplicates import index_prompts, signature
+
+BODY = ("You are a meticulous editor. Rewrite the following paragraph for clarity and "
+        "concision while preserving every fact and the author's voice.")
+
+
+def add_prompt(session, slug, body):
+    prompt = Prompt(title=slug, description="", prompt_body=body, system_prompt="", category="writing",
+                    source_slug=slug, source_url=f"https://prompts.chat/prompt/{slug}",
+                    scraped_at=datetime.now(timezone.utc))
+    session.add(prompt)
+    session.flush()
+    return prompt.id
+
+
+def test_text_without_words_has_no_signature():
+    assert signature("") is None
+    assert signature("!!! ???") is None
+    assert signature("one word") is not None
+
+
+def test_light_edit_is_flagged_but_wordless_bodies_are_not(db_session):
+    original = add_prompt(db_session, "original", BODY)
+    edited = add_prompt(db_session, "edited", BODY + " Thanks.")
+    empty = [add_prompt(db_session, f"empty-{i}", "!!!") for i in range(2)]
+
+    duplicates = index_prompts(db_session, [original, edited, *empty], threshold=0.7)
+
+    assert duplicates == {edited: original}
+    assert {p.id for p in Prompt.query.filter(Prompt.minhash.is_(None))} == set(empty)
+    assert not PromptLshBand.query.filter(PromptLshBand.prompt_id.in_(empty)).count()
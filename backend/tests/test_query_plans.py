@@ -0,0 +1,187 @@
+"""
+Query-plan regression tests: seed a synthetic corpus and EXPLAIN the hot queries.
+
+Each hot query must use the index built for it (revisions 007 and 011) and
+never scan a hot table, on SQLite and on Postgres. The SQLite database is a
+throwaway file with the schema created from the models. Postgres runs only
+when TEST_POSTGRES_URL points at a scratch database migrated with
+`alembic upgrade head`; its prompts and serve_log are truncated afterwards.
+
+PLAN_CHECK_ROWS sets the corpus size (default 50000 prompts, with twice as
+many serve_log rows over the last 60 days).
+"""
+
+import os
+import json
+import random
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from models import db, Prompt, ServeLog
+
+ROWS = int(os.getenv("PLAN_CHECK_ROWS", "50000"))
+DAYS = 60
+CATEGORIES = ("coding", "writing", "analysis", "education", "creative", "language", "productivity")
+SERVED_SHARE = 0.95
+INSERT_BATCH = 5000
+
+# The SQL mirrors what services/prompt_service.py, services/selection.py and
+# the serve_log services send; {unserved}/{served} become the "= FALSE"/"= 0"
+# predicates SQLAlchemy renders per dialect, and {lock} the SKIP LOCKED
+# clause the Postgres claims use. expect_index None means "any index".
+HotQuery = namedtuple("HotQuery", "name sql params expect_index hot_tables")
+
+HOT_QUERIES = [
+    HotQuery("claim: random unserved pick",
+             "SELECT id FROM prompts WHERE {unserved} ORDER BY RANDOM() LIMIT 10{lock}",
+             lambda now: {}, "idx_prompts_unserved", ["prompts"]),
+    HotQuery("claim: any unserved left",
+             "SELECT 1 FROM prompts WHERE {unserved} AND id NOT IN (1, 2, 3) LIMIT 1",
+             lambda now: {}, "idx_prompts_unserved", ["prompts"]),
+    HotQuery("stats: served count",
+             "SELECT COUNT(prompts.id) FROM prompts WHERE {served}",
+             lambda now: {}, "idx_prompts_served", ["prompts"]),
+    HotQuery("stats: remaining count",
+             "SELECT COUNT(prompts.id) FROM prompts WHERE {unserved}",
+             lambda now: {}, "idx_prompts_unserved", ["prompts"]),
+    HotQuery("weighted: bucket pick",
+             "SELECT id FROM prompts WHERE is_served = :served AND category = :category "
+             "ORDER BY RANDOM() LIMIT 5{lock}",
+             lambda now: {"served": False, "category": "language"},
+             "idx_prompts_unserved_category", ["prompts"]),
+    HotQuery("rollup: serve_log window",
+             "SELECT prompt_id, COUNT(*) FROM serve_log "
+             "WHERE served_at >= :start AND served_at < :end GROUP BY prompt_id",
+             lambda now: {"start": now - timedelta(days=1), "end": now}, None, ["serve_log"]),
+    HotQuery("replay: already logged?",
+             "SELECT id FROM serve_log WHERE prompt_id = :prompt_id AND served_at = :served_at LIMIT 1",
+             lambda now: {"prompt_id": 42, "served_at": now - timedelta(days=1)}, None, ["serve_log"]),
+]
+
+DIALECT_SQL = {
+    "sqlite": {"unserved": "is_served = 0", "served": "is_served = 1", "lock": ""},
+    "postgresql": {"unserved": "is_served = FALSE", "served": "is_served = TRUE",
+                   "lock": " FOR UPDATE SKIP LOCKED"},
+}
+
+
+def seed(conn, rows, days):
+    """Insert the synthetic corpus and serve_log in batches; returns the reference time."""
+    rng = random.Random(48)
+    now = datetime.now(timezone.utc)
+    prompts = []
+    for i in range(1, rows + 1):
+        prompts.append({
+            "id": i,
+            "title": f"Synthetic prompt {i}",
+            "description": "",
+            "prompt_body": f"Body of synthetic prompt {i}",
+            "system_prompt": "",
+            # A skewed mix, like a large import next to a small curated library
+            "category": CATEGORIES[min(int(rng.expovariate(0.8)), len(CATEGORIES) - 1)],
+            "source_slug": f"synthetic-{i}",
+            "source_url": "https://prompts.chat/prompt/synthetic-%d" % i if i % 10 else "https://docs.anthropic.com/x",
+            "scraped_at": now - timedelta(days=rng.randrange(365)),
+            "is_served": rng.random() < SERVED_SHARE,
+        })
+    for i in range(0, len(prompts), INSERT_BATCH):
+        conn.execute(Prompt.__table__.insert(), prompts[i:i + INSERT_BATCH])
+
+    logs = [
+        {
+            "prompt_id": rng.randrange(1, rows + 1),
+            "served_at": now - timedelta(seconds=rng.randrange(days * 86400)),
+            "client_ip": f"10.0.{rng.randrange(256)}.{rng.randrange(256)}",
+            "user_agent": "test_query_plans",
+        }
+        for _ in range(rows * 2)
+    ]
+    for i in range(0, len(logs), INSERT_BATCH):
+        conn.execute(ServeLog.__table__.insert(), logs[i:i + INSERT_BATCH])
+    return now
+
+
+def analyze_tables(engine):
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if engine.dialect.name == "postgresql":
+            conn.exec_driver_sql("VACUUM ANALYZE prompts")
+            conn.exec_driver_sql("VACUUM ANALYZE serve_log")
+        else:
+            conn.exec_driver_sql("ANALYZE")
+
+
+def plan_nodes(conn, sql, params):
+    """Return [(scan kind, table, index or None)] for a query's plan."""
+    if conn.dialect.name == "postgresql":
+        plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        nodes = []
+
+        def walk(node):
+            kind = node["Node Type"]
+            if "Scan" in kind:
+                nodes.append((kind, node.get("Relation Name"), node.get("Index Name")))
+            for child in node.get("Plans", []):
+                walk(child)
+
+        walk(plan[0]["Plan"])
+        return nodes
+
+    nodes = []
+    for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params):
+        words = row[-1].split()
+        if words[0] in ("SCAN", "SEARCH"):
+            index = words[words.index("INDEX") + 1] if "INDEX" in words else None
+            kind = "Index Scan" if index or "PRIMARY" in words else f"{words[0].title()} Table"
+            nodes.append((kind, words[1], index))
+    return nodes
+
+
+@pytest.fixture(scope="module", params=["sqlite", "postgresql"])
+def seeded(request, tmp_path_factory):
+    """(connection, reference time) over a seeded scratch database per dialect."""
+    if request.param == "sqlite":
+        engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}")
+        db.metadata.create_all(engine)
+    else:
+        url = os.getenv("TEST_POSTGRES_URL")
+        if not url:
+            pytest.skip("TEST_POSTGRES_URL is not set")
+        engine = create_engine(url.replace("postgres://", "postgresql://", 1))
+        with engine.connect() as conn:
+            if conn.execute(text("SELECT 1 FROM prompts LIMIT 1")).first() is not None:
+                pytest.fail("TEST_POSTGRES_URL already has prompts; point it at a scratch database.")
+
+    with engine.begin() as conn:
+        now = seed(conn, ROWS, DAYS)
+    analyze_tables(engine)
+    try:
+        with engine.connect() as conn:
+            yield conn, now
+    finally:
+        if request.param == "postgresql":
+            with engine.begin() as conn:
+                conn.exec_driver_sql("TRUNCATE serve_log, prompts RESTART IDENTITY CASCADE")
+        engine.dispose()
+
+
+@pytest.mark.parametrize("query", HOT_QUERIES, ids=[q.name for q in HOT_QUERIES])
+def test_hot_query_uses_its_index(seeded, query):
+    conn, now = seeded
+    sql = query.sql.format(**DIALECT_SQL[conn.dialect.name])
+    nodes = plan_nodes(conn, sql, query.params(now))
+    plan = "; ".join(f"{k} {t}{f' using {i}' if i else ''}" for k, t, i in nodes)
+
+    for kind, table, _ in nodes:
+        base = (table or "").split("_20")[0]  # serve_log_2026_10 -> serve_log
+        assert not (base in query.hot_tables and kind in ("Seq Scan", "Scan Table")), \
+            f"full scan of {table}: {plan}"
+    used = {index for _, _, index in nodes if index}
+    if query.expect_index:
+        assert query.expect_index in used, f"expected {query.expect_index}: {plan}"
+    else:
+        assert used, f"no index used: {plan}"
@@ -0,0 +1,71 @@
+"""
+services/selection.py: the alias table and the per-worker bucket index.
+"""
+
+import random
+from collections import Counter
+from datetime import datetime, timezone
+
+from models import Prompt
+from services.selection import AliasTable, BucketIndex
+
+CODING = ("prompts.chat", "coding", 0)
+WRITING = ("prompts.chat", "writing", 0)
+
+
+def add_prompts(session, category, n):
+    start = session.query(Prompt).count()
+    for i in range(start, start + n):
+        session.add(Prompt(
+            title=f"Prompt {i}",
+            description="",
+            prompt_body=f"Body {i}",
+            system_prompt="",
+            category=category,
+            source_slug=f"prompt-{i}",
+            source_url=f"https://prompts.chat/prompt/prompt-{i}",
+            scraped_at=datetime.now(timezone.utc),
+        ))
+    session.commit()
+
+
+def test_alias_table_draws_in_proportion_to_weight():
+    table = AliasTable([1, 3])
+    rng = random.Random(44)
+
+    draws = Counter(table.draw(rng) for _ in range(20000))
+
+    assert 0.72 < draws[1] / 20000 < 0.78
+
+
+def test_short_claim_refreshes_and_bucket_comes_back(db_session):
+    add_prompts(db_session, "coding", 3)
+    add_prompts(db_session, "writing", 3)
+    index = BucketIndex({}, {}, half_life_days=0, refresh_seconds=3600)
+
+    index.refresh(db_session)
+    assert set(index._buckets) == {CODING, WRITING}
+
+    # Another worker took the coding prompts first: the claim comes back short
+    index.record_claims({CODING: 2}, {CODING: 0})
+    assert set(index._buckets) == {WRITING}
+
+    # ...and the next plan re-reads the counts even though the refresh
+    # interval has not passed, so coding is drawable again
+    wanted = index.plan(db_session, 6)
+    assert set(index._buckets) == {CODING, WRITING}
+    assert wanted == {CODING: 3, WRITING: 3}
+
+
+def test_claims_that_empty_a_bucket_drop_it_until_it_refills(db_session):
+    add_prompts(db_session, "coding", 2)
+    add_prompts(db_session, "writing", 2)
+    index = BucketIndex({}, {}, half_life_days=0, refresh_seconds=3600)
+    index.refresh(db_session)
+
+    index.record_claims({CODING: 2}, {CODING: 2})
+    assert set(index._buckets) == {WRITING}
+    assert index.refreshed_at is not None
+
+    index.refresh(db_session)
+    assert set(index._buckets) == {CODING, WRITING}
@@ -0,0 +1,257 @@
+"""
+scripts/sync_prompts_chat.py against a local stand-in for the prompts.chat API.
+
+The stand-in serves api_sample.json-shaped pages (newest first) over
+HTTP/1.1 keep-alive from a threaded http.server, and can be told to fail
+or delay particular pages.
+"""
+
+import os
+import json
+import time
+import threading
+import urllib.parse
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import sync_prompts_chat as sync
+from models import Prompt
+
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                           "api_sample.json")
+NEWEST = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+def make_items(n, sample_path=SAMPLE_PATH):
+    """n prompts shaped like the sample item, createdAt one hour apart, newest first."""
+    with open(sample_path, encoding="utf-8") as f:
+        template = json.load(f)["prompts"][0]
+    items = []
+    for i in range(n):
+        created = NEWEST - timedelta(hours=i)
+        items.append(dict(
+            template,
+            id=f"stand-in-{i}",
+            slug=f"stand-in-prompt-{i}",
+            title=f"Stand-in prompt {i}",
+            description=f"Description of stand-in prompt {i}",
+            content=f"Body of stand-in prompt {i} " + " ".join(f"word{i}-{k}" for k in range(12)),
+            createdAt=created.isoformat().replace("+00:00", "Z"),
+        ))
+    return items
+
+
+class StandInAPI(ThreadingHTTPServer):
+    """Serves `items` in pages of perPage; `failures` maps page -> statuses to return first."""
+
+    daemon_threads = True
+
+    def __init__(self, items):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.items = items
+        self.failures = {}
+        self.delays = {}
+        self.requests = []
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/api/prompts"
+
+    def requested_pages(self):
+        return [page for page, _ in self.requests]
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        page = int(query["page"][0])
+        per_page = int(query["perPage"][0])
+        server = self.server
+        with server.lock:
+            pending = server.failures.get(page)
+            status = pending.pop(0) if pending else 200
+            server.requests.append((page, status))
+        # Not time.sleep, which the tests stub out to skip retry backoff
+        threading.Event().wait(server.delays.get(page, 0))
+
+        total_pages = max(1, -(-len(server.items) // per_page))
+        body = {
+            "prompts": server.items[(page - 1) * per_page:page * per_page],
+            "total": len(server.items),
+            "page": page,
+            "perPage": per_page,
+            "totalPages": total_pages,
+        } if status == 200 else {"error": "stand-in failure"}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def stand_in():
+    servers = []
+
+    def start(n_items):
+        server = StandInAPI(make_items(n_items))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(sync.time, "sleep", lambda seconds: None)
+
+
+def stored_slugs():
+    return {slug for (slug,) in Prompt.query.with_entities(Prompt.source_slug)}
+
+
+def test_full_sync_discovers_total_pages(db_session, stand_in):
+    server = stand_in(7)
+    client = sync.PromptsChatClient(server.url, per_page=3)
+
+    inserted, updated, newest = sync.sync_full(client, workers=2)
+
+    assert (inserted, updated, newest) == (7, 0, NEWEST)
+    assert sorted(server.requested_pages()) == [1, 2, 3]
+    assert stored_slugs() == {item["slug"] for item in server.items}
+    assert sync._get_state(sync.CHECKPOINT_KEY) == 0
+
+
+def test_pages_fetched_concurrently_over_keep_alive(db_session, stand_in):
+    server = stand_in(40)
+    # Early pages are slowest, so later ones finish first
+    server.delays = {2: 0.3, 3: 0.3}
+    client = sync.PromptsChatClient(server.url, per_page=2)
+
+    started = time.monotonic()
+    pages = [page for page, _ in sync.fetch_pages(client, range(1, 21), workers=4)]
+    elapsed = time.monotonic() - started
+
+    assert pages == list(range(1, 21))
+    assert len(server.requests) == 20
+    # One connection per worker thread, reused for every page it fetched
+    assert server.connections <= 4
+    # The slow pages overlapped instead of adding up behind each other
+    assert elapsed < 0.5
+
+
+def test_retries_5xx_and_429(db_session, stand_in):
+    server = stand_in(6)
+    server.failures = {2: [503, 429]}
+    client = sync.PromptsChatClient(server.url, per_page=2)
+
+    inserted, _, _ = sync.sync_full(client, workers=2)
+
+    assert inserted == 6
+    assert server.requests.count((2, 503)) == 1
+    assert server.requests.count((2, 429)) == 1
+    assert server.requests.count((2, 200)) == 1
+
+
+def test_client_errors_are_not_retried(stand_in):
+    server = stand_in(2)
+    server.failures = {1: [404]}
+    client = sync.PromptsChatClient(server.url, per_page=2)
+
+    with pytest.raises(sync.PageFetchError):
+        client.get_page(1)
+    assert server.requests == [(1, 404)]
+
+
+def test_resumes_from_checkpoint_after_failed_page(db_session, stand_in):
+    server = stand_in(8)
+    server.failures = {3: [500] * sync.MAX_ATTEMPTS}
+    client = sync.PromptsChatClient(server.url, per_page=2)
+
+    assert sync.sync_full(client, workers=2) is None
+    assert sync._get_state(sync.CHECKPOINT_KEY) == 2
+    assert stored_slugs() == {item["slug"] for item in server.items[:4]}
+
+    server.requests.clear()
+    inserted, updated, _ = sync.sync_full(client, workers=2)
+
+    # Page 1 again to learn totalPages (not stored), then only 3 and 4
+    assert sorted(server.requested_pages()) == [1, 3, 4]
+    assert (inserted, updated) == (4, 0)
+    assert stored_slugs() == {item["slug"] for item in server.items}
+    assert sync._get_state(sync.CHECKPOINT_KEY) == 0
+
+
+def test_incremental_sync_stops_at_watermark(db_session, stand_in):
+    server = stand_in(10)
+    client = sync.PromptsChatClient(server.url, per_page=2)
+    sync.sync_full(client, workers=2)
+    watermark = NEWEST
+    sync.set_watermark(watermark)
+    db_session.commit()
+
+    # Three prompts published since the last sync, at the front of the listing
+    server.items[:0] = make_items(13)[10:]
+    for i, item in enumerate(server.items[:3]):
+        item["createdAt"] = (NEWEST + timedelta(hours=3 - i)).isoformat().replace("+00:00", "Z")
+    server.requests.clear()
+
+    inserted, updated, newest = sync.sync_incremental(client, sync.get_watermark())
+
+    # Page 2 holds the first prompt at or before the watermark; nothing after it is fetched
+    assert server.requested_pages() == [1, 2]
+    assert (inserted, updated) == (3, 0)
+    assert newest == NEWEST + timedelta(hours=3)
+
+
+def test_reclassified_rows_are_not_rewritten(db_session, stand_in):
+    server = stand_in(4)
+    client = sync.PromptsChatClient(server.url, per_page=2)
+    sync.sync_full(client, workers=2)
+    db_session.query(Prompt).update({"category": "writing"})
+    db_session.commit()
+
+    inserted, updated, _ = sync.sync_full(client, workers=2, restart=True)
+
+    assert (inserted, updated) == (0, 0)
+    assert {p.category for p in Prompt.query} == {"writing"}
+    assert {p.content_version for p in Prompt.query} == {1}
+
+
+def test_content_edit_bumps_version_but_keeps_scraped_at(db_session, stand_in):
+    server = stand_in(2)
+    client = sync.PromptsChatClient(server.url, per_page=2)
+    sync.sync_full(client, workers=1)
+    edited = server.items[0]
+    before = Prompt.query.filter_by(source_slug=edited["slug"]).one()
+    scraped_at, version = before.scraped_at, before.content_version
+
+    edited["content"] += " (revised)"
+    inserted, updated, _ = sync.sync_full(client, workers=1, restart=True)
+    db_session.expire_all()
+    after = Prompt.query.filter_by(source_slug=edited["slug"]).one()
+
+    assert (inserted, updated) == (0, 1)
+    assert after.prompt_body.endswith("(revised)")
+    assert after.content_version == version + 1
+    assert after.enriched_version == after.content_version
+    assert after.scraped_at == scraped_at
@@ -64,6 +64,28 @@ export async function fetchStats() {
   }
 }
 
+/**
+ * Subscribe to live stats over Server-Sent Events.
+ * Calls onStats with each new { total, served, remaining } snapshot; the
+ * browser reconnects on its own when the stream ends. Returns an unsubscribe
+ * function (a no-op where EventSource is unsupported).
+ */
+export function subscribeStats(onStats) {
+  if (typeof EventSource === 'undefined') {
+    return () => {};
+  }
+
+  const source = new EventSource(`${API_URL}/api/stats/stream`);
+  source.onmessage = (event) => {
+    try {
+      onStats(JSON.parse(event.data));
+    } catch {
+      // Ignore malformed events; the next snapshot replaces this one
+    }
+  };
+  return () => source.close();
+}
+
 /**
  * Submit a custom user prompt.
  */
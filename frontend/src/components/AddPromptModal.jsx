@@ -20,7 +20,7 @@ export function AddPromptModal({ isOpen, onClose }) {
       title,
       description,
       prompt_body: promptBody,
-      category: category || 'custom'
+      category: category.trim()
     });
 
     if (res.type === 'success') {
@@ -74,7 +74,7 @@ export function AddPromptModal({ isOpen, onClose }) {
               <input
                 id="prompt-category"
                 type="text"
-                placeholder="E.g., coding, creative, general"
+                placeholder="E.g., coding, creative — leave blank to auto-detect"
                 value={category}
                 onChange={(e) => setCategory(e.target.value)}
                 disabled={status === 'submitting'}
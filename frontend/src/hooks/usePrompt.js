@@ -5,7 +5,7 @@
  */
 
 import { useCallback, useEffect, useReducer } from 'react';
-import { fetchDailyPrompt, fetchStats } from '../api/promptApi';
+import { fetchDailyPrompt, fetchStats, subscribeStats } from '../api/promptApi';
 
 const initialState = {
   status: 'idle',     // 'idle' | 'loading' | 'revealed' | 'exhausted' | 'error'
@@ -51,15 +51,25 @@ function promptReducer(state, action) {
 export function usePrompt() {
   const [state, dispatch] = useReducer(promptReducer, initialState);
 
-  // Load initial stats on mount
+  // Load initial stats on mount, then follow the live stream. The one-off
+  // fetch covers browsers or servers where the stream is unavailable.
   useEffect(() => {
+    let active = true;
     async function loadStats() {
       const result = await fetchStats();
-      if (result.type === 'success') {
+      if (active && result.type === 'success') {
         dispatch({ type: 'SET_STATS', payload: result.data });
       }
     }
     loadStats();
+
+    const unsubscribe = subscribeStats((stats) => {
+      dispatch({ type: 'SET_STATS', payload: stats });
+    });
+    return () => {
+      active = false;
+      unsubscribe();
+    };
   }, []);
 
   const requestPrompt = useCallback(async () => {